@@ -1,5 +1,7 @@
 from fastapi.security import OAuth2PasswordBearer
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+import asyncio
 import hashlib
 import jwt
 from fastapi import Depends, HTTPException, status
@@ -7,16 +9,34 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import bcrypt
 
+from app import metrics, user_cache
 from app.models.users import User as UserModel
-from app.config import SECRET_KEY, ALGORITHM
+from app.config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ALGORITHM,
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_LEGACY_RAW_BCRYPT,
+    SECRET_KEY,
+)
 from app.db_depends import get_async_db
 
 
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Маркер хешей формата bcrypt(sha256(password)); хеши без него созданы до его появления.
+# Предыдущий релиз хеши с маркером не читает. Перед откатом на него снять маркер:
+#   UPDATE users SET hashed_password = substr(hashed_password, 15)
+#   WHERE hashed_password LIKE 'bcrypt-sha256$%';
+PASSWORD_HASH_PREFIX = "bcrypt-sha256$"
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/token")
 
+# bcrypt отпускает GIL, но каждая операция занимает ~250 мс — выполняем их в отдельном пуле,
+# чтобы всплеск логинов не блокировал event loop и не занимал общий пул потоков
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_jobs = 0
+
 
 def _prehash_password(password: str) -> bytes:
     """
@@ -31,44 +51,101 @@ def hash_password(password: str) -> str:
     Преобразует пароль в хеш с использованием bcrypt.
     """
     hashed = bcrypt.hashpw(_prehash_password(password), bcrypt.gensalt())
-    return hashed.decode("utf-8")
+    return PASSWORD_HASH_PREFIX + hashed.decode("utf-8")
+
+
+def _verify_and_upgrade(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Проверяет пароль и, если хеш старого формата, возвращает его замену.
+    Любой хеш проверяется одним checkpw; второй — только для хешей без маркера
+    при PASSWORD_LEGACY_RAW_BCRYPT.
+    """
+    try:
+        if hashed_password.startswith(PASSWORD_HASH_PREFIX):
+            hashed_bytes = hashed_password.removeprefix(PASSWORD_HASH_PREFIX).encode("utf-8")
+            return bcrypt.checkpw(_prehash_password(plain_password), hashed_bytes), None
+
+        hashed_bytes = hashed_password.encode("utf-8")
+        # bcrypt(sha256(password)) без маркера — достаточно дописать маркер
+        if bcrypt.checkpw(_prehash_password(plain_password), hashed_bytes):
+            return True, PASSWORD_HASH_PREFIX + hashed_password
+        # Legacy: bcrypt(password) — перехешируем в новый формат
+        if PASSWORD_LEGACY_RAW_BCRYPT and bcrypt.checkpw(plain_password.encode("utf-8"), hashed_bytes):
+            return True, hash_password(plain_password)
+        return False, None
+    except ValueError:
+        return False, None
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Проверяет, соответствует ли введённый пароль сохранённому хешу.
     """
-    hashed_bytes = hashed_password.encode("utf-8")
+    return _verify_and_upgrade(plain_password, hashed_password)[0]
+
 
+def _update_password_gauges() -> None:
+    metrics.set_gauge("password_hash_in_flight", _password_jobs)
+    metrics.set_gauge("password_hash_queue_depth", max(_password_jobs - PASSWORD_HASH_WORKERS, 0))
+
+
+async def _run_password_job(func, *args):
+    """
+    Выполняет bcrypt-операцию в пуле с контролем допуска: если задач уже
+    PASSWORD_HASH_MAX_PENDING, сразу отвечаем 503 вместо того, чтобы копить очередь.
+    """
+    global _password_jobs
+    if _password_jobs >= PASSWORD_HASH_MAX_PENDING:
+        metrics.increment("password_hash_rejected_total")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later",
+            headers={"Retry-After": "1"},
+        )
+    _password_jobs += 1
+    _update_password_gauges()
     try:
-        # Preferred path (new hashes): bcrypt(sha256(password))
-        if bcrypt.checkpw(_prehash_password(plain_password), hashed_bytes):
-            return True
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, func, *args)
+    finally:
+        _password_jobs -= 1
+        _update_password_gauges()
 
-        # Backward-compat (legacy hashes): bcrypt(password)
-        return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_bytes)
-    except ValueError:
-        return False
+
+async def hash_password_async(password: str) -> str:
+    """
+    hash_password в пуле bcrypt, не блокируя event loop.
+    """
+    return await _run_password_job(hash_password, password)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme),
-                           db: AsyncSession = Depends(get_async_db)):
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
     """
-    Проверяет JWT и возвращает пользователя из базы.
+    Проверяет пароль в пуле bcrypt. Возвращает (совпал ли пароль, новый хеш или None),
+    новый хеш нужно сохранить — это апгрейд хеша старого формата.
     """
-    credentials_exception = HTTPException(
+    return await _run_password_job(_verify_and_upgrade, plain_password, hashed_password)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode_access_token(token: str) -> dict:
+    """
+    Проверяет подпись, срок действия и тип access-токена, возвращает его claims.
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         token_type: str | None = payload.get("token_type")
         if email is None:
-            raise credentials_exception
+            raise _credentials_exception()
         if token_type != "access":
-            raise credentials_exception
+            raise _credentials_exception()
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -76,15 +153,54 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
             headers={"WWW-Authenticate": "Bearer"},
         )
     except jwt.PyJWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    return payload
+
+
+async def _load_active_user(db: AsyncSession, email: str) -> UserModel:
+    user = user_cache.get(email)
+    if user is not None:
+        return user
     result = await db.scalars(
         select(UserModel).where(UserModel.email == email, UserModel.is_active == True))
     user = result.first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    user_cache.store(user)
     return user
 
 
+async def get_current_user(token: str = Depends(oauth2_scheme),
+                           db: AsyncSession = Depends(get_async_db)):
+    """
+    Проверяет JWT и возвращает пользователя: из кэша воркера или из базы.
+    """
+    payload = _decode_access_token(token)
+    return await _load_active_user(db, payload["sub"])
+
+
+async def get_current_user_claims(token: str = Depends(oauth2_scheme),
+                                  db: AsyncSession = Depends(get_async_db)):
+    """
+    Облегчённая проверка для чтения и корзины: пользователь восстанавливается
+    из подписанных claims (sub, id, role) без запроса к users. Деактивированных
+    отсекает набор из user_cache; после user_cache.invalidate, для токенов без id/role
+    и пока набор не загружен — обычная проверка, как в get_current_user.
+    Не использовать там, где важна актуальная роль или данные пользователя из базы.
+    """
+    payload = _decode_access_token(token)
+    email = payload["sub"]
+    user_id = payload.get("id")
+    role = payload.get("role")
+    if not isinstance(user_id, int) or not isinstance(role, str) or not user_cache.claims_trusted(email):
+        metrics.increment("auth_claims_fallback_total")
+        return await _load_active_user(db, email)
+    if user_cache.is_deactivated(user_id):
+        raise _credentials_exception()
+    metrics.increment("auth_claims_trusted_total")
+    return UserModel(id=user_id, email=email, role=role, is_active=True)
+
+
 async def get_current_seller(current_user: UserModel = Depends(get_current_user)):
     """
     Проверяет, что пользователь имеет роль 'seller'.
@@ -0,0 +1,184 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from collections.abc import Hashable, Iterable
+from typing import Any
+
+from loguru import logger
+
+from app.config import CACHE_BACKEND, REDIS_URL
+
+
+class TTLCache:
+    """
+    In-process кэш с ограничением по размеру (LRU) и времени жизни записей (TTL).
+    Не потокобезопасен: рассчитан на использование из одного event loop воркера.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend(ABC):
+    """
+    Хранилище кэша ответов. Значения — готовые байты (обычно JSON),
+    каждая запись может быть помечена тегами для точечной инвалидации.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        ...
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        return [await self.get(key) for key in keys]
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        ...
+
+    @abstractmethod
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        ...
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """
+    Кэш в памяти воркера: LRU + TTL, индекс тег -> ключи.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._entries = TTLCache(ttl=0, maxsize=maxsize)
+        self._tags: defaultdict[str, set[str]] = defaultdict(set)
+        self._tag_refs = 0
+
+    async def get(self, key: str) -> bytes | None:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        self._entries.set(key, value, ttl=ttl)
+        for tag in tags:
+            self._tags[tag].add(key)
+            self._tag_refs += 1
+        # Вытесненные LRU ключи остаются в индексе тегов — периодически чистим
+        if self._tag_refs > 4 * self._entries.maxsize:
+            self._prune_tags()
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                self._entries.delete(key)
+
+    def _prune_tags(self) -> None:
+        pruned: defaultdict[str, set[str]] = defaultdict(set)
+        for tag, keys in self._tags.items():
+            alive = {key for key in keys if key in self._entries}
+            if alive:
+                pruned[tag] = alive
+        self._tags = pruned
+        self._tag_refs = sum(len(keys) for keys in pruned.values())
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Общий для всех воркеров кэш в Redis. Теги хранятся как множества ключей.
+    Ошибки Redis не роняют запрос: чтение считается промахом, запись пропускается.
+    """
+
+    def __init__(self, url: str, prefix: str = "cache:") -> None:
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self._redis = redis_asyncio.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        try:
+            return await self._redis.get(self._prefix + key)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis cache get failed: {exc}")
+            return None
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        if not keys:
+            return []
+        try:
+            return await self._redis.mget([self._prefix + key for key in keys])
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis cache mget failed: {exc}")
+            return [None] * len(keys)
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        full_key = self._prefix + key
+        ttl_ms = max(int(ttl * 1000), 1)
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.set(full_key, value, px=ttl_ms)
+            for tag in tags:
+                tag_key = f"{self._prefix}tag:{tag}"
+                pipe.sadd(tag_key, full_key)
+                pipe.pexpire(tag_key, ttl_ms)
+            await pipe.execute()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis cache set failed: {exc}")
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        tag_keys = [f"{self._prefix}tag:{tag}" for tag in tags]
+        if not tag_keys:
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = await pipe.execute()
+            keys = set(tag_keys)
+            for tag_members in members:
+                keys.update(tag_members)
+            await self._redis.delete(*keys)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis cache invalidation failed: {exc}")
+
+
+def create_cache_backend(maxsize: int) -> CacheBackend:
+    """
+    Создаёт бэкенд кэша по настройке CACHE_BACKEND ("memory" или "redis").
+    """
+    if CACHE_BACKEND == "redis":
+        if not REDIS_URL:
+            raise RuntimeError("REDIS_URL is not set. It is required for CACHE_BACKEND=redis")
+        return RedisCacheBackend(REDIS_URL)
+    if CACHE_BACKEND == "memory":
+        return InMemoryCacheBackend(maxsize=maxsize)
+    raise RuntimeError("CACHE_BACKEND must be 'memory' or 'redis'")
@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import CATEGORY_CACHE_TTL
+from app.models.categories import Category as CategoryModel
+
+
+@dataclass(frozen=True)
+class CategorySnapshot:
+    """
+    Снимок дерева активных категорий в памяти воркера.
+    descendants — замыкание: для каждой категории она сама и все её потомки.
+    tree_json — готовое вложенное дерево для GET /categories/tree,
+    list_json — плоский список для GET /categories/ из тех же строк,
+    etag — хеш дерева (одинаковый во всех воркерах при одинаковых данных).
+    """
+    names: dict[int, str]
+    parents: dict[int, int | None]
+    children: dict[int | None, tuple[int, ...]]
+    descendants: dict[int, tuple[int, ...]]
+    tree_json: bytes
+    list_json: bytes
+    etag: str
+
+    def subtree(self, category_id: int) -> tuple[int, ...]:
+        """
+        ID категории и всех её потомков. Категория вне снимка (например, только что
+        созданная в другом воркере) считается листом.
+        """
+        return self.descendants.get(category_id, (category_id,))
+
+
+_snapshot: CategorySnapshot | None = None
+_loaded_at = 0.0
+# Растёт при каждой инвалидации: снимок, начатый до изменения, не сохраняем
+_generation = 0
+_lock = asyncio.Lock()
+
+
+def _build_snapshot(rows) -> CategorySnapshot:
+    names = {row.id: row.name for row in rows}
+    parents = {row.id: row.parent_id for row in rows}
+
+    children: dict[int | None, list[int]] = {}
+    for category_id in sorted(names):
+        parent_id = parents[category_id]
+        # Потомки неактивной категории в дереве становятся корнями
+        if parent_id not in names:
+            parent_id = None
+        children.setdefault(parent_id, []).append(category_id)
+
+    descendants: dict[int, tuple[int, ...]] = {}
+
+    def collect(category_id: int, path: set[int]) -> tuple[int, ...]:
+        if category_id in descendants:
+            return descendants[category_id]
+        result = [category_id]
+        for child_id in children.get(category_id, ()):
+            if child_id not in path:  # защита от циклов в parent_id
+                result.extend(collect(child_id, path | {child_id}))
+        descendants[category_id] = tuple(result)
+        return descendants[category_id]
+
+    for category_id in names:
+        collect(category_id, {category_id})
+
+    def node(category_id: int, path: set[int]) -> dict:
+        return {
+            "id": category_id,
+            "name": names[category_id],
+            "parent_id": parents[category_id],
+            "children": [
+                node(child_id, path | {child_id})
+                for child_id in children.get(category_id, ())
+                if child_id not in path
+            ],
+        }
+
+    tree = [node(category_id, {category_id}) for category_id in children.get(None, ())]
+    tree_json = json.dumps(tree, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    flat = [
+        {"id": category_id, "name": names[category_id], "parent_id": parents[category_id], "is_active": True}
+        for category_id in sorted(names)
+    ]
+    list_json = json.dumps(flat, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    return CategorySnapshot(
+        names=names,
+        parents=parents,
+        children={parent_id: tuple(ids) for parent_id, ids in children.items()},
+        descendants=descendants,
+        tree_json=tree_json,
+        list_json=list_json,
+        etag=f'"{hashlib.sha256(tree_json).hexdigest()[:32]}"',
+    )
+
+
+async def get_category_snapshot(db: AsyncSession) -> CategorySnapshot:
+    """
+    Возвращает снимок дерева категорий, перечитывая его из базы после инвалидации
+    или по истечении CATEGORY_CACHE_TTL (изменения из других воркеров).
+    """
+    global _snapshot, _loaded_at
+    if _snapshot is not None and time.monotonic() - _loaded_at < CATEGORY_CACHE_TTL:
+        return _snapshot
+    async with _lock:
+        if _snapshot is not None and time.monotonic() - _loaded_at < CATEGORY_CACHE_TTL:
+            return _snapshot
+        generation = _generation
+        result = await db.execute(
+            select(CategoryModel.id, CategoryModel.name, CategoryModel.parent_id)
+            .where(CategoryModel.is_active == True)
+        )
+        snapshot = _build_snapshot(result.all())
+        if generation == _generation:
+            _snapshot = snapshot
+            _loaded_at = time.monotonic()
+        return snapshot
+
+
+def invalidate_category_snapshot() -> None:
+    """
+    Сбрасывает снимок текущего воркера после изменения категорий.
+    """
+    global _snapshot, _generation
+    _snapshot = None
+    _generation += 1
@@ -0,0 +1,11 @@
+from fastapi import Request
+
+
+def get_client_ip(request: Request) -> str | None:
+    """
+    IP клиента. За доверенными прокси (TRUSTED_PROXY_IPS) request.client уже содержит
+    адрес из X-Forwarded-For — его подставляет ProxyHeadersMiddleware в app.main.
+    Заголовок здесь повторно не разбираем: второе применение доверия к прокси
+    приняло бы за прокси клиента, чей адрес сам попадает в доверенные сети.
+    """
+    return request.client.host if request.client else None
@@ -0,0 +1,78 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts: object) -> str:
+    """
+    Слабый ETag из версии ресурса: updated_at, счётчиков и параметров запроса.
+    Слабый — потому что описывает версию данных, а не конкретные байты ответа.
+    """
+    digest = hashlib.sha256("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Проверяет If-None-Match запроса против ETag ответа (слабое сравнение, RFC 9110).
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    expected = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == expected for candidate in header.split(","))
+
+
+def not_modified_since(request: Request, last_modified: datetime) -> bool:
+    """
+    Проверяет If-Modified-Since. HTTP-даты имеют точность до секунды.
+    """
+    header = request.headers.get("if-modified-since")
+    if not header:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def validator_headers(etag: str, last_modified: datetime | None = None, private: bool = False) -> dict[str, str]:
+    """
+    Заголовки валидаторов для полного ответа и для 304.
+    no-cache: клиент и прокси могут хранить ответ, но обязаны его перепроверять.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache" if private else "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def not_modified(
+    request: Request,
+    etag: str,
+    last_modified: datetime | None = None,
+    private: bool = False,
+) -> Response | None:
+    """
+    Возвращает 304, если копия клиента актуальна, иначе None.
+    If-None-Match имеет приоритет над If-Modified-Since (RFC 9110, 13.2.2).
+    """
+    if "if-none-match" in request.headers:
+        fresh = etag_matches(request, etag)
+    elif last_modified is not None:
+        fresh = not_modified_since(request, last_modified)
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=validator_headers(etag, last_modified, private),
+    )
@@ -16,6 +16,26 @@ def _parse_csv_env(name: str) -> tuple[str, ...]:
     raw_value = os.getenv(name, "")
     return tuple(item.strip() for item in raw_value.split(",") if item.strip())
 
+
+def _parse_int_env(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise RuntimeError(f"{name} must be an integer")
+
+
+def _parse_float_env(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise RuntimeError(f"{name} must be a number")
+
 YOOKASSA_SHOP_ID = os.getenv("YOOKASSA_SHOP_ID")
 YOOKASSA_SECRET_KEY = os.getenv("YOOKASSA_SECRET_KEY")
 YOOKASSA_RETURN_URL = os.getenv("YOOKASSA_RETURN_URL", "http://localhost:8000/")
@@ -25,6 +45,8 @@ if not SECRET_KEY:
     raise RuntimeError("SECRET_KEY is not set. Add it to .env")
 
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
 ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
 if not ASYNC_DATABASE_URL:
     raise RuntimeError("ASYNC_DATABASE_URL is not set. Add PostgreSQL DSN to .env")
@@ -33,3 +55,108 @@ if not ASYNC_DATABASE_URL.startswith("postgresql+asyncpg://"):
 
 AUTO_CREATE_TABLES = _parse_bool_env("AUTO_CREATE_TABLES", default=False)
 TRUSTED_PROXY_IPS = _parse_csv_env("TRUSTED_PROXY_IPS")
+# GET /metrics со счётчиками воркера. Эндпоинт без авторизации, поэтому выключен
+# по умолчанию: включайте, только если он недоступен снаружи (nginx не проксирует /metrics).
+METRICS_ENABLED = _parse_bool_env("METRICS_ENABLED", default=False)
+# Файл журнала запросов; пустое значение — не писать журнал в файл (например, в тестах)
+LOG_FILE = os.getenv("LOG_FILE", "info.log").strip()
+
+# Кэш точного количества товаров (count_mode=exact). 0 — кэш выключен.
+PRODUCT_COUNT_CACHE_TTL = _parse_float_env("PRODUCT_COUNT_CACHE_TTL", 0.0)
+PRODUCT_COUNT_CACHE_SIZE = _parse_int_env("PRODUCT_COUNT_CACHE_SIZE", 1024)
+
+# Кэш ответов каталога: memory — в памяти воркера, redis — общий для всех воркеров.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").strip().lower()
+REDIS_URL = os.getenv("REDIS_URL")
+# TTL кэша ответов каталога в секундах. 0 — кэш выключен.
+# По умолчанию кэш включён только с redis: инвалидация memory-бэкенда видна лишь
+# своему воркеру, и при нескольких воркерах остальные отдают устаревшие списки
+# до истечения TTL. Явный TTL с memory годится только для одного воркера.
+PRODUCT_CACHE_TTL = _parse_float_env("PRODUCT_CACHE_TTL", 30.0 if CACHE_BACKEND == "redis" else 0.0)
+PRODUCT_CACHE_SIZE = _parse_int_env("PRODUCT_CACHE_SIZE", 10000)
+
+# Конфигурация полнотекстового поиска по умолчанию: english или russian.
+SEARCH_LANGUAGE = os.getenv("SEARCH_LANGUAGE", "english").strip().lower()
+if SEARCH_LANGUAGE not in {"english", "russian"}:
+    raise RuntimeError("SEARCH_LANGUAGE must be 'english' or 'russian'")
+
+# Максимальное количество ID в одном запросе /products/batch
+PRODUCT_BATCH_MAX_IDS = _parse_int_env("PRODUCT_BATCH_MAX_IDS", 200)
+
+# Сколько секунд воркер доверяет своему снимку дерева категорий
+# (изменения из других воркеров видны не позже этого срока).
+CATEGORY_CACHE_TTL = _parse_float_env("CATEGORY_CACHE_TTL", 60.0)
+
+# Быстрая сериализация ответов: готовый JSON из TypeAdapter вместо
+# response_model + jsonable_encoder. Выключена по умолчанию.
+FAST_JSON_RESPONSES = _parse_bool_env("FAST_JSON_RESPONSES", default=False)
+
+# Максимальное количество строк в одном файле POST /products/import
+PRODUCT_IMPORT_MAX_ROWS = _parse_int_env("PRODUCT_IMPORT_MAX_ROWS", 100000)
+
+# Процессы для генерации миниатюр изображений товаров
+IMAGE_PROCESS_WORKERS = _parse_int_env("IMAGE_PROCESS_WORKERS", 2)
+
+# Хранилище изображений товаров: local — каталог media/products, s3 — S3-совместимый бакет.
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "local").strip().lower()
+# Публичный адрес бакета (или CDN перед ним), из которого строятся URL изображений при s3
+MEDIA_PUBLIC_URL = os.getenv("MEDIA_PUBLIC_URL")
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_PREFIX = os.getenv("S3_PREFIX", "products/")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_REGION = os.getenv("S3_REGION")
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID")
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY")
+
+# Раздача /media: static — StaticFiles в приложении, accel — приложение только проверяет путь,
+# а файл отдаёт nginx из internal-локации MEDIA_ACCEL_PREFIX (X-Accel-Redirect).
+# Контейнер nginx должен получить то же значение (docs/MEDIA_SERVING.md).
+MEDIA_SERVE_MODE = os.getenv("MEDIA_SERVE_MODE", "static").strip().lower()
+if MEDIA_SERVE_MODE not in {"static", "accel"}:
+    raise RuntimeError("MEDIA_SERVE_MODE must be 'static' or 'accel'")
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/internal-media").rstrip("/")
+
+# Кэш пользователей get_current_user в памяти воркера. 0 — кэш выключен.
+USER_CACHE_TTL = _parse_float_env("USER_CACHE_TTL", 30.0)
+USER_CACHE_SIZE = _parse_int_env("USER_CACHE_SIZE", 10000)
+# local — сброс только в текущем воркере, redis — рассылка сброса всем воркерам через pub/sub.
+# Деактивация и смена роли — python -m app.user_cache; при local (и после UPDATE users в обход
+# команды) воркеры узнают о них только по истечении кэшей, см. docstring app.user_cache.main
+USER_CACHE_INVALIDATION = os.getenv("USER_CACHE_INVALIDATION", "local").strip().lower()
+if USER_CACHE_INVALIDATION not in {"local", "redis"}:
+    raise RuntimeError("USER_CACHE_INVALIDATION must be 'local' or 'redis'")
+# Как часто воркер перечитывает набор деактивированных пользователей для проверки по claims JWT
+USER_REVOCATION_REFRESH_SECONDS = _parse_float_env("USER_REVOCATION_REFRESH_SECONDS", 30.0)
+# Удаление истёкших refresh-токенов: интервал (секунды, 0 — не запускать) и размер пачки DELETE
+REFRESH_TOKEN_SWEEP_INTERVAL = _parse_float_env("REFRESH_TOKEN_SWEEP_INTERVAL", 3600.0)
+REFRESH_TOKEN_SWEEP_BATCH = _parse_int_env("REFRESH_TOKEN_SWEEP_BATCH", 1000)
+# Сколько секунд повторное предъявление только что использованного refresh-токена
+# (параллельные запросы, повтор после обрыва сети) возвращает уже выданного преемника,
+# а не отзывает цепочку. 0 — любой повтор отзывает цепочку.
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = _parse_float_env("REFRESH_TOKEN_REUSE_GRACE_SECONDS", 10.0)
+# Размер кэшей воркера с использованными jti и отозванными цепочками refresh-токенов
+REFRESH_TOKEN_CACHE_SIZE = _parse_int_env("REFRESH_TOKEN_CACHE_SIZE", 100000)
+
+# Ограничение попыток входа (POST /users/token) token bucket'ами по IP и по email:
+# BURST — ёмкость ведра, PER_MINUTE — скорость пополнения. memory — в памяти воркера,
+# redis — общий счётчик для всех воркеров (REDIS_URL).
+LOGIN_RATE_LIMIT_ENABLED = _parse_bool_env("LOGIN_RATE_LIMIT_ENABLED", default=True)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()
+if RATE_LIMIT_BACKEND not in {"memory", "redis"}:
+    raise RuntimeError("RATE_LIMIT_BACKEND must be 'memory' or 'redis'")
+LOGIN_RATE_LIMIT_IP_BURST = _parse_int_env("LOGIN_RATE_LIMIT_IP_BURST", 20)
+LOGIN_RATE_LIMIT_IP_PER_MINUTE = _parse_float_env("LOGIN_RATE_LIMIT_IP_PER_MINUTE", 10.0)
+LOGIN_RATE_LIMIT_EMAIL_BURST = _parse_int_env("LOGIN_RATE_LIMIT_EMAIL_BURST", 5)
+LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE = _parse_float_env("LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE", 2.0)
+# Сколько дней IP после успешного входа в аккаунт не расходует его ведро email. 0 — выключено
+LOGIN_RATE_LIMIT_KNOWN_CLIENT_DAYS = _parse_float_env("LOGIN_RATE_LIMIT_KNOWN_CLIENT_DAYS", 30.0)
+if LOGIN_RATE_LIMIT_IP_PER_MINUTE <= 0 or LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE <= 0:
+    raise RuntimeError("LOGIN_RATE_LIMIT_*_PER_MINUTE must be positive")
+
+# Пул потоков для bcrypt и предел задач в нём (выполняются + ждут); сверх предела — 503.
+PASSWORD_HASH_WORKERS = _parse_int_env("PASSWORD_HASH_WORKERS", 2)
+PASSWORD_HASH_MAX_PENDING = _parse_int_env("PASSWORD_HASH_MAX_PENDING", 32)
+# Хеши без маркера приложение всегда писало как bcrypt(sha256(password)) и проверяет одним checkpw.
+# true — если в базе есть хеши bcrypt(password), созданные в обход приложения: для хешей
+# без маркера неверный пароль тогда стоит два checkpw
+PASSWORD_LEGACY_RAW_BCRYPT = _parse_bool_env("PASSWORD_LEGACY_RAW_BCRYPT", default=False)
@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from app.config import IMAGE_PROCESS_WORKERS, MEDIA_STORAGE
+from app.media_urls import DERIVATIVE_NAMES, derivative_file_name
+
+# Имя производной (из DERIVATIVE_NAMES) -> максимальная сторона в пикселях
+DERIVATIVES = {"thumb": 200, "medium": 800}
+WEBP_QUALITY = 80
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def derivative_paths(source: Path) -> list[Path]:
+    return [source.with_name(derivative_file_name(source.stem, name)) for name in DERIVATIVE_NAMES]
+
+
+def is_derivative(path: Path) -> bool:
+    return path.suffix == ".webp" and any(path.stem.endswith(f"_{name}") for name in DERIVATIVE_NAMES)
+
+
+def has_derivatives(source: Path) -> bool:
+    return all(target.exists() for target in derivative_paths(source))
+
+
+def originals(media_root: Path) -> list[Path]:
+    return [
+        path for path in sorted(media_root.iterdir())
+        if path.is_file() and not path.name.startswith(".") and not is_derivative(path)
+    ]
+
+
+def _render(source: Path) -> list[str]:
+    from PIL import Image, ImageOps  # только в процессах пула: основному воркеру Pillow не нужен
+
+    written = []
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        for name, max_side in DERIVATIVES.items():
+            derivative = image.copy()
+            derivative.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            target = source.with_name(derivative_file_name(source.stem, name))
+            temp = target.with_name(f".{target.name}.part")
+            derivative.save(temp, "WEBP", quality=WEBP_QUALITY, method=4)
+            os.replace(temp, target)
+            written.append(str(target))
+    return written
+
+
+def render_derivatives(source_path: str) -> list[str]:
+    """
+    Создаёт все производные для файла-оригинала. Выполняется в дочернем процессе:
+    декодирование и ресайз — чистая CPU-работа, которая иначе держала бы GIL воркера.
+    """
+    try:
+        return _render(Path(source_path))
+    except Exception as exc:  # noqa: BLE001
+        # Исключения Pillow в основном процессе не импортируются — отдаём ValueError
+        raise ValueError(f"cannot process image: {exc}") from None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_PROCESS_WORKERS)
+    return _executor
+
+
+async def generate_derivatives(source: Path) -> list[str]:
+    """
+    Генерирует производные в пуле процессов, не блокируя event loop.
+    Ошибка декодирования (файл не является изображением) пробрасывается вызывающему.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), render_derivatives, str(source))
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def backfill(media_root: Path, workers: int, force: bool = False) -> tuple[int, int]:
+    """
+    Создаёт недостающие производные для всех оригиналов в media_root.
+    Одновременно обрабатывается не больше workers файлов. Возвращает (успешно, с ошибкой).
+    """
+    sources = [path for path in originals(media_root) if force or not has_derivatives(path)]
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(render_derivatives, str(path)): path for path in sources}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as exc:  # noqa: BLE001
+                failed += 1
+                print(f"failed: {futures[future].name}: {exc}")
+            else:
+                done += 1
+    return done, failed
+
+
+async def mark_products(urls: list[str], batch_size: int = 1000) -> int:
+    """
+    Отмечает товары с этими image_url как имеющие производные: до этого схема
+    отдаёт вместо thumbnail_url и medium_url URL оригинала. Возвращает число товаров.
+    """
+    from sqlalchemy import update
+
+    from app import product_cache
+    from app.database import async_session_maker
+    from app.models.products import Product as ProductModel
+
+    marked = 0
+    async with async_session_maker() as db:
+        for start in range(0, len(urls), batch_size):
+            result = await db.execute(
+                update(ProductModel)
+                .where(ProductModel.image_url.in_(urls[start:start + batch_size]),
+                       ProductModel.image_derivatives == False)
+                .values(image_derivatives=True)
+                .returning(ProductModel.id, ProductModel.category_id)
+            )
+            rows = result.all()
+            await db.commit()
+            await product_cache.invalidate_products(
+                [row.id for row in rows], {row.category_id for row in rows}
+            )
+            marked += len(rows)
+    return marked
+
+
+def main() -> None:
+    """
+    Бэкфилл производных для уже загруженных изображений:
+    python -m app.images [--workers N] [--force]
+    Обязательный шаг деплоя для каталога с изображениями, загруженными до появления
+    производных; пока он не выполнен, товары отдают URL оригинала.
+    """
+    from app.storage import MEDIA_ROOT, media_storage
+
+    parser = argparse.ArgumentParser(description="Генерация WebP-производных для загруженных изображений товаров")
+    parser.add_argument("--workers", type=int, default=IMAGE_PROCESS_WORKERS, help="Количество процессов")
+    parser.add_argument("--force", action="store_true", help="Пересоздать уже существующие производные")
+    args = parser.parse_args()
+    # Бэкфилл читает и пишет файлы в MEDIA_ROOT; в S3 оригиналов там нет
+    if MEDIA_STORAGE != "local":
+        parser.error(f"backfill supports only MEDIA_STORAGE=local, got {MEDIA_STORAGE!r}")
+
+    done, failed = backfill(MEDIA_ROOT, max(args.workers, 1), args.force)
+    print(f"derivatives generated for {done} images, {failed} failed")
+    urls = [media_storage.url(path.name) for path in originals(MEDIA_ROOT) if has_derivatives(path)]
+    print(f"products marked as having derivatives: {asyncio.run(mark_products(urls))}")
+
+
+if __name__ == "__main__":
+    main()
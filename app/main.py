@@ -1,20 +1,23 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi import Request
 from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
 from loguru import logger
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from uuid import uuid4
 
 from app import models  # noqa: F401
-from app.config import AUTO_CREATE_TABLES, TRUSTED_PROXY_IPS
+from app import images, metrics, refresh_tokens, user_cache
+from app.config import AUTO_CREATE_TABLES, LOG_FILE, MEDIA_SERVE_MODE, METRICS_ENABLED, TRUSTED_PROXY_IPS
 from app.database import Base, async_engine
-from app.routers import cart, categories, orders, payments, products, reviews, users
+from app.routers import cart, categories, media, orders, payments, products, reviews, users
+from app.storage import MediaStaticFiles
 
 
-logger.add("info.log", format="Log: [{extra[log_id]}:{time} - {level} - {message}]", level="INFO", enqueue = True)
+if LOG_FILE:
+    logger.add(LOG_FILE, format="Log: [{extra[log_id]}:{time} - {level} - {message}]", level="INFO", enqueue = True)
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
@@ -22,7 +25,14 @@ async def lifespan(_: FastAPI):
         # Optional for local dev only. In production use Alembic migrations.
         async with async_engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+    invalidation_listener = asyncio.create_task(user_cache.listen_for_invalidations())
+    deactivated_refresher = asyncio.create_task(user_cache.run_deactivated_refresher())
+    refresh_token_sweeper = asyncio.create_task(refresh_tokens.run_sweeper())
     yield
+    invalidation_listener.cancel()
+    deactivated_refresher.cancel()
+    refresh_token_sweeper.cancel()
+    images.shutdown_executor()
 
 
 app = FastAPI(
@@ -57,9 +67,24 @@ app.include_router(cart.router)
 app.include_router(orders.router)
 app.include_router(payments.router)
 
-app.mount("/media", StaticFiles(directory="media"), name="media")
+if MEDIA_SERVE_MODE == "accel":
+    # Байты отдаёт nginx (internal-локация /internal-media/), приложение только проверяет путь
+    app.include_router(media.router)
+else:
+    app.mount("/media", MediaStaticFiles(directory="media"), name="media")
 
 
 @app.get("/")
 async def root():
     return {"message": "Добро пожаловать в API интернет-магазина!"}
+
+
+async def get_metrics():
+    """
+    Счётчики текущего воркера (попадания/промахи кэшей и т.п.).
+    """
+    return metrics.snapshot()
+
+
+if METRICS_ENABLED:
+    app.add_api_route("/metrics", get_metrics, methods=["GET"])
@@ -0,0 +1,23 @@
+"""
+Имена и URL производных изображений товаров. Только строковые операции и никаких
+импортов приложения: модуль нужен ORM-модели, которой незачем тянуть конфигурацию
+и пул процессов из app.images.
+"""
+
+# Производные, которые создаются для каждого оригинала (размеры — в app.images)
+DERIVATIVE_NAMES = ("thumb", "medium")
+
+
+def derivative_file_name(stem: str, name: str) -> str:
+    return f"{stem}_{name}.webp"
+
+
+def derivative_url(image_url: str | None, name: str) -> str | None:
+    """
+    URL производной по URL оригинала: /media/products/<id>.png -> /media/products/<id>_thumb.webp.
+    """
+    if not image_url:
+        return None
+    directory, _, file_name = image_url.rpartition("/")
+    stem = file_name.rpartition(".")[0] or file_name
+    return f"{directory}/{derivative_file_name(stem, name)}"
@@ -0,0 +1,21 @@
+from collections import defaultdict
+
+
+# Счётчики и gauge-метрики текущего воркера (каждый процесс gunicorn считает отдельно)
+_counters: defaultdict[str, float] = defaultdict(float)
+_gauges: dict[str, float] = {}
+
+
+def increment(name: str, value: float = 1) -> None:
+    _counters[name] += value
+
+
+def set_gauge(name: str, value: float) -> None:
+    _gauges[name] = value
+
+
+def snapshot() -> dict[str, float]:
+    """
+    Возвращает текущие значения всех метрик воркера.
+    """
+    return {**_counters, **_gauges}
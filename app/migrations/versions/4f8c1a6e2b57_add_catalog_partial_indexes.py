@@ -0,0 +1,77 @@
+"""add catalog partial indexes
+
+Revision ID: 4f8c1a6e2b57
+Revises: e5a90d4b7c18
+Create Date: 2026-10-18 12:26:14.448102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f8c1a6e2b57'
+down_revision: Union[str, Sequence[str], None] = 'e5a90d4b7c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя индекса, колонки, условие частичного индекса).
+# Индексы по цене обслуживают диапазон цен, но не сортировку по id внутри него.
+CATALOG_INDEXES = (
+    ('ix_products_active_id', ['id'], 'is_active'),
+    ('ix_products_active_category_id', ['category_id', 'id'], 'is_active'),
+    ('ix_products_active_seller_id', ['seller_id', 'id'], 'is_active'),
+    ('ix_products_active_price', ['price', 'id'], 'is_active'),
+    ('ix_products_active_category_price', ['category_id', 'price'], 'is_active'),
+    ('ix_products_in_stock_id', ['id'], 'is_active AND stock > 0'),
+    ('ix_products_in_stock_category_id', ['category_id', 'id'], 'is_active AND stock > 0'),
+)
+
+
+def _drop_invalid_index(name: str, table: str) -> None:
+    """
+    Удаляет индекс name, если он остался INVALID после прерванного CREATE INDEX CONCURRENTLY:
+    if_not_exists=True иначе молча оставил бы нерабочий индекс.
+    """
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid"
+            " WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace"
+            " AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, columns, where in CATALOG_INDEXES:
+            _drop_invalid_index(name, 'products')
+            op.create_index(
+                name,
+                'products',
+                columns,
+                unique=False,
+                postgresql_where=sa.text(where),
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(CATALOG_INDEXES):
+            op.drop_index(
+                name,
+                table_name='products',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
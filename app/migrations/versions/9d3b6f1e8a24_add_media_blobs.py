@@ -0,0 +1,33 @@
+"""add media blobs
+
+Revision ID: 9d3b6f1e8a24
+Revises: 4f8c1a6e2b57
+Create Date: 2026-10-18 14:02:37.519204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b6f1e8a24'
+down_revision: Union[str, Sequence[str], None] = '4f8c1a6e2b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('media_blobs',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('refcount', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('media_blobs')
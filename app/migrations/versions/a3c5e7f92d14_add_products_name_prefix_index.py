@@ -0,0 +1,62 @@
+"""add products name prefix index
+
+Revision ID: a3c5e7f92d14
+Revises: f4a8c1d2e6b7
+Create Date: 2026-10-18 21:05:37.481920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7f92d14'
+down_revision: Union[str, Sequence[str], None] = 'f4a8c1d2e6b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _drop_invalid_index(name: str, table: str) -> None:
+    """
+    Удаляет индекс name, если он остался INVALID после прерванного CREATE INDEX CONCURRENTLY:
+    if_not_exists=True иначе молча оставил бы нерабочий индекс.
+    """
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid"
+            " WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace"
+            " AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY не блокирует запись в products, но не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        _drop_invalid_index('ix_products_name_prefix', 'products')
+        op.create_index(
+            'ix_products_name_prefix',
+            'products',
+            [sa.text('(lower(name) COLLATE "C")')],
+            unique=False,
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_products_name_prefix',
+            table_name='products',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
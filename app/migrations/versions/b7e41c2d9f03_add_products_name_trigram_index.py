@@ -0,0 +1,65 @@
+"""add products name trigram index
+
+Revision ID: b7e41c2d9f03
+Revises: 3c42ff3ea321
+Create Date: 2026-10-18 10:12:40.215634
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e41c2d9f03'
+down_revision: Union[str, Sequence[str], None] = '3c42ff3ea321'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _drop_invalid_index(name: str, table: str) -> None:
+    """
+    Удаляет индекс name, если он остался INVALID после прерванного CREATE INDEX CONCURRENTLY:
+    if_not_exists=True иначе молча оставил бы нерабочий индекс.
+    """
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid"
+            " WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace"
+            " AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CREATE INDEX CONCURRENTLY не блокирует запись в products, но не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        _drop_invalid_index('ix_products_name_trgm', 'products')
+        op.create_index(
+            'ix_products_name_trgm',
+            'products',
+            ['name'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Расширение pg_trgm не удаляем: им могут пользоваться другие объекты базы
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_products_name_trgm',
+            table_name='products',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,38 @@
+"""add product image_derivatives flag
+
+Revision ID: b9e2c4d7f310
+Revises: d6b2f8a41c93
+Create Date: 2026-10-18 12:40:11.482093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e2c4d7f310'
+down_revision: Union[str, Sequence[str], None] = 'd6b2f8a41c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Константный default — без перезаписи таблицы. Существующие товары получат
+    # true после бэкфилла производных (python -m app.images)
+    op.add_column(
+        "products",
+        sa.Column(
+            "image_derivatives",
+            sa.Boolean(),
+            nullable=False,
+            server_default=sa.text("false"),
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("products", "image_derivatives")
@@ -0,0 +1,62 @@
+"""add users inactive index
+
+Revision ID: c2d7a9f41b6e
+Revises: 9d3b6f1e8a24
+Create Date: 2026-10-18 16:42:08.215934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d7a9f41b6e'
+down_revision: Union[str, Sequence[str], None] = '9d3b6f1e8a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _drop_invalid_index(name: str, table: str) -> None:
+    """
+    Удаляет индекс name, если он остался INVALID после прерванного CREATE INDEX CONCURRENTLY:
+    if_not_exists=True иначе молча оставил бы нерабочий индекс.
+    """
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid"
+            " WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace"
+            " AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        _drop_invalid_index('ix_users_inactive_id', 'users')
+        op.create_index(
+            'ix_users_inactive_id',
+            'users',
+            ['id'],
+            unique=False,
+            postgresql_where=sa.text('NOT is_active'),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_users_inactive_id',
+            table_name='users',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
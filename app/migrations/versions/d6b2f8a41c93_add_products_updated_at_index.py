@@ -0,0 +1,61 @@
+"""add products updated_at index
+
+Revision ID: d6b2f8a41c93
+Revises: a3c5e7f92d14
+Create Date: 2026-10-18 23:14:52.907311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6b2f8a41c93'
+down_revision: Union[str, Sequence[str], None] = 'a3c5e7f92d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _drop_invalid_index(name: str, table: str) -> None:
+    """
+    Удаляет индекс name, если он остался INVALID после прерванного CREATE INDEX CONCURRENTLY:
+    if_not_exists=True иначе молча оставил бы нерабочий индекс.
+    """
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid"
+            " WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace"
+            " AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY не блокирует запись в products, но не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        _drop_invalid_index('ix_products_updated_at', 'products')
+        op.create_index(
+            'ix_products_updated_at',
+            'products',
+            ['updated_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_products_updated_at',
+            table_name='products',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
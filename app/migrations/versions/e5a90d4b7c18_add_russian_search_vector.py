@@ -0,0 +1,45 @@
+"""add russian search vector
+
+Revision ID: e5a90d4b7c18
+Revises: b7e41c2d9f03
+Create Date: 2026-10-18 11:03:52.907311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a90d4b7c18'
+down_revision: Union[str, Sequence[str], None] = 'b7e41c2d9f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('tsv_ru', postgresql.TSVECTOR(), sa.Computed("\n            setweight(to_tsvector('russian', coalesce(name, '')), 'A')\n            || \n            setweight(to_tsvector('russian', coalesce(description, '')), 'B')\n            ", persisted=True), nullable=False))
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_products_tsv_ru_gin',
+            'products',
+            ['tsv_ru'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_products_tsv_ru_gin',
+            table_name='products',
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('products', 'tsv_ru')
@@ -0,0 +1,28 @@
+"""add refresh token successor
+
+Revision ID: f4a8c1d2e6b7
+Revises: e81f4b3c7a95
+Create Date: 2026-10-18 21:04:12.318506
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a8c1d2e6b7'
+down_revision: Union[str, Sequence[str], None] = 'e81f4b3c7a95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('replaced_by', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('refresh_tokens', 'replaced_by')
@@ -1,10 +1,12 @@
 from .categories import Category
 from .cart_items import CartItem
+from .media_blobs import MediaBlob
 from .order_items import OrderItem
 from .orders import Order
 from .products import Product
+from .refresh_tokens import RefreshToken
 from .reviews import Review
 from .users import User
 
 
-__all__ = ["Category", "CartItem", "Order", "OrderItem", "Product", "Review", "User"]
+__all__ = ["Category", "CartItem", "MediaBlob", "Order", "OrderItem", "Product", "RefreshToken", "Review", "User"]
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class MediaBlob(Base):
+    """
+    Файл изображения, адресуемый хешем содержимого, и число товаров, которые на него ссылаются.
+    """
+    __tablename__ = "media_blobs"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    refcount: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
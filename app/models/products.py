@@ -18,6 +18,7 @@ from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
+from app.media_urls import derivative_url
 
 
 class Product(Base):
@@ -28,6 +29,11 @@ class Product(Base):
     description: Mapped[str | None] = mapped_column(String(500), nullable=True)
     price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
     image_url: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    # Созданы ли для image_url WebP-производные: при загрузке — сразу, для старых
+    # изображений — после бэкфилла python -m app.images
+    image_derivatives: Mapped[bool] = mapped_column(
+        Boolean, default=False, nullable=False, server_default=text("false"),
+    )
     stock: Mapped[int] = mapped_column(Integer, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), nullable=False)
@@ -50,6 +56,7 @@ class Product(Base):
         nullable=False,
     )
 
+    # Поисковые векторы нужны только в WHERE/ORDER BY, поэтому не грузим их вместе с товаром
     tsv: Mapped[TSVECTOR] = mapped_column(
         TSVECTOR,
         Computed(
@@ -61,6 +68,20 @@ class Product(Base):
             persisted=True,
         ),
         nullable=False,
+        deferred=True,
+    )
+    tsv_ru: Mapped[TSVECTOR] = mapped_column(
+        TSVECTOR,
+        Computed(
+            """
+            setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+            || 
+            setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+            """,
+            persisted=True,
+        ),
+        nullable=False,
+        deferred=True,
     )
 
     category: Mapped["Category"] = relationship("Category", back_populates="products")
@@ -68,7 +89,47 @@ class Product(Base):
     cart_items: Mapped[list["CartItem"]] = relationship("CartItem", back_populates="product", cascade="all, delete-orphan")
     order_items: Mapped[list["OrderItem"]] = relationship("OrderItem", back_populates="product")
 
+    # URL производных изображения: схема Product читает их как обычные атрибуты.
+    # Пока производных нет, отдаём оригинал — он больше, но не 404
+    @property
+    def thumbnail_url(self) -> str | None:
+        if not self.image_derivatives:
+            return self.image_url
+        return derivative_url(self.image_url, "thumb")
+
+    @property
+    def medium_url(self) -> str | None:
+        if not self.image_derivatives:
+            return self.image_url
+        return derivative_url(self.image_url, "medium")
+
 
     __table_args__ = (
         Index("ix_products_tsv_gin", "tsv", postgresql_using="gin"),
+        Index("ix_products_tsv_ru_gin", "tsv_ru", postgresql_using="gin"),
+        # Частичные индексы под фильтры и сортировку каталога (только активные товары)
+        Index("ix_products_active_id", "id", postgresql_where=text("is_active")),
+        Index("ix_products_active_category_id", "category_id", "id", postgresql_where=text("is_active")),
+        Index("ix_products_active_seller_id", "seller_id", "id", postgresql_where=text("is_active")),
+        # Индексы по цене обслуживают только диапазон цен: сортировку по id внутри
+        # диапазона они не дают, планировщик досортировывает найденные строки
+        Index("ix_products_active_price", "price", "id", postgresql_where=text("is_active")),
+        Index("ix_products_active_category_price", "category_id", "price", postgresql_where=text("is_active")),
+        Index("ix_products_in_stock_id", "id", postgresql_where=text("is_active AND stock > 0")),
+        Index(
+            "ix_products_in_stock_category_id",
+            "category_id",
+            "id",
+            postgresql_where=text("is_active AND stock > 0"),
+        ),
+        Index(
+            "ix_products_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        # max(updated_at) — валидатор списков товаров для условного GET
+        Index("ix_products_updated_at", "updated_at"),
+        # Подсказки по началу названия: диапазон и порядок по lower(name) в порядке байтов
+        Index("ix_products_name_prefix", text('(lower(name) COLLATE "C")'), postgresql_where=text("is_active")),
     )
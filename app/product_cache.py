@@ -0,0 +1,176 @@
+import hashlib
+import json
+from collections.abc import Iterable
+from datetime import datetime
+from typing import NamedTuple
+
+from app import metrics
+from app.cache import create_cache_backend
+from app.config import PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL
+
+
+# Теги записей кэша каталога:
+#   product:{id}   — любая запись, в которой есть этот товар
+#   category:{id}  — списки, отфильтрованные по категории
+#   products:list  — списки без фильтра по категории (в них может попасть любой товар)
+#   categories:tree — списки по поддереву категории (зависят от структуры дерева)
+LIST_TAG = "products:list"
+CATEGORY_TREE_TAG = "categories:tree"
+
+
+
+class ProductDocument(NamedTuple):
+    """
+    Готовый JSON карточки товара и его версия (updated_at на момент сериализации).
+    """
+    updated_at: datetime
+    body: bytes
+
+
+class ListDocument(NamedTuple):
+    """
+    Готовый JSON списка товаров и ETag, посчитанный перед его выборкой: валидатор
+    хранится вместе с телом, поэтому 304 и закэшированный ответ всегда согласованы.
+    """
+    etag: str
+    body: bytes
+
+
+_backend = create_cache_backend(PRODUCT_CACHE_SIZE) if PRODUCT_CACHE_TTL > 0 else None
+
+
+def product_tag(product_id: int) -> str:
+    return f"product:{product_id}"
+
+
+def category_tag(category_id: int) -> str:
+    return f"category:{category_id}"
+
+
+def product_key(product_id: int) -> str:
+    return f"products:item:{product_id}"
+
+
+def category_products_key(category_id: int, include_descendants: bool = False) -> str:
+    suffix = ":tree" if include_descendants else ""
+    return f"products:category:{category_id}{suffix}"
+
+
+def list_key(params: dict) -> str:
+    """
+    Ключ списка товаров по нормализованным параметрам запроса.
+    """
+    raw = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return "products:list:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def get(key: str) -> bytes | None:
+    if _backend is None:
+        return None
+    value = await _backend.get(key)
+    metrics.increment("product_cache_hits_total" if value is not None else "product_cache_misses_total")
+    return value
+
+
+async def get_many(keys: list[str]) -> list[bytes | None]:
+    if _backend is None:
+        return [None] * len(keys)
+    values = await _backend.get_many(keys)
+    hits = sum(value is not None for value in values)
+    metrics.increment("product_cache_hits_total", hits)
+    metrics.increment("product_cache_misses_total", len(values) - hits)
+    return values
+
+
+async def store(key: str, body: bytes, tags: Iterable[str]) -> None:
+    if _backend is None:
+        return
+    await _backend.set(key, body, PRODUCT_CACHE_TTL, tags)
+
+
+def _pack_document(document: ProductDocument) -> bytes:
+    # Версия и тело в одном значении: "<updated_at ISO>\n<JSON>" (в компактном JSON нет переводов строк)
+    return document.updated_at.isoformat().encode("ascii") + b"\n" + document.body
+
+
+def _unpack_document(value: bytes | None) -> ProductDocument | None:
+    if value is None:
+        return None
+    stamp, _, body = value.partition(b"\n")
+    try:
+        return ProductDocument(datetime.fromisoformat(stamp.decode("ascii")), body)
+    except ValueError:
+        return None
+
+
+async def get_document(product_id: int) -> ProductDocument | None:
+    """
+    Карточка товара из кэша: отдаётся без обращения к базе и ORM.
+    """
+    return _unpack_document(await get(product_key(product_id)))
+
+
+async def get_documents(product_ids: list[int]) -> list[ProductDocument | None]:
+    values = await get_many([product_key(product_id) for product_id in product_ids])
+    return [_unpack_document(value) for value in values]
+
+
+async def store_document(product_id: int, document: ProductDocument) -> None:
+    await store(product_key(product_id), _pack_document(document), [product_tag(product_id)])
+
+
+def _pack_list(document: ListDocument) -> bytes:
+    # Как у карточек: "<ETag>\n<JSON>"
+    return document.etag.encode("ascii") + b"\n" + document.body
+
+
+def _unpack_list(value: bytes | None) -> ListDocument | None:
+    if value is None:
+        return None
+    etag, _, body = value.partition(b"\n")
+    # Значение старого формата (только JSON) считаем промахом
+    if not etag.endswith(b'"') or not body:
+        return None
+    return ListDocument(etag.decode("ascii"), body)
+
+
+async def get_list(key: str) -> ListDocument | None:
+    return _unpack_list(await get(key))
+
+
+async def store_list(key: str, document: ListDocument, tags: Iterable[str]) -> None:
+    await store(key, _pack_list(document), tags)
+
+
+async def invalidate(tags: Iterable[str]) -> None:
+    if _backend is None:
+        return
+    metrics.increment("product_cache_invalidations_total")
+    await _backend.invalidate_tags(tags)
+
+
+async def invalidate_product(product_id: int, *category_ids: int) -> None:
+    """
+    Сбрасывает записи с товаром и списки, в которые он мог попасть или из которых выпасть.
+    Без category_ids сбрасываются только записи, где товар уже есть (например, смена рейтинга).
+    """
+    tags = {product_tag(product_id)}
+    if category_ids:
+        tags.add(LIST_TAG)
+        tags.update(category_tag(category_id) for category_id in category_ids)
+    await invalidate(tags)
+
+
+async def invalidate_products(product_ids: Iterable[int], category_ids: Iterable[int] = ()) -> None:
+    """
+    Сбрасывает записи с указанными товарами одним вызовом (например, после списания остатков
+    при оформлении заказа). С category_ids — как invalidate_product: ещё и списки, в которые
+    товары могли попасть или из которых выпасть.
+    """
+    tags = {product_tag(product_id) for product_id in product_ids}
+    category_tags = {category_tag(category_id) for category_id in category_ids}
+    if category_tags:
+        tags.add(LIST_TAG)
+        tags.update(category_tags)
+    if tags:
+        await invalidate(tags)
@@ -0,0 +1,128 @@
+import codecs
+import csv
+import json
+from collections.abc import Iterator
+from decimal import Decimal
+from typing import BinaryIO
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas import ProductCreate, ProductImportError
+
+# Столбцы staging-таблицы в порядке записей COPY
+IMPORT_COLUMNS = ("name", "description", "price", "stock", "category_id")
+# Предел numeric(10, 2) для products.price: иначе COPY упадёт целиком
+MAX_PRICE = Decimal("100000000")
+# Предел integer для products.stock — по той же причине
+MAX_STOCK = 2_147_483_647
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportFileError(ValueError):
+    """
+    Файл импорта нельзя обработать целиком (кодировка, формат, размер).
+    """
+
+
+def _iter_csv(file: BinaryIO) -> Iterator[tuple[int, dict | None, str | None]]:
+    reader = csv.DictReader(codecs.getreader("utf-8-sig")(file))
+    for row in reader:
+        # Пустые ячейки CSV — отсутствующие значения (description: None)
+        yield reader.line_num, {key: value or None for key, value in row.items() if key}, None
+
+
+def _iter_ndjson(file: BinaryIO) -> Iterator[tuple[int, dict | None, str | None]]:
+    for line_num, raw in enumerate(file, start=1):
+        if not raw.strip():
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError as exc:
+            yield line_num, None, f"invalid JSON: {exc}"
+            continue
+        if not isinstance(data, dict):
+            yield line_num, None, "expected a JSON object"
+            continue
+        yield line_num, data, None
+
+
+def parse_import_file(
+    file: BinaryIO,
+    import_format: str,
+    category_ids: set[int],
+    max_rows: int,
+) -> tuple[list[tuple], int, list[ProductImportError]]:
+    """
+    Читает и валидирует файл импорта (синхронно — вызывается в пуле потоков).
+    Возвращает записи для COPY, число отклонённых строк и первые MAX_REPORTED_ERRORS ошибок.
+    """
+    try:
+        return _parse_rows(_iter_csv(file) if import_format == "csv" else _iter_ndjson(file), category_ids, max_rows)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFileError(f"Invalid {import_format} file: {exc}") from exc
+
+
+def _parse_rows(rows, category_ids: set[int], max_rows: int) -> tuple[list[tuple], int, list[ProductImportError]]:
+    records: list[tuple] = []
+    failed = 0
+    errors: list[ProductImportError] = []
+
+    for count, (line, data, parse_error) in enumerate(rows, start=1):
+        if count > max_rows:
+            raise ImportFileError(f"Too many rows, maximum is {max_rows}")
+
+        messages = [parse_error] if parse_error else []
+        if data is not None:
+            try:
+                product = ProductCreate.model_validate(data)
+            except ValidationError as exc:
+                messages = [
+                    f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}" for error in exc.errors()
+                ]
+            else:
+                if product.category_id not in category_ids:
+                    messages.append("category_id: category not found or inactive")
+                if product.price >= MAX_PRICE:
+                    messages.append(f"price: must be less than {MAX_PRICE}")
+                if product.stock > MAX_STOCK:
+                    messages.append(f"stock: must be less than or equal to {MAX_STOCK}")
+                if not messages:
+                    records.append(
+                        (product.name, product.description, product.price, product.stock, product.category_id)
+                    )
+
+        if messages:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(ProductImportError(line=line, errors=messages))
+
+    return records, failed, errors
+
+
+async def copy_products(db: AsyncSession, seller_id: int, records: list[tuple]) -> int:
+    """
+    Загружает записи через COPY во временную staging-таблицу и переносит их
+    в products одним INSERT ... SELECT. Коммит — на вызывающей стороне.
+    """
+    await db.execute(text(
+        "CREATE TEMP TABLE product_import ("
+        " name varchar(100), description varchar(500), price numeric(10, 2),"
+        " stock integer, category_id integer"
+        ") ON COMMIT DROP"
+    ))
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    # COPY доступен только в драйвере asyncpg; соединение и транзакция — те же, что у сессии
+    await raw_connection.driver_connection.copy_records_to_table(
+        "product_import", records=records, columns=IMPORT_COLUMNS
+    )
+    result = await db.execute(
+        text(
+            "INSERT INTO products (name, description, price, stock, category_id, seller_id, is_active)"
+            " SELECT name, description, price, stock, category_id, :seller_id, true FROM product_import"
+        ),
+        {"seller_id": seller_id},
+    )
+    return result.rowcount
@@ -0,0 +1,202 @@
+import hashlib
+import math
+import time
+from abc import ABC, abstractmethod
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from loguru import logger
+
+from app import metrics
+from app.cache import TTLCache
+from app.client_ip import get_client_ip
+from app.config import (
+    LOGIN_RATE_LIMIT_EMAIL_BURST,
+    LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE,
+    LOGIN_RATE_LIMIT_ENABLED,
+    LOGIN_RATE_LIMIT_IP_BURST,
+    LOGIN_RATE_LIMIT_IP_PER_MINUTE,
+    LOGIN_RATE_LIMIT_KNOWN_CLIENT_DAYS,
+    RATE_LIMIT_BACKEND,
+    REDIS_URL,
+)
+
+# Token bucket целиком на стороне Redis: чтение, пополнение и списание атомарны
+# для всех воркеров. Время берётся из Redis, чтобы не зависеть от часов воркеров.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(retry_after)
+"""
+
+
+class RateLimiter(ABC):
+    """
+    Набор token bucket'ов по ключам. acquire списывает один токен и возвращает 0,
+    либо, если ведро пусто, — через сколько секунд появится следующий токен.
+    remember и is_remembered — отметки с TTL в том же хранилище (например, клиенты,
+    уже входившие в аккаунт).
+    """
+
+    @abstractmethod
+    async def acquire(self, key: str, capacity: int, refill_per_second: float) -> float:
+        ...
+
+    @abstractmethod
+    async def remember(self, key: str, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def is_remembered(self, key: str) -> bool:
+        ...
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Вёдра в памяти воркера. Ведро, не трогавшееся дольше полного пополнения, снова полное,
+    поэтому запись живёт capacity / rate секунд, а LRU ограничивает память при переборе ключей.
+    """
+
+    def __init__(self, maxsize: int = 100000) -> None:
+        self._buckets = TTLCache(ttl=0, maxsize=maxsize)
+        self._remembered = TTLCache(ttl=0, maxsize=maxsize)
+
+    async def acquire(self, key: str, capacity: int, refill_per_second: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / refill_per_second
+        self._buckets.set(key, (tokens, now), ttl=capacity / refill_per_second)
+        return retry_after
+
+    async def remember(self, key: str, ttl: float) -> None:
+        self._remembered.set(key, True, ttl=ttl)
+
+    async def is_remembered(self, key: str) -> bool:
+        return key in self._remembered
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Общие для всех воркеров вёдра в Redis (скрипт TOKEN_BUCKET_LUA).
+    Принимает готовый клиент redis.asyncio — в тестах его можно заменить совместимой заглушкой.
+    Ошибки Redis не блокируют вход: запрос пропускается, остаётся admission control пула bcrypt.
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit:") -> None:
+        self._client = client
+        self._script = client.register_script(TOKEN_BUCKET_LUA)
+        self._prefix = prefix
+
+    async def acquire(self, key: str, capacity: int, refill_per_second: float) -> float:
+        try:
+            result = await self._script(keys=[self._prefix + key], args=[capacity, refill_per_second])
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis rate limit check failed: {exc}")
+            return 0.0
+        return float(result)
+
+    async def remember(self, key: str, ttl: float) -> None:
+        try:
+            await self._client.set(self._prefix + key, 1, px=max(int(ttl * 1000), 1))
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis rate limit mark failed: {exc}")
+
+    async def is_remembered(self, key: str) -> bool:
+        try:
+            return bool(await self._client.exists(self._prefix + key))
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis rate limit mark check failed: {exc}")
+            return False
+
+
+def create_rate_limiter() -> RateLimiter:
+    """
+    Создаёт ограничитель по настройке RATE_LIMIT_BACKEND ("memory" или "redis").
+    """
+    if RATE_LIMIT_BACKEND == "redis":
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        if not REDIS_URL:
+            raise RuntimeError("REDIS_URL is not set. It is required for RATE_LIMIT_BACKEND=redis")
+        return RedisRateLimiter(redis_asyncio.from_url(REDIS_URL))
+    return InMemoryRateLimiter()
+
+
+rate_limiter = create_rate_limiter()
+
+
+def _too_many_requests(retry_after: float) -> HTTPException:
+    metrics.increment("login_rate_limited_total")
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many login attempts, try again later",
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+    )
+
+
+def _email_hash(username: str) -> str:
+    # В ключах хеш, а не сам email: ключи Redis не должны содержать персональных данных
+    return hashlib.sha256(username.strip().lower().encode("utf-8")).hexdigest()[:32]
+
+
+def _known_client_key(email_hash: str, client_ip: str) -> str:
+    return "login:known:" + hashlib.sha256(f"{email_hash}:{client_ip}".encode("utf-8")).hexdigest()[:32]
+
+
+async def limit_login_attempts(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+    """
+    Зависимость POST /users/token: проверяет вёдра IP и email до запроса к базе и bcrypt.
+    Сначала IP — так перебор паролей с одного адреса не расходует попытки чужих email.
+    Клиент, с которого уже был успешный вход в этот аккаунт, ведро email не расходует:
+    иначе перебор с чужих адресов блокировал бы вход самому владельцу.
+    form_data та же, что получит эндпоинт: FastAPI разбирает форму один раз.
+    """
+    if not LOGIN_RATE_LIMIT_ENABLED:
+        return
+    client_ip = get_client_ip(request) or "unknown"
+    retry_after = await rate_limiter.acquire(
+        f"login:ip:{client_ip}", LOGIN_RATE_LIMIT_IP_BURST, LOGIN_RATE_LIMIT_IP_PER_MINUTE / 60
+    )
+    if retry_after:
+        raise _too_many_requests(retry_after)
+    email_hash = _email_hash(form_data.username)
+    if await rate_limiter.is_remembered(_known_client_key(email_hash, client_ip)):
+        return
+    retry_after = await rate_limiter.acquire(
+        f"login:email:{email_hash}", LOGIN_RATE_LIMIT_EMAIL_BURST, LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE / 60
+    )
+    if retry_after:
+        raise _too_many_requests(retry_after)
+
+
+async def remember_successful_login(request: Request, username: str) -> None:
+    """
+    Запоминает клиента после успешного входа на LOGIN_RATE_LIMIT_KNOWN_CLIENT_DAYS.
+    """
+    client_ip = get_client_ip(request)
+    if not LOGIN_RATE_LIMIT_ENABLED or LOGIN_RATE_LIMIT_KNOWN_CLIENT_DAYS <= 0 or client_ip is None:
+        return
+    await rate_limiter.remember(
+        _known_client_key(_email_hash(username), client_ip), LOGIN_RATE_LIMIT_KNOWN_CLIENT_DAYS * 86400
+    )
@@ -0,0 +1,214 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from fastapi import HTTPException, status
+from loguru import logger
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics
+from app.auth import REFRESH_TOKEN_EXPIRE_DAYS, create_refresh_token
+from app.cache import TTLCache
+from app.config import (
+    ALGORITHM,
+    REFRESH_TOKEN_CACHE_SIZE,
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS,
+    REFRESH_TOKEN_SWEEP_BATCH,
+    REFRESH_TOKEN_SWEEP_INTERVAL,
+    SECRET_KEY,
+)
+from app.database import async_session_maker
+from app.models.refresh_tokens import RefreshToken as RefreshTokenModel
+from app.models.users import User as UserModel
+
+_TOKEN_LIFETIME = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600
+# Кэш воркера: уже использованные jti (со временем использования) и отозванные цепочки.
+# Повтор после grace-периода отсекается без запроса к базе (или одним UPDATE отзыва цепочки),
+# записи живут не дольше самих токенов
+_spent_jtis = TTLCache(ttl=_TOKEN_LIFETIME, maxsize=REFRESH_TOKEN_CACHE_SIZE)
+_revoked_families = TTLCache(ttl=_TOKEN_LIFETIME, maxsize=REFRESH_TOKEN_CACHE_SIZE)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def issue_refresh_token(
+    db: AsyncSession,
+    user_id: int,
+    email: str,
+    role: str,
+    family_id: str | None = None,
+    jti: str | None = None,
+) -> str:
+    """
+    Создаёт refresh-токен и его запись в refresh_tokens (коммит — на вызывающей стороне).
+    Без family_id начинается новая цепочка (вход по паролю).
+    """
+    jti = jti or uuid.uuid4().hex
+    family_id = family_id or uuid.uuid4().hex
+    db.add(RefreshTokenModel(
+        jti=jti,
+        family_id=family_id,
+        user_id=user_id,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return create_refresh_token(data={"sub": email, "role": role, "id": user_id, "jti": jti, "fam": family_id})
+
+
+async def _revoke_family(db: AsyncSession, family_id: str, user_id: object) -> None:
+    await db.execute(
+        update(RefreshTokenModel)
+        .where(RefreshTokenModel.family_id == family_id, RefreshTokenModel.revoked == False)
+        .values(revoked=True)
+    )
+    await db.commit()
+    _revoked_families.set(family_id, True)
+    metrics.increment("refresh_token_reuse_total")
+    logger.warning(f"Refresh token reuse detected, family {family_id} of user {user_id} revoked")
+
+
+async def _reissue_successor(db: AsyncSession, successor_jti: str, family_id: str) -> tuple[UserModel, str] | None:
+    """
+    Повтор в grace-периоде: заново подписывает уже выданного преемника, если им ещё
+    не воспользовались. Новой записи не создаётся — в цепочке остаётся один действующий токен.
+    """
+    row = (await db.execute(
+        select(UserModel.id, UserModel.email, UserModel.role)
+        .join(RefreshTokenModel, RefreshTokenModel.user_id == UserModel.id)
+        .where(
+            RefreshTokenModel.jti == successor_jti,
+            RefreshTokenModel.used_at.is_(None),
+            RefreshTokenModel.revoked == False,
+            RefreshTokenModel.expires_at > func.now(),
+            UserModel.is_active == True,
+        )
+    )).first()
+    if row is None:
+        return None
+    metrics.increment("refresh_token_grace_reuse_total")
+    token = create_refresh_token(
+        data={"sub": row.email, "role": row.role, "id": row.id, "jti": successor_jti, "fam": family_id}
+    )
+    return UserModel(id=row.id, email=row.email, role=row.role, is_active=True), token
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> tuple[UserModel, str]:
+    """
+    Принимает refresh-токен и выдаёт следующий в той же цепочке. Токен помечается
+    использованным одним UPDATE по первичному ключу (заодно проверяется активность
+    пользователя). Повтор в течение REFRESH_TOKEN_REUSE_GRACE_SECONDS (параллельные
+    запросы клиента, повтор после обрыва) получает уже выданного преемника; более поздний
+    повтор или повтор после ротации преемника — признак кражи: вся цепочка отзывается.
+    Возвращает (пользователь, новый refresh-токен), коммитит сам.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        raise _credentials_exception()
+    jti = payload.get("jti")
+    family_id = payload.get("fam")
+    # Токены без jti выданы до появления хранилища и отозвать их нельзя — нужен повторный вход
+    if payload.get("token_type") != "refresh" or not isinstance(jti, str) or not isinstance(family_id, str):
+        raise _credentials_exception()
+    if family_id in _revoked_families:
+        raise _credentials_exception()
+    spent_at = _spent_jtis.get(jti)
+    if spent_at is not None and time.monotonic() - spent_at > REFRESH_TOKEN_REUSE_GRACE_SECONDS:
+        await _revoke_family(db, family_id, payload.get("id"))
+        raise _credentials_exception()
+
+    successor_jti = uuid.uuid4().hex
+    row = (await db.execute(
+        update(RefreshTokenModel)
+        .where(
+            RefreshTokenModel.jti == jti,
+            RefreshTokenModel.used_at.is_(None),
+            RefreshTokenModel.revoked == False,
+            RefreshTokenModel.expires_at > func.now(),
+            UserModel.id == RefreshTokenModel.user_id,
+            UserModel.is_active == True,
+        )
+        .values(used_at=func.now(), replaced_by=successor_jti)
+        .returning(UserModel.id, UserModel.email, UserModel.role)
+        .execution_options(synchronize_session=False)
+    )).first()
+
+    if row is None:
+        # Токен не найден, истёк, пользователь неактивен — или токен уже использован.
+        # Grace-период считается по часам базы: used_at ставит она же
+        grace_start = func.now() - timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+        state = (await db.execute(
+            select(
+                RefreshTokenModel.used_at,
+                RefreshTokenModel.revoked,
+                RefreshTokenModel.replaced_by,
+                (RefreshTokenModel.used_at > grace_start).label("in_grace"),
+            ).where(RefreshTokenModel.jti == jti)
+        )).first()
+        if state is None or (state.used_at is None and not state.revoked):
+            raise _credentials_exception()
+        if state.in_grace and not state.revoked and state.replaced_by:
+            reissued = await _reissue_successor(db, state.replaced_by, family_id)
+            if reissued is not None:
+                return reissued
+        await _revoke_family(db, family_id, payload.get("id"))
+        raise _credentials_exception()
+
+    _spent_jtis.set(jti, time.monotonic())
+    new_token = issue_refresh_token(db, row.id, row.email, row.role, family_id, successor_jti)
+    await db.commit()
+    metrics.increment("refresh_token_rotations_total")
+    return UserModel(id=row.id, email=row.email, role=row.role, is_active=True), new_token
+
+
+async def sweep_expired(batch_size: int = REFRESH_TOKEN_SWEEP_BATCH) -> int:
+    """
+    Удаляет истёкшие refresh-токены пачками по batch_size, каждая в своей транзакции,
+    чтобы не держать долгих блокировок. Возвращает число удалённых строк.
+    """
+    total = 0
+    while True:
+        async with async_session_maker() as db:
+            expired = (
+                select(RefreshTokenModel.jti)
+                .where(RefreshTokenModel.expires_at <= func.now())
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                delete(RefreshTokenModel)
+                .where(RefreshTokenModel.jti.in_(expired))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            break
+    if total:
+        metrics.increment("refresh_tokens_swept_total", total)
+    return total
+
+
+async def run_sweeper() -> None:
+    """
+    Фоновая задача (lifespan): раз в REFRESH_TOKEN_SWEEP_INTERVAL удаляет истёкшие токены.
+    """
+    if REFRESH_TOKEN_SWEEP_INTERVAL <= 0:
+        return
+    while True:
+        try:
+            await sweep_expired()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Refresh token sweep failed: {exc}")
+        await asyncio.sleep(REFRESH_TOKEN_SWEEP_INTERVAL)
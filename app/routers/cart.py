@@ -1,10 +1,12 @@
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import delete, select
+from sqlalchemy import delete, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.auth import get_current_user
+from app import serialization
+from app.auth import get_current_user_claims
 from app.db_depends import get_async_db
 from app.models.cart_items import CartItem as CartItemModel
 from app.models.products import Product as ProductModel
@@ -50,7 +52,7 @@ async def _get_cart_item(
 @router.get("/", response_model=CartSchema)
 async def get_cart(
     db: AsyncSession = Depends(get_async_db),
-    current_user: UserModel = Depends(get_current_user),
+    current_user: UserModel = Depends(get_current_user_claims),
 ):
     result = await db.scalars(
         select(CartItemModel)
@@ -68,59 +70,96 @@ async def get_cart(
     )
     total_price_decimal = sum(price_items, Decimal("0.00"))
 
-    return CartSchema(
-        user_id=current_user.id,
-        items=items,
-        total_quantity=total_quantity,
-        total_price=total_price_decimal
+    return serialization.json_response(
+        CartSchema,
+        CartSchema(
+            user_id=current_user.id,
+            items=items,
+            total_quantity=total_quantity,
+            total_price=total_price_decimal
+        ),
+    )
+
+async def _cart_item_with_product(db: AsyncSession, changed) -> dict | None:
+    """
+    Выполняет изменение позиции (CTE с RETURNING id, quantity, product_id) и в том же
+    запросе подтягивает товар. None — ни одна строка не изменилась.
+    """
+    result = await db.execute(
+        select(changed.c.id, changed.c.quantity, ProductModel)
+        .join(ProductModel, ProductModel.id == changed.c.product_id)
     )
+    row = result.first()
+    if row is None:
+        return None
+    return {"id": row.id, "quantity": row.quantity, "product": row.Product}
+
 
 @router.post("/items", response_model=CartItemSchema, status_code=status.HTTP_201_CREATED)
 async def add_item_to_cart(
     payload: CartItemCreate,
     db: AsyncSession = Depends(get_async_db),
-    current_user: UserModel = Depends(get_current_user),
+    current_user: UserModel = Depends(get_current_user_claims),
 ):
-    await _ensure_product_available(db, payload.product_id)
-
-    cart_item = await _get_cart_item(db, current_user.id, payload.product_id)
-    if cart_item:
-        cart_item.quantity += payload.quantity
-    else:
-        cart_item = CartItemModel(
-            user_id=current_user.id,
-            product_id=payload.product_id,
-            quantity=payload.quantity,
+    # Вставка идёт из SELECT по активному товару: нет товара — нет строки.
+    # ON CONFLICT прибавляет количество атомарно, параллельные добавления не теряются
+    upsert = (
+        insert(CartItemModel)
+        .from_select(
+            ["user_id", "product_id", "quantity"],
+            select(literal(current_user.id), ProductModel.id, literal(payload.quantity))
+            .where(ProductModel.id == payload.product_id, ProductModel.is_active == True),
+        )
+    )
+    upsert = upsert.on_conflict_do_update(
+        constraint="uq_cart_items_user_product",
+        set_={
+            "quantity": CartItemModel.quantity + upsert.excluded.quantity,
+            "updated_at": func.now(),
+        },
+    ).returning(CartItemModel.id, CartItemModel.quantity, CartItemModel.product_id)
+
+    cart_item = await _cart_item_with_product(db, upsert.cte("upserted"))
+    if cart_item is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found or inactive",
         )
-        db.add(cart_item)
-
     await db.commit()
-    updated_item = await _get_cart_item(db, current_user.id, payload.product_id)
-    return updated_item
+    return serialization.json_response(CartItemSchema, cart_item, status_code=status.HTTP_201_CREATED)
 
 @router.put("/items/{product_id}", response_model=CartItemSchema)
 async def update_cart_item(
     product_id: int,
     payload: CartItemUpdate,
     db: AsyncSession = Depends(get_async_db),
-    current_user: UserModel = Depends(get_current_user),
+    current_user: UserModel = Depends(get_current_user_claims),
 ):
-    await _ensure_product_available(db, product_id)
+    updated = (
+        update(CartItemModel)
+        .where(
+            CartItemModel.user_id == current_user.id,
+            CartItemModel.product_id == product_id,
+            ProductModel.id == CartItemModel.product_id,
+            ProductModel.is_active == True,
+        )
+        .values(quantity=payload.quantity, updated_at=func.now())
+        .returning(CartItemModel.id, CartItemModel.quantity, CartItemModel.product_id)
+    )
 
-    cart_item = await _get_cart_item(db, current_user.id, product_id)
-    if not cart_item:
+    cart_item = await _cart_item_with_product(db, updated.cte("updated"))
+    if cart_item is None:
+        # Только для выбора текста ошибки: товар недоступен или позиции нет в корзине
+        await _ensure_product_available(db, product_id)
         raise HTTPException(status_code=404, detail="Cart item not found")
-
-    cart_item.quantity = payload.quantity
     await db.commit()
-    updated_item = await _get_cart_item(db, current_user.id, product_id)
-    return updated_item
+    return serialization.json_response(CartItemSchema, cart_item)
 
 @router.delete("/items/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_item_from_cart(
     product_id: int,
     db: AsyncSession = Depends(get_async_db),
-    current_user: UserModel = Depends(get_current_user),
+    current_user: UserModel = Depends(get_current_user_claims),
 ):
     cart_item = await _get_cart_item(db, current_user.id, product_id)
     if not cart_item:
@@ -133,7 +172,7 @@ async def remove_item_from_cart(
 @router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
 async def clear_cart(
     db: AsyncSession = Depends(get_async_db),
-    current_user: UserModel = Depends(get_current_user),
+    current_user: UserModel = Depends(get_current_user_claims),
 ):
     await db.execute(delete(CartItemModel).where(CartItemModel.user_id == current_user.id))
     await db.commit()
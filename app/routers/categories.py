@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, update
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import exists, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import product_cache
+from app.category_tree import get_category_snapshot, invalidate_category_snapshot
+from app import conditional
 from app.models.categories import Category as CategoryModel
-from app.schemas import Category as CategorySchema, CategoryCreate
+from app.schemas import Category as CategorySchema, CategoryCreate, CategoryTreeNode
 from app.db_depends import get_async_db
 
 router = APIRouter(
@@ -11,14 +14,61 @@ router = APIRouter(
     tags = ["categories"],
 )
 
+# Ключ pg_advisory_xact_lock для смены родителя категорий
+CATEGORY_MOVE_LOCK_ID = 7_203_114
+
+
+async def _is_ancestor_or_self(db: AsyncSession, category_id: int, node_id: int) -> bool:
+    """
+    Является ли category_id предком node_id (или им самим). Цепочка предков читается
+    из базы рекурсивным CTE, а не из снимка воркера, который может быть устаревшим.
+    Неактивные категории тоже учитываются: parent_id через них сохраняется.
+    """
+    ancestors = (
+        select(CategoryModel.id, CategoryModel.parent_id)
+        .where(CategoryModel.id == node_id)
+        .cte("ancestors", recursive=True)
+    )
+    # UNION, а не UNION ALL: уже существующий в данных цикл не зациклит запрос
+    ancestors = ancestors.union(
+        select(CategoryModel.id, CategoryModel.parent_id)
+        .join(ancestors, CategoryModel.id == ancestors.c.parent_id)
+    )
+    return bool(await db.scalar(select(exists().where(ancestors.c.id == category_id))))
+
+
 @router.get("/", response_model=list[CategorySchema])
-async def get_all_categories(db: AsyncSession = Depends(get_async_db)):
+async def get_all_categories(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Возвращает список всех активных категорий из снимка в памяти воркера.
+    Тело и ETag строятся из одного снимка, поэтому 304 не прячет более новый список.
+    """
+    snapshot = await get_category_snapshot(db)
+    etag = conditional.make_etag("categories", snapshot.etag)
+    not_modified_response = conditional.not_modified(request, etag)
+    if not_modified_response is not None:
+        return not_modified_response
+    return Response(
+        content=snapshot.list_json,
+        media_type="application/json",
+        headers=conditional.validator_headers(etag),
+    )
+
+@router.get("/tree", response_model=list[CategoryTreeNode])
+async def get_category_tree(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
-    Возвращает список всех активных категорий.
+    Возвращает дерево активных категорий из снимка в памяти воркера.
+    На тёплом кэше база не используется; по If-None-Match отвечает 304.
     """
-    stmt = select(CategoryModel).where(CategoryModel.is_active == True)
-    categories = await db.scalars(stmt)
-    return categories.all()
+    snapshot = await get_category_snapshot(db)
+    not_modified_response = conditional.not_modified(request, snapshot.etag)
+    if not_modified_response is not None:
+        return not_modified_response
+    return Response(
+        content=snapshot.tree_json,
+        media_type="application/json",
+        headers=conditional.validator_headers(snapshot.etag),
+    )
 
 @router.post("/", response_model=CategorySchema, status_code=status.HTTP_201_CREATED)
 async def create_category(category: CategoryCreate, db: AsyncSession = Depends(get_async_db)):
@@ -39,6 +89,8 @@ async def create_category(category: CategoryCreate, db: AsyncSession = Depends(g
     db.add(db_category)
     await db.commit()
     await db.refresh(db_category)
+    invalidate_category_snapshot()
+    await product_cache.invalidate([product_cache.CATEGORY_TREE_TAG])
     return db_category
 
 @router.put("/{category_id}", response_model=CategorySchema)
@@ -64,6 +116,13 @@ async def update_category(category_id: int, category: CategoryCreate, db: AsyncS
             raise HTTPException(status_code=400, detail="Parent category not found")
         if parent.id == category_id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Category cannot be its own parent")
+        if parent.id != db_category.parent_id:
+            # Перемещения сериализуются блокировкой до конца транзакции: иначе два встречных
+            # перемещения пройдут проверку одновременно и вместе образуют цикл
+            await db.execute(select(func.pg_advisory_xact_lock(CATEGORY_MOVE_LOCK_ID)))
+            if await _is_ancestor_or_self(db, category_id, parent.id):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail="Category cannot be moved under its own subcategory")
     
     # Обновление категории
     await db.execute(
@@ -72,6 +131,8 @@ async def update_category(category_id: int, category: CategoryCreate, db: AsyncS
         .values(**category.model_dump(exclude_unset=True))
     )
     await db.commit()
+    invalidate_category_snapshot()
+    await product_cache.invalidate([product_cache.category_tag(category_id), product_cache.CATEGORY_TREE_TAG])
     await db.refresh(db_category)
     return db_category
 
@@ -90,6 +151,8 @@ async def delete_category(category_id: int, db: AsyncSession = Depends(get_async
     # Логическое удаление категории (установка is_active=False)
     await db.execute(update(CategoryModel).where(CategoryModel.id == category_id).values(is_active=False))
     await db.commit()
+    invalidate_category_snapshot()
+    await product_cache.invalidate([product_cache.category_tag(category_id), product_cache.CATEGORY_TREE_TAG])
     
     return {"status": "success", "message": "Category marked as inactive"}
 
@@ -0,0 +1,27 @@
+from pathlib import PurePosixPath
+from urllib.parse import quote
+
+from fastapi import APIRouter, HTTPException, Response, status
+
+from app.config import MEDIA_ACCEL_PREFIX
+from app.storage import CONTENT_ADDRESSED_RE, IMMUTABLE_CACHE_CONTROL
+
+router = APIRouter(prefix="/media", tags=["media"], include_in_schema=False)
+
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_media(file_path: str):
+    """
+    Проверяет путь к файлу и передаёт отдачу байтов nginx через X-Accel-Redirect.
+    Здесь же в будущем — проверка доступа к приватным файлам продавца.
+    """
+    parts = PurePosixPath(file_path).parts
+    # "..", скрытые и служебные файлы (например, .staging) не отдаём
+    if not parts or any(part.startswith(".") or part == "/" for part in parts):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    headers = {"X-Accel-Redirect": f"{MEDIA_ACCEL_PREFIX}/{quote(file_path)}"}
+    # nginx сохраняет Cache-Control ответа приложения при внутреннем перенаправлении
+    if CONTENT_ADDRESSED_RE.match(parts[-1]):
+        headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return Response(headers=headers)
@@ -1,11 +1,12 @@
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import delete, func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import delete, distinct, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.auth import get_current_user
+from app import conditional, product_cache, serialization
+from app.auth import get_current_user, get_current_user_claims
 from app.db_depends import get_async_db
 from app.models.cart_items import CartItem as CartItemModel
 from app.models.order_items import OrderItem as OrderItemModel
@@ -33,6 +34,17 @@ async def _load_order_with_items(db: AsyncSession, order_id: int) -> OrderModel
     return result.first()
 
 
+def _orders_with_products():
+    """
+    Заказы с позициями и товарами: заказ в ответе меняется и при изменении его товаров.
+    """
+    return (
+        select(OrderModel)
+        .outerjoin(OrderItemModel, OrderItemModel.order_id == OrderModel.id)
+        .outerjoin(ProductModel, ProductModel.id == OrderItemModel.product_id)
+    )
+
+
 
 @router.post(
     "/checkout",
@@ -64,6 +76,7 @@ async def checkout_order(
         .with_for_update()
     )
     products = {product.id: product for product in products_result.all()}
+    category_ids = {product.category_id for product in products.values()}
 
     order = OrderModel(user_id=current_user.id)
     total_amount = Decimal("0")
@@ -129,6 +142,9 @@ async def checkout_order(
 
     await db.execute(delete(CartItemModel).where(CartItemModel.user_id == current_user.id))
     await db.commit()
+    # Остатки товаров изменились — сбрасываем их карточки и списки с ними, а также списки
+    # их категорий и общие: товар мог выпасть из in_stock=true или попасть в in_stock=false
+    await product_cache.invalidate_products(product_ids, category_ids)
 
     created_order = await _load_order_with_items(db, order.id)
     if not created_order:
@@ -136,21 +152,43 @@ async def checkout_order(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to load created order",
         )
-    return OrderCheckoutResponse(
-        order=created_order,
-        confirmation_url=payment_info.get("confirmation_url"),
+    return serialization.json_response(
+        OrderCheckoutResponse,
+        OrderCheckoutResponse(
+            order=created_order,
+            confirmation_url=payment_info.get("confirmation_url"),
+        ),
+        status_code=status.HTTP_201_CREATED,
     )
 
 @router.get("/", response_model=OrderList)
 async def list_orders(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
     db: AsyncSession = Depends(get_async_db),
-    current_user: UserModel = Depends(get_current_user),
+    current_user: UserModel = Depends(get_current_user_claims),
 ):
     """
     Возвращает заказы текущего пользователя с простой пагинацией.
+    ETag считается по max(updated_at) заказов и их товаров; на актуальную копию — 304.
     """
+    validator = await db.execute(
+        _orders_with_products()
+        .with_only_columns(
+            func.max(OrderModel.updated_at),
+            func.count(distinct(OrderModel.id)),
+            func.max(ProductModel.updated_at),
+        )
+        .where(OrderModel.user_id == current_user.id)
+    )
+    etag = conditional.make_etag("orders", current_user.id, page, page_size, *validator.one())
+    not_modified_response = conditional.not_modified(request, etag, private=True)
+    if not_modified_response is not None:
+        return not_modified_response
+    response.headers.update(conditional.validator_headers(etag, private=True))
+
     total = await db.scalar(
         select(func.count(OrderModel.id)).where(OrderModel.user_id == current_user.id)
     )
@@ -164,27 +202,50 @@ async def list_orders(
     )
     orders = result.all()
 
-    return OrderList(items=orders, total=total or 0, page=page, page_size=page_size)
+    return serialization.json_response(
+        OrderList,
+        {"items": orders, "total": total or 0, "page": page, "page_size": page_size},
+        headers=response.headers,
+    )
 
 @router.get("/{order_id}", response_model=OrderSchema)
 async def get_order(
+    request: Request,
+    response: Response,
     order_id: int,
     db: AsyncSession = Depends(get_async_db),
-    current_user: UserModel = Depends(get_current_user),
+    current_user: UserModel = Depends(get_current_user_claims),
 ):
     """
     Возвращает детальную информацию по заказу, если он принадлежит пользователю.
+    Поддерживает условный GET: ETag и Last-Modified из updated_at заказа и его товаров.
     """
+    validator = await db.execute(
+        _orders_with_products()
+        .with_only_columns(OrderModel.updated_at, func.max(ProductModel.updated_at))
+        .where(OrderModel.id == order_id, OrderModel.user_id == current_user.id)
+        .group_by(OrderModel.id)
+    )
+    row = validator.first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    last_modified = max(value for value in row if value is not None)
+    etag = conditional.make_etag("order", order_id, *row)
+    not_modified_response = conditional.not_modified(request, etag, last_modified, private=True)
+    if not_modified_response is not None:
+        return not_modified_response
+    response.headers.update(conditional.validator_headers(etag, last_modified, private=True))
+
     order = await _load_order_with_items(db, order_id)
     if not order or order.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
-    return order
+    return serialization.json_response(OrderSchema, order, headers=response.headers)
 
 @router.get("/{order_id}/status")
 async def get_status(
     order_id: int,
     db: AsyncSession = Depends(get_async_db),
-    current_user: UserModel = Depends(get_current_user),
+    current_user: UserModel = Depends(get_current_user_claims),
 ):
     result = await db.scalars(
         select(OrderModel).where(
@@ -1,74 +1,453 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import desc, func, select, update
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from typing import Literal
+
+import anyio
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import (
+    Numeric,
+    and_,
+    cast,
+    desc,
+    exists,
+    func,
+    literal_column,
+    not_,
+    or_,
+    select,
+    text,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import REAL, array
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.products import Product as ProductModel
 from app.models.categories import Category as CategoryModel
-from app.schemas import Product as ProductSchema, ProductCreate, ProductList
+from app.schemas import (
+    Product as ProductSchema,
+    ProductBatch,
+    ProductBatchRequest,
+    ProductCreate,
+    ProductFacets,
+    ProductImportResult,
+    ProductList,
+    ProductSuggestion,
+)
 
+from app import conditional, metrics, product_cache, serialization
+from app.cache import TTLCache
+from app.category_tree import get_category_snapshot
+from app.config import (
+    PRODUCT_BATCH_MAX_IDS,
+    PRODUCT_COUNT_CACHE_SIZE,
+    PRODUCT_COUNT_CACHE_TTL,
+    PRODUCT_IMPORT_MAX_ROWS,
+    SEARCH_LANGUAGE,
+)
+from app.database import async_session_maker
 from app.db_depends import get_async_db
+from app.images import derivative_paths, generate_derivatives
+from app.storage import STAGING_ROOT, acquire_blob, blob_name, collect_blob, media_storage, release_blob
+from app.product_import import ImportFileError, copy_products, parse_import_file
 
 from app.models.users import User as UserModel
 from app.auth import get_current_seller
 
 from pathlib import Path
-import uuid
 from fastapi import File, UploadFile
 
 
 
-BASE_DIR = Path(__file__).resolve().parent.parent.parent
-MEDIA_ROOT = BASE_DIR / "media" / "products"
-MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
-ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+# Допустимые типы изображений и расширение, под которым хранится файл
+ALLOWED_IMAGE_TYPES = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp"}
 MAX_IMAGE_SIZE = 2 * 1024 * 1024  # 2 097 152 байт
+UPLOAD_CHUNK_SIZE = 64 * 1024
+CURSOR_KINDS = {"id", "rank", "similarity"}
+SEARCH_CURSOR_KINDS = {"fts": "rank", "trigram": "similarity"}
+# Поисковый вектор для каждой языковой конфигурации полнотекстового поиска
+SEARCH_VECTORS = {"english": ProductModel.tsv, "russian": ProductModel.tsv_ru}
+# Сколько похожих по триграммам товаров ранжировать в /products/suggest
+SUGGEST_TYPO_CANDIDATES = 200
+# Границы корзин гистограммы цен для /products/facets (в рублях)
+PRICE_FACET_BOUNDS = ("500", "1000", "2500", "5000", "10000", "25000", "50000")
+# Сколько строк за раз читает серверный курсор при выгрузке каталога
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = tuple(ProductSchema.model_fields)
 
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+_count_cache = (
+    TTLCache(ttl=PRODUCT_COUNT_CACHE_TTL, maxsize=PRODUCT_COUNT_CACHE_SIZE)
+    if PRODUCT_COUNT_CACHE_TTL > 0
+    else None
+)
+
 
-async def save_product_image(file: UploadFile) -> str:
+async def save_product_image(file: UploadFile, db: AsyncSession) -> str:
     """
-    Сохраняет изображение товара и возвращает относительный URL.
+    Сохраняет изображение товара и возвращает его URL.
+    Имя файла — SHA-256 содержимого: одинаковые изображения хранятся один раз,
+    а ссылка учитывается в media_blobs в транзакции вызывающего.
+    Файл копируется частями во временный каталог вне event loop
+    (прерывается, как только превышен MAX_IMAGE_SIZE).
     """
     if file.content_type not in ALLOWED_IMAGE_TYPES:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Only JPG, PNG or WebP images are allowed")
-
-    content = await file.read()
-    if len(content) > MAX_IMAGE_SIZE:
+    if file.size is not None and file.size > MAX_IMAGE_SIZE:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Image is too large")
 
-    extension = Path(file.filename or "").suffix.lower() or ".jpg"
-    file_name = f"{uuid.uuid4()}{extension}"
-    file_path = MEDIA_ROOT / file_name
-    file_path.write_bytes(content)
+    STAGING_ROOT.mkdir(exist_ok=True)
+    staging = Path(await anyio.to_thread.run_sync(lambda: tempfile.mkdtemp(dir=STAGING_ROOT)))
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        temp_path = staging / "upload.part"
+        async with await anyio.open_file(temp_path, "wb") as target:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_IMAGE_SIZE:
+                    raise HTTPException(status.HTTP_400_BAD_REQUEST, "Image is too large")
+                digest.update(chunk)
+                await target.write(chunk)
+
+        name = f"{digest.hexdigest()}{ALLOWED_IMAGE_TYPES[file.content_type]}"
+        source = staging / name
+        await anyio.to_thread.run_sync(os.replace, temp_path, source)
+
+        await acquire_blob(db, name)
+        if not await media_storage.exists(name):
+            # Миниатюры WebP — в пуле процессов; заодно отсекаем файлы, которые не являются изображениями
+            try:
+                await generate_derivatives(source)
+            except ValueError as exc:
+                raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid image file") from exc
+            # Оригинал — последним: его наличие означает, что blob записан полностью
+            for path in (*derivative_paths(source), source):
+                await media_storage.save(path.name, path)
+    finally:
+        await anyio.to_thread.run_sync(lambda: shutil.rmtree(staging, ignore_errors=True))
+
+    return media_storage.url(name)
+
+def _json_response(body: bytes, headers: dict[str, str] | None = None) -> Response:
+    """
+    Отдаёт уже сериализованный JSON без повторной валидации response_model.
+    """
+    return serialization.RawJSONResponse(content=body, headers=headers)
+
+
+def _encode_cursor(kind: str, rank: float | None, last_id: int) -> str:
+    """
+    Упаковывает позицию последнего товара страницы в непрозрачный курсор.
+    kind: "id" — сортировка по id, "rank" — по релевантности полнотекстового поиска,
+    "similarity" — по триграммному сходству названия (fallback поиска).
+    """
+    payload = {"k": kind, "id": last_id}
+    if rank is not None:
+        payload["r"] = rank
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, float | None, int]:
+    """
+    Распаковывает курсор и возвращает (kind, rank, last_id).
+    """
+    invalid_cursor = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        kind = payload["k"]
+        if kind not in CURSOR_KINDS:
+            raise invalid_cursor
+        last_id = int(payload["id"])
+        rank = float(payload["r"]) if kind != "id" else None
+    except (ValueError, TypeError, KeyError):
+        raise invalid_cursor
+    return kind, rank, last_id
+
+
+async def _resolve_category_ids(
+    db: AsyncSession, category_id: int | None, include_descendants: bool
+) -> tuple[int, ...] | None:
+    """
+    ID категорий для фильтра: сама категория или, с include_descendants,
+    всё её поддерево из снимка дерева категорий в памяти воркера.
+    """
+    if category_id is None:
+        return None
+    if not include_descendants:
+        return (category_id,)
+    snapshot = await get_category_snapshot(db)
+    return snapshot.subtree(category_id)
+
+
+def _category_cache_tags(category_ids: tuple[int, ...] | None, include_descendants: bool) -> list[str]:
+    """
+    Теги кэша для списка товаров: категории фильтра (или общий тег списков),
+    а для поддерева — ещё и тег дерева категорий, который сбрасывается при его изменении.
+    """
+    if category_ids is None:
+        return [product_cache.LIST_TAG]
+    tags = [product_cache.category_tag(category_id) for category_id in category_ids]
+    if include_descendants:
+        tags.append(product_cache.CATEGORY_TREE_TAG)
+    return tags
+
+
+def _build_product_filters(
+    *,
+    category_ids: tuple[int, ...] | None,
+    min_price: float | None,
+    max_price: float | None,
+    in_stock: bool | None,
+    seller_id: int | None,
+    search: str,
+    search_mode: str = "fts",
+    search_language: str = SEARCH_LANGUAGE,
+):
+    """
+    Собирает условия WHERE для каталога.
+    category_ids — категория или всё её поддерево (см. _resolve_category_ids).
+    Возвращает (filters, rank_col); rank_col не None, если задан поиск.
+    search_mode: "fts" — полнотекстовый поиск, "trigram" — сходство названия (pg_trgm).
+    search_language: конфигурация полнотекстового поиска и соответствующий ей tsvector.
+    """
+    # "is_active = true" планировщик сводит к "is_active" и может использовать
+    # частичные индексы WHERE is_active (с "IS TRUE" это не работает)
+    filters = [ProductModel.is_active == True]
+
+    if category_ids is not None:
+        if len(category_ids) == 1:
+            filters.append(ProductModel.category_id == category_ids[0])
+        else:
+            filters.append(ProductModel.category_id.in_(category_ids))
+    if min_price is not None:
+        filters.append(ProductModel.price >= min_price)
+    if max_price is not None:
+        filters.append(ProductModel.price <= max_price)
+    if in_stock is not None:
+        # Константа литералом, а не параметром: в generic-плане prepared statement asyncpg
+        # планировщик иначе не докажет условие частичных индексов "is_active AND stock > 0"
+        zero = literal_column("0")
+        filters.append(ProductModel.stock > zero if in_stock else ProductModel.stock == zero)
+    if seller_id is not None:
+        filters.append(ProductModel.seller_id == seller_id)
+
+    rank_col = None
+    if search and search_mode == "trigram":
+        filters.append(ProductModel.name.op("%")(search))
+        rank_col = func.similarity(ProductModel.name, search).label("rank")
+    elif search:
+        search_vector = SEARCH_VECTORS[search_language]
+        ts_query = func.websearch_to_tsquery(search_language, search)
+        filters.append(search_vector.op('@@')(ts_query))
+        rank_col = func.ts_rank_cd(search_vector, ts_query).label("rank")
+
+    return filters, rank_col
 
-    return f"/media/products/{file_name}"
 
-def remove_product_image(url: str | None) -> None:
+def _id_page_statement(filters: list, last_id: int | None, page: int, page_size: int):
     """
-    Удаляет файл изображения, если он существует.
+    Страница каталога без поиска в порядке id: после last_id (keyset) или через OFFSET.
+    """
+    stmt = (
+        select(ProductModel)
+        .where(*filters)
+        .order_by(ProductModel.id)
+        .limit(page_size + 1)
+    )
+    if last_id is not None:
+        return stmt.where(ProductModel.id > last_id)
+    return stmt.offset((page - 1) * page_size)
+
+
+async def _fetch_products_page(
+    db: AsyncSession,
+    filters: list,
+    rank_col,
+    rank_kind: str,
+    position: tuple[float | None, int] | None,
+    page: int,
+    page_size: int,
+):
+    """
+    Выбирает страницу товаров: по курсору (position), если он есть, иначе через OFFSET.
+    Возвращает (items, has_more, next_cursor).
+    Берём на одну строку больше, чтобы понять, есть ли следующая страница.
+    """
+    if rank_col is not None:
+        products_stmt = (
+            select(ProductModel, rank_col)
+            .where(*filters)
+            .order_by(desc(rank_col), ProductModel.id)
+            .limit(page_size + 1)
+        )
+        if position is not None:
+            last_rank, last_id = position
+            # ts_rank_cd и similarity возвращают real — сравниваем в том же типе, без потери точности
+            last_rank_value = cast(last_rank, REAL)
+            products_stmt = products_stmt.where(
+                or_(
+                    rank_col < last_rank_value,
+                    and_(rank_col == last_rank_value, ProductModel.id > last_id),
+                )
+            )
+        else:
+            products_stmt = products_stmt.offset((page - 1) * page_size)
+        result = await db.execute(products_stmt)
+        rows = result.all()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        items = [row[0] for row in rows]    # сами объекты
+        next_cursor = (
+            _encode_cursor(rank_kind, rows[-1].rank, rows[-1][0].id) if has_more else None
+        )
+    else:
+        last_id = position[1] if position is not None else None
+        products_stmt = _id_page_statement(filters, last_id, page, page_size)
+        items = (await db.scalars(products_stmt)).all()
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        next_cursor = _encode_cursor("id", None, items[-1].id) if has_more else None
+    return items, has_more, next_cursor
+
+
+async def _count_products(db: AsyncSession, filters: list, filters_key: tuple) -> int:
+    """
+    Точный COUNT по фильтрам. При включённом PRODUCT_COUNT_CACHE_TTL результат
+    кэшируется в памяти воркера по нормализованному набору фильтров.
+    """
+    if _count_cache is not None:
+        cached = _count_cache.get(filters_key)
+        if cached is not None:
+            return cached
+
+    total = await db.scalar(select(func.count()).select_from(ProductModel).where(*filters)) or 0
+
+    if _count_cache is not None:
+        _count_cache.set(filters_key, total)
+    return total
+
+
+def _compile_statement(stmt, dialect) -> tuple[str, tuple]:
+    """
+    SQL драйвера и позиционные параметры запроса.
+    render_postcompile раскрывает IN (...) по поддереву категорий в отдельные параметры,
+    иначе в SQL остаётся заглушка __[POSTCOMPILE_...].
+    """
+    compiled = stmt.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    return compiled.string, params
+
+
+def _explain_statement(stmt, dialect) -> tuple[str, tuple]:
+    sql, params = _compile_statement(stmt, dialect)
+    return f"EXPLAIN (FORMAT JSON) {sql}", params
+
+
+async def _estimate_products_count(db: AsyncSession, filters: list, unfiltered: bool) -> int:
+    """
+    Приблизительное количество товаров без полного прохода по таблице.
+    Без фильтров берём pg_class.reltuples, иначе — оценку строк из EXPLAIN.
+    """
+    if unfiltered:
+        reltuples = await db.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'products'::regclass")
+        )
+        # -1 означает, что таблица ещё ни разу не анализировалась
+        if reltuples is not None and reltuples >= 0:
+            return reltuples
+
+    conn = await db.connection()
+    sql, params = _explain_statement(select(ProductModel.id).where(*filters), conn.dialect)
+    result = await conn.exec_driver_sql(sql, params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _products_list_etag(db: AsyncSession, request: Request, category_ids, *extra_columns) -> str:
+    """
+    ETag списка товаров из лёгкого запроса до выборки страницы: max(updated_at) по всем
+    товарам (ix_products_updated_at) и параметры запроса. Деактивация и списание остатков
+    тоже сдвигают updated_at, поэтому валидатор меняется при любом изменении каталога —
+    грубее, чем по фильтру, зато без подсчёта строк.
+    """
+    result = await db.execute(select(func.max(ProductModel.updated_at), *extra_columns))
+    return conditional.make_etag(
+        request.url.path, sorted(request.query_params.multi_items()), category_ids, *result.one()
+    )
+
+
+def _list_response(request: Request, document: product_cache.ListDocument) -> Response:
+    """
+    Ответ со списком товаров с условным GET: ETag хранится в кэше рядом с телом,
+    поэтому проверка If-None-Match на попадании в кэш не обращается к базе.
+    """
+    not_modified_response = conditional.not_modified(request, document.etag)
+    if not_modified_response is not None:
+        return not_modified_response
+    return _json_response(document.body, conditional.validator_headers(document.etag))
+
+
+async def release_product_image(db: AsyncSession, background_tasks: BackgroundTasks, url: str | None) -> None:
+    """
+    Снимает ссылку товара на изображение в транзакции вызывающего; файлы без ссылок
+    удаляются фоновой задачей после отправки ответа.
     """
     if not url:
         return
-    relative_path = url.lstrip("/")
-    file_path = BASE_DIR / relative_path
-    if file_path.exists():
-        file_path.unlink()
+    name = blob_name(url)
+    await release_blob(db, name)
+    background_tasks.add_task(collect_blob, name)
 
 
 @router.get("/", response_model=ProductList)
 async def get_all_products(
+    request: Request,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="Курсор следующей страницы (next_cursor из предыдущего ответа)"),
     category_id: int | None = Query(None, description="ID категории для фильтрации"),
+    include_descendants: bool = Query(False, description="Учитывать товары всех подкатегорий category_id"),
     search: str | None = Query(None, min_length=1, description="Поиск по названию/описанию"),
+    search_language: Literal["english", "russian"] = Query(
+        SEARCH_LANGUAGE,
+        description="Языковая конфигурация полнотекстового поиска",
+    ),
     min_price: float | None = Query(None, ge=0, description="Минимальная цена товара"),
     max_price: float | None = Query(None, ge=0, description="Максимальная цена товара"),
     in_stock: bool | None = Query(None, description="true — только товары в наличии, false — только без остатка"),
     seller_id: int | None = Query(None, description="ID продавца для фильтрации"),
+    count_mode: Literal["exact", "estimated", "none"] = Query(
+        "exact",
+        description="exact — точный COUNT, estimated — оценка планировщика, none — без total (только has_more)",
+    ),
     db: AsyncSession = Depends(get_async_db),
 ):
+    """
+    Возвращает список активных товаров с фильтрами и пагинацией.
+    Если передан cursor, страница выбирается по ключу (keyset) вместо OFFSET,
+    а параметр page игнорируется. Поддерживает условный GET (ETag/304).
+    """
 
     if min_price is not None and max_price is not None and min_price > max_price:
         raise HTTPException(
@@ -76,63 +455,363 @@ async def get_all_products(
             detail="min_price не может быть больше max_price",
         )
 
-    filters = [ProductModel.is_active.is_(True)]
+    search_value = " ".join(search.split()) if search else ""
+    category_ids = await _resolve_category_ids(db, category_id, include_descendants)
+    filter_params = dict(
+        category_ids=category_ids,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        seller_id=seller_id,
+        search=search_value,
+        search_language=search_language,
+    )
 
-    if category_id is not None:
-        filters.append(ProductModel.category_id == category_id)
-    if min_price is not None:
-        filters.append(ProductModel.price >= min_price)
-    if max_price is not None:
-        filters.append(ProductModel.price <= max_price)
-    if in_stock is not None:
-        filters.append(ProductModel.stock > 0 if in_stock else ProductModel.stock == 0)
-    if seller_id is not None:
-        filters.append(ProductModel.seller_id == seller_id)
+    cache_key = product_cache.list_key({
+        "page": page,
+        "page_size": page_size,
+        "cursor": cursor,
+        "category_id": category_id,
+        "include_descendants": include_descendants,
+        "min_price": min_price,
+        "max_price": max_price,
+        "in_stock": in_stock,
+        "seller_id": seller_id,
+        "search": search_value.lower(),
+        "search_language": search_language,
+        "count_mode": count_mode,
+    })
+    cached = await product_cache.get_list(cache_key)
+    if cached is not None:
+        return _list_response(request, cached)
 
-    # Базовый запрос total
-    total_stmt = select(func.count()).select_from(ProductModel).where(*filters)
+    # Валидатор считаем до выборки: если запись закоммитят между ними, клиент лишь
+    # получит лишний 200, но не сохранит новое тело под старым ETag
+    etag = await _products_list_etag(db, request, category_ids)
+    not_modified_response = conditional.not_modified(request, etag)
+    if not_modified_response is not None:
+        return not_modified_response
 
-    rank_col = None
-    if search:
-        search_value = search.strip()
-        if search_value:
-            ts_query = func.websearch_to_tsquery('english', search_value)
-            filters.append(ProductModel.tsv.op('@@')(ts_query))
-            rank_col = func.ts_rank_cd(ProductModel.tsv, ts_query).label("rank")
-            # total с учётом полнотекстового фильтра
-            total_stmt = select(func.count()).select_from(ProductModel).where(*filters)
-
-    total = await db.scalar(total_stmt) or 0
-
-    # Основной запрос (если есть поиск — добавим ранг в выборку и сортировку)
-    if rank_col is not None:
-        products_stmt = (
-            select(ProductModel, rank_col)
-            .where(*filters)
-            .order_by(desc(rank_col), ProductModel.id)
-            .offset((page - 1) * page_size)
-            .limit(page_size)
+    position = None
+    search_mode = "fts"
+    if cursor is not None:
+        cursor_kind, last_rank, last_id = _decode_cursor(cursor)
+        # Курсор должен соответствовать режиму сортировки текущего запроса
+        if (cursor_kind == "id") == bool(search_value):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        if cursor_kind == "similarity":
+            search_mode = "trigram"
+        position = (last_rank, last_id)
+
+    filters, rank_col = _build_product_filters(**filter_params, search_mode=search_mode)
+    items, has_more, next_cursor = await _fetch_products_page(
+        db, filters, rank_col, SEARCH_CURSOR_KINDS[search_mode], position, page, page_size
+    )
+
+    # Полнотекстовый поиск ничего не нашёл (опечатка или недописанное слово) —
+    # повторяем поиск по триграммному сходству названия.
+    if search_value and search_mode == "fts" and not items and cursor is None:
+        if page == 1 or not await db.scalar(select(exists().where(*filters))):
+            search_mode = "trigram"
+            filters, rank_col = _build_product_filters(**filter_params, search_mode=search_mode)
+            items, has_more, next_cursor = await _fetch_products_page(
+                db, filters, rank_col, SEARCH_CURSOR_KINDS[search_mode], None, page, page_size
+            )
+
+    if count_mode == "exact":
+        filters_key = (
+            category_ids, min_price, max_price, in_stock, seller_id,
+            search_value.lower(), search_language, search_mode,
         )
-        result = await db.execute(products_stmt)
-        rows = result.all()
-        items = [row[0] for row in rows]    # сами объекты
-        # при желании можно вернуть ранг в ответе
-        # ranks = [row.rank for row in rows]
+        total = await _count_products(db, filters, filters_key)
+    elif count_mode == "estimated":
+        total = await _estimate_products_count(db, filters, unfiltered=len(filters) == 1)
     else:
-        products_stmt = (
-            select(ProductModel)
-            .where(*filters)
-            .order_by(ProductModel.id)
-            .offset((page - 1) * page_size)
-            .limit(page_size)
-        )
-        items = (await db.scalars(products_stmt)).all()
+        total = None
 
-    return {
+    body = serialization.dump_json(ProductList, {
         "items": items,
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    })
+    document = product_cache.ListDocument(etag, body)
+    tags = _category_cache_tags(category_ids, include_descendants)
+    tags.extend(product_cache.product_tag(item.id) for item in items)
+    await product_cache.store_list(cache_key, document, tags)
+    return _list_response(request, document)
+
+
+async def _get_products_batch(db: AsyncSession, ids: list[int]) -> Response:
+    """
+    Собирает ответ для пакетного запроса: сначала из кэша карточек товаров,
+    остальное — одним запросом к базе.
+    """
+    ids = list(dict.fromkeys(ids))  # убираем дубли, сохраняя порядок
+    if len(ids) > PRODUCT_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many ids, maximum is {PRODUCT_BATCH_MAX_IDS}",
+        )
+
+    cached = await product_cache.get_documents(ids)
+    bodies = {product_id: document.body for product_id, document in zip(ids, cached) if document is not None}
+
+    missing_ids = [product_id for product_id in ids if product_id not in bodies]
+    if missing_ids:
+        result = await db.scalars(
+            select(ProductModel).where(ProductModel.id.in_(missing_ids), ProductModel.is_active == True)
+        )
+        for product in result.all():
+            document = product_cache.ProductDocument(product.updated_at, serialization.dump_json(ProductSchema, product))
+            bodies[product.id] = document.body
+            await product_cache.store_document(product.id, document)
+
+    # Карточки уже сериализованы — склеиваем JSON без повторной валидации
+    items = b",".join(bodies[product_id] for product_id in ids if product_id in bodies)
+    missing = [product_id for product_id in ids if product_id not in bodies]
+    return _json_response(b'{"items":[' + items + b'],"missing":' + json.dumps(missing).encode("utf-8") + b"}")
+
+
+@router.get("/batch", response_model=ProductBatch)
+async def get_products_batch(
+    ids: list[int] = Query(..., min_length=1, description="ID товаров, например ?ids=1&ids=2"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Возвращает несколько активных товаров одним запросом в порядке переданных ID.
+    Ненайденные или неактивные ID перечисляются в missing.
+    """
+    return await _get_products_batch(db, ids)
+
+
+@router.post("/batch", response_model=ProductBatch)
+async def post_products_batch(
+    payload: ProductBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    То же, что GET /products/batch, но список ID передаётся в теле запроса.
+    """
+    return await _get_products_batch(db, payload.ids)
+
+
+def _export_csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def _export_products(seller_id: int, export_format: str):
+    """
+    Выгружает все товары продавца серверным курсором пачками по EXPORT_BATCH_SIZE:
+    в памяти одновременно только одна пачка, независимо от размера каталога.
+    Сессия своя — генератор работает уже после выхода из зависимостей эндпоинта.
+    """
+    stmt = (
+        select(ProductModel)
+        .where(ProductModel.seller_id == seller_id)
+        .order_by(ProductModel.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if export_format == "csv":
+        yield _export_csv_chunk([EXPORT_FIELDS])
+    async with async_session_maker() as session:
+        result = await session.stream_scalars(stmt)
+        async for products in result.partitions():
+            if export_format == "csv":
+                yield _export_csv_chunk(
+                    ProductSchema.model_validate(product).model_dump(mode="json").values()
+                    for product in products
+                )
+            else:
+                yield b"".join(serialization.dump_json(ProductSchema, product) + b"\n" for product in products)
+            # Выгруженные объекты больше не нужны — не держим их в identity map.
+            # Не expunge_all: он заменяет identity map, в которую ещё грузит открытый курсор
+            for product in products:
+                session.expunge(product)
+
+
+@router.get("/export")
+async def export_products(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Формат выгрузки"),
+    current_user: UserModel = Depends(get_current_seller),
+):
+    """
+    Потоково выгружает весь каталог текущего продавца (включая неактивные товары)
+    в NDJSON или CSV.
+    """
+    media_type = "text/csv; charset=utf-8" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_products(current_user.id, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products-{current_user.id}.{export_format}"'},
+    )
+
+
+def _suggest_statement(query: str, limit: int):
+    """
+    Запрос подсказок: сначала названия, начинающиеся с q, затем похожие на q по триграммам
+    (если префиксных совпадений меньше limit).
+    """
+    prefix = query.lower()
+    name_key = func.lower(ProductModel.name).collate("C")
+    # То же, что name ILIKE 'q%', но диапазоном по ix_products_name_prefix:
+    # LIKE с параметром не использует индекс в generic-плане prepared statement
+    prefix_match = and_(name_key >= prefix, name_key < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    by_prefix = (
+        select(ProductModel.id, ProductModel.name)
+        .where(ProductModel.is_active == True, prefix_match)
+        .order_by(name_key)
+        .limit(limit)
+    )
+    # Ранжируем не больше SUGGEST_TYPO_CANDIDATES строк: все они уже прошли порог сходства,
+    # а у популярного слова их десятки тысяч
+    candidates = (
+        select(ProductModel.id, ProductModel.name)
+        .where(
+            ProductModel.is_active == True,
+            # name %> q эквивалентно q <% name: q похоже на одно из слов названия
+            ProductModel.name.op("%>")(query),
+            not_(prefix_match),
+        )
+        .limit(SUGGEST_TYPO_CANDIDATES)
+        .subquery()
+    )
+    by_similarity = (
+        select(candidates.c.id, candidates.c.name)
+        .order_by(desc(func.word_similarity(query, candidates.c.name)), candidates.c.id)
+        .limit(limit)
+    )
+    # Append выполняет ветки UNION ALL по очереди: если префиксных совпадений хватило,
+    # LIMIT останавливает запрос до поиска по триграммам
+    suggestions = union_all(by_prefix, by_similarity).subquery()
+    return select(suggestions.c.id, suggestions.c.name).limit(limit)
+
+
+@router.get("/suggest", response_model=list[ProductSuggestion])
+async def suggest_products(
+    q: str = Query(..., min_length=2, max_length=100, description="Начало названия товара, допускаются опечатки"),
+    limit: int = Query(10, ge=1, le=20),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Подсказки для строки поиска: товары, название которых начинается с q
+    или похоже на q по триграммам (pg_trgm). Совпадения по префиксу идут первыми.
+    """
+    rows = (await db.execute(_suggest_statement(" ".join(q.split()), limit))).all()
+    return [{"id": row.id, "name": row.name} for row in rows]
+
+
+def _facets_statement(filters: list):
+    """
+    Все фасеты одним запросом: GROUPING SETS по категории, корзине цены и наличию
+    плюс общий итог. Строки различаются битовой маской grouping_mask.
+    """
+    bounds = array([Decimal(bound) for bound in PRICE_FACET_BOUNDS], type_=Numeric(10, 2))
+    filtered = (
+        select(
+            ProductModel.category_id,
+            func.width_bucket(ProductModel.price, bounds).label("price_bucket"),
+            (ProductModel.stock > 0).label("in_stock"),
+        )
+        .where(*filters)
+        .cte("filtered")
+    )
+    # Битовая маска grouping(): 1 — колонка не участвует в группировке
+    grouping_col = func.grouping(
+        filtered.c.category_id, filtered.c.price_bucket, filtered.c.in_stock
+    ).label("grouping_mask")
+    return (
+        select(
+            grouping_col,
+            filtered.c.category_id,
+            filtered.c.price_bucket,
+            filtered.c.in_stock,
+            func.count().label("products_count"),
+        )
+        .group_by(
+            func.grouping_sets(
+                filtered.c.category_id,
+                filtered.c.price_bucket,
+                filtered.c.in_stock,
+                tuple_(),
+            )
+        )
+    )
+
+
+@router.get("/facets", response_model=ProductFacets)
+async def get_product_facets(
+    category_id: int | None = Query(None, description="ID категории для фильтрации"),
+    include_descendants: bool = Query(False, description="Учитывать товары всех подкатегорий category_id"),
+    search: str | None = Query(None, min_length=1, description="Поиск по названию/описанию"),
+    search_language: Literal["english", "russian"] = Query(
+        SEARCH_LANGUAGE,
+        description="Языковая конфигурация полнотекстового поиска",
+    ),
+    min_price: float | None = Query(None, ge=0, description="Минимальная цена товара"),
+    max_price: float | None = Query(None, ge=0, description="Максимальная цена товара"),
+    in_stock: bool | None = Query(None, description="true — только товары в наличии, false — только без остатка"),
+    seller_id: int | None = Query(None, description="ID продавца для фильтрации"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Возвращает фасеты каталога для боковой панели фильтров одним запросом:
+    количество по категориям, гистограмму цен и наличие на складе.
+    Фильтры те же, что у GET /products/.
+    """
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_price не может быть больше max_price",
+        )
+
+    search_value = " ".join(search.split()) if search else ""
+    filters, _ = _build_product_filters(
+        category_ids=await _resolve_category_ids(db, category_id, include_descendants),
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        seller_id=seller_id,
+        search=search_value,
+        search_language=search_language,
+    )
+
+    rows = (await db.execute(_facets_statement(filters))).all()
+
+    total = 0
+    categories = []
+    price_counts: dict[int, int] = {}
+    stock_counts = {True: 0, False: 0}
+    for row in rows:
+        if row.grouping_mask == 0b011:
+            categories.append({"category_id": row.category_id, "count": row.products_count})
+        elif row.grouping_mask == 0b101:
+            price_counts[row.price_bucket] = row.products_count
+        elif row.grouping_mask == 0b110:
+            stock_counts[row.in_stock] = row.products_count
+        else:
+            total = row.products_count
+
+    # width_bucket: 0 — ниже первой границы, len(bounds) — не меньше последней
+    price_buckets = []
+    for bucket in range(len(PRICE_FACET_BOUNDS) + 1):
+        price_buckets.append({
+            "min_price": PRICE_FACET_BOUNDS[bucket - 1] if bucket > 0 else 0,
+            "max_price": PRICE_FACET_BOUNDS[bucket] if bucket < len(PRICE_FACET_BOUNDS) else None,
+            "count": price_counts.get(bucket, 0),
+        })
+
+    return {
+        "total": total,
+        "categories": sorted(categories, key=lambda item: item["category_id"]),
+        "price_buckets": price_buckets,
+        "in_stock": stock_counts[True],
+        "out_of_stock": stock_counts[False],
     }
 
 
@@ -156,26 +835,97 @@ async def create_product(
                             detail="Category not found or inactive")
 
     # Сохранение изображения (если есть)
-    image_url = await save_product_image(image) if image else None
+    image_url = await save_product_image(image, db) if image else None
 
     # Создание товара
     db_product = ProductModel(
         **product.model_dump(),
         seller_id=current_user.id,
         image_url=image_url,
+        image_derivatives=image_url is not None,
     )
 
     db.add(db_product)
     await db.commit()
     await db.refresh(db_product)
-    return db_product
+    await product_cache.invalidate([product_cache.LIST_TAG, product_cache.category_tag(db_product.category_id)])
+    return serialization.json_response(ProductSchema, db_product, status_code=status.HTTP_201_CREATED)
+
+
+@router.post("/import", response_model=ProductImportResult)
+async def import_products(
+    file: UploadFile = File(..., description="CSV с заголовком или NDJSON с полями name, description, price, stock, category_id"),
+    import_format: Literal["csv", "ndjson"] | None = Query(
+        None, alias="format", description="Формат файла; по умолчанию определяется по имени/типу файла"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_seller),
+):
+    """
+    Массово создаёт товары текущего продавца из CSV или NDJSON.
+    Строки валидируются по ProductCreate, корректные загружаются через COPY
+    одной транзакцией, некорректные попадают в отчёт с номерами строк.
+    """
+    started = time.perf_counter()
+    if import_format is None:
+        is_csv = (file.filename or "").lower().endswith(".csv") or file.content_type == "text/csv"
+        import_format = "csv" if is_csv else "ndjson"
+
+    category_ids = set(await db.scalars(select(CategoryModel.id).where(CategoryModel.is_active == True)))
+    try:
+        # Разбор и валидация — CPU-работа, не блокируем event loop
+        records, failed, errors = await run_in_threadpool(
+            parse_import_file, file.file, import_format, category_ids, PRODUCT_IMPORT_MAX_ROWS
+        )
+    except ImportFileError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    imported = 0
+    if records:
+        imported = await copy_products(db, current_user.id, records)
+        await db.commit()
+        await product_cache.invalidate(
+            [product_cache.LIST_TAG, *{product_cache.category_tag(record[4]) for record in records}]
+        )
+        metrics.increment("products_imported_total", imported)
+
+    elapsed = time.perf_counter() - started
+    return ProductImportResult(
+        imported=imported,
+        failed=failed,
+        errors=errors,
+        elapsed_seconds=round(elapsed, 3),
+        rows_per_second=round(imported / elapsed, 1) if elapsed > 0 else 0.0,
+    )
 
 
 @router.get("/category/{category_id}", response_model=list[ProductSchema])
-async def get_products_by_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
+async def get_products_by_category(
+    request: Request,
+    category_id: int,
+    include_descendants: bool = Query(False, description="Учитывать товары всех подкатегорий"),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    Возвращает список активных товаров в указанной категории по её ID.
+    Возвращает список активных товаров в указанной категории по её ID
+    (с include_descendants — во всём поддереве категории).
     """
+    category_ids = await _resolve_category_ids(db, category_id, include_descendants)
+    # Отключение категории сбрасывает её тег, так что после него клиент получит 404, а не 304
+    cache_key = product_cache.category_products_key(category_id, include_descendants)
+    cached = await product_cache.get_list(cache_key)
+    if cached is not None:
+        return _list_response(request, cached)
+
+    # Активность категории — часть версии: после отключения клиент получит 404, а не 304
+    category_active = (
+        select(CategoryModel.is_active).where(CategoryModel.id == category_id).scalar_subquery()
+    )
+    etag = await _products_list_etag(db, request, category_ids, category_active)
+    not_modified_response = conditional.not_modified(request, etag)
+    if not_modified_response is not None:
+        return not_modified_response
+
     result = await db.scalars(
         select(CategoryModel).where(CategoryModel.id == category_id,
                                     CategoryModel.is_active == True)
@@ -185,31 +935,48 @@ async def get_products_by_category(category_id: int, db: AsyncSession = Depends(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Category not found or inactive")
     res_prod = await db.scalars(
-        select(ProductModel).where(ProductModel.category_id == category_id,
+        select(ProductModel).where(ProductModel.category_id.in_(category_ids),
                                    ProductModel.is_active == True)
     )
     products = res_prod.all()
-    return products
+    body = serialization.dump_json(list[ProductSchema], products)
+    document = product_cache.ListDocument(etag, body)
+    tags = _category_cache_tags(category_ids, include_descendants)
+    tags.extend(product_cache.product_tag(product.id) for product in products)
+    await product_cache.store_list(cache_key, document, tags)
+    return _list_response(request, document)
 
 
 @router.get("/{product_id}", response_model=ProductSchema)
-async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+async def get_product(request: Request, product_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Возвращает детальную информацию о товаре по его ID.
+    Горячий путь — готовый JSON из кэша карточек без запроса к базе и ORM;
+    ETag и Last-Modified берутся из версии карточки (updated_at), на актуальную копию — 304.
     """
-    result = await db.scalars(
-        select(ProductModel).where(ProductModel.id == product_id, ProductModel.is_active == True)
-    )
-    product = result.first()
-    if not product:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail="Product not found or inactive")
-    return product
+    document = await product_cache.get_document(product_id)
+    if document is None:
+        result = await db.scalars(
+            select(ProductModel).where(ProductModel.id == product_id, ProductModel.is_active == True)
+        )
+        product = result.first()
+        if not product:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Product not found or inactive")
+        document = product_cache.ProductDocument(product.updated_at, serialization.dump_json(ProductSchema, product))
+        await product_cache.store_document(product_id, document)
+
+    etag = conditional.make_etag("product", product_id, document.updated_at.isoformat())
+    not_modified_response = conditional.not_modified(request, etag, document.updated_at)
+    if not_modified_response is not None:
+        return not_modified_response
+    return _json_response(document.body, conditional.validator_headers(etag, document.updated_at))
 
 
 @router.put("/{product_id}", response_model=ProductSchema)
 async def update_product(
         product_id: int,
+        background_tasks: BackgroundTasks,
         product: ProductCreate = Depends(ProductCreate.as_form),
         image: UploadFile | None = File(None),
         db: AsyncSession = Depends(get_async_db),
@@ -217,6 +984,7 @@ async def update_product(
 ):
     """
     Обновляет товар, если он принадлежит текущему продавцу (только для 'seller').
+    Старое изображение удаляется в фоне после коммита, если на него больше никто не ссылается.
     """
     result = await db.scalars(select(ProductModel).where(ProductModel.id == product_id))
     db_product = result.first()
@@ -233,23 +1001,28 @@ async def update_product(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="Category not found or inactive")
 
+    old_category_id = db_product.category_id
     await db.execute(
         update(ProductModel).where(ProductModel.id == product_id).values(**product.model_dump())
     )
 
     if image:
-        remove_product_image(db_product.image_url)
-        db_product.image_url = await save_product_image(image)
+        old_image_url = db_product.image_url
+        db_product.image_url = await save_product_image(image, db)
+        db_product.image_derivatives = True
+        await release_product_image(db, background_tasks, old_image_url)
 
     await db.commit()
     await db.refresh(db_product)
-    return db_product
+    await product_cache.invalidate_product(product_id, old_category_id, db_product.category_id)
+    return serialization.json_response(ProductSchema, db_product)
 
 
 
 @router.delete("/{product_id}", response_model=ProductSchema)
 async def delete_product(
     product_id: int,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_seller)
 ):
@@ -267,8 +1040,9 @@ async def delete_product(
     await db.execute(
         update(ProductModel).where(ProductModel.id == product_id).values(is_active=False)
     )
-    remove_product_image(product.image_url)
+    await release_product_image(db, background_tasks, product.image_url)
 
     await db.commit()
     await db.refresh(product)
-    return product
+    await product_cache.invalidate_product(product_id, product.category_id)
+    return serialization.json_response(ProductSchema, product)
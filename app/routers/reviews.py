@@ -3,6 +3,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 
+from app import product_cache
 from app.auth import get_current_user
 from app.db_depends import get_async_db
 from app.models.products import Product as ProductModel
@@ -97,6 +98,7 @@ async def create_review(
     await db.flush()
     await update_product_rating(db, cr_review.product_id)
     await db.commit()
+    await product_cache.invalidate_product(cr_review.product_id)
     await db.refresh(review)
     return review
 
@@ -142,5 +144,6 @@ async def delete_review(
     await db.flush()
     await update_product_rating(db, review.product_id)
     await db.commit()
+    await product_cache.invalidate_product(review.product_id)
     await db.refresh(review)
     return review
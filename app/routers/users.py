@@ -1,18 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from fastapi.security import OAuth2PasswordRequestForm
-import jwt
 
 from app.models.users import User as UserModel
 from app.db_depends import get_async_db
-from app.config import SECRET_KEY, ALGORITHM
 from app.schemas import UserCreate, User as UserSchema, RefreshTokenRequest
-from app.auth import hash_password, verify_password, create_access_token, create_refresh_token
+from app.auth import hash_password_async, verify_password_async, create_access_token
+from app.rate_limit import limit_login_attempts, remember_successful_login
+from app.refresh_tokens import issue_refresh_token, rotate_refresh_token
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
+def _token_pair(user: UserModel, refresh_token: str) -> dict:
+    access_token = create_access_token(data={"sub": user.email, "role": user.role, "id": user.id})
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
 @router.post("/", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
 async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
@@ -27,7 +32,7 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)
     # Создание объекта пользователя с хешированным паролем
     db_user = UserModel(
         email=user.email,
-        hashed_password=hash_password(user.password),
+        hashed_password=await hash_password_async(user.password),
         role=user.role
     )
 
@@ -37,23 +42,31 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)
     return db_user
 
 
-@router.post("/token")                                                             
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+@router.post("/token", dependencies=[Depends(limit_login_attempts)])
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(),
+                db: AsyncSession = Depends(get_async_db)):
     """
     Аутентифицирует пользователя и возвращает access_token и refresh_token.
     """
     result = await db.scalars(
         select(UserModel).where(UserModel.email == form_data.username, UserModel.is_active == True))
     user = result.first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    password_ok, upgraded_hash = (
+        await verify_password_async(form_data.password, user.hashed_password) if user else (False, None)
+    )
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.email, "role": user.role, "id": user.id})
-    refresh_token = create_refresh_token(data={"sub": user.email, "role": user.role, "id": user.id})
-    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+    if upgraded_hash:
+        # Хеш старого формата — заменяем, чтобы следующие входы проверялись одним checkpw
+        user.hashed_password = upgraded_hash
+    refresh_token = issue_refresh_token(db, user.id, user.email, user.role)
+    await db.commit()
+    await remember_successful_login(request, form_data.username)
+    return _token_pair(user, refresh_token)
 
 
 @router.post("/refresh-token")
@@ -63,51 +76,11 @@ async def refresh_token(
 ):
     """
     Обновляет refresh-токен, принимая старый refresh-токен в теле запроса.
+    Старый токен после этого недействителен, вместе с новым выдаётся и access-токен.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate refresh token",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    user, new_refresh_token = await rotate_refresh_token(db, body.refresh_token)
+    return _token_pair(user, new_refresh_token)
 
-    old_refresh_token = body.refresh_token
-
-    try:
-        payload = jwt.decode(old_refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str | None = payload.get("sub")
-        token_type: str | None = payload.get("token_type")
-
-        # Проверяем, что токен действительно refresh
-        if email is None or token_type != "refresh":
-            raise credentials_exception
-
-    except jwt.ExpiredSignatureError:
-        # refresh-токен истёк
-        raise credentials_exception
-    except jwt.PyJWTError:
-        # подпись неверна или токен повреждён
-        raise credentials_exception
-
-    # Проверяем, что пользователь существует и активен
-    result = await db.scalars(
-        select(UserModel).where(
-            UserModel.email == email,
-            UserModel.is_active == True
-        )
-    )
-    user = result.first()
-    if user is None:
-        raise credentials_exception
-
-    # Генерируем новый refresh-токен    
-    new_refresh_token = create_refresh_token(
-        data={"sub": user.email, "role": user.role, "id": user.id}
-    )
-
-    return {
-        "refresh_token": new_refresh_token,
-        "token_type": "bearer",
-    }
 
 @router.post("/refresh_access_token")
 async def refresh_access_token(
@@ -116,48 +89,7 @@ async def refresh_access_token(
 ):
     """
     Обновляет access-токен, принимая refresh-токен в теле запроса.
+    Refresh-токен ротируется: клиент должен сохранить новый из ответа.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate refresh token",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    old_refresh_token = body.refresh_token
-
-    try:
-        payload = jwt.decode(old_refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str | None = payload.get("sub")
-        token_type: str | None = payload.get("token_type")
-
-        # Проверяем, что токен действительно refresh
-        if email is None or token_type != "refresh":
-            raise credentials_exception
-
-    except jwt.ExpiredSignatureError:
-        # refresh-токен истёк
-        raise credentials_exception
-    except jwt.PyJWTError:
-        # подпись неверна или токен повреждён
-        raise credentials_exception
-
-    # Проверяем, что пользователь существует и активен
-    result = await db.scalars(
-        select(UserModel).where(
-            UserModel.email == email,
-            UserModel.is_active == True
-        )
-    )
-    user = result.first()
-    if user is None:
-        raise credentials_exception
-
-    # Генерируем новый access-токен
-    new_access_token = create_access_token(
-        data={"sub": user.email, "role": user.role, "id": user.id}
-    )
-
-    return {
-        "access_token": new_access_token,
-        "token_type": "bearer",
-    }
+    user, new_refresh_token = await rotate_refresh_token(db, body.refresh_token)
+    return _token_pair(user, new_refresh_token)
@@ -42,6 +42,16 @@ class Category(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CategoryTreeNode(BaseModel):
+    """
+    Узел дерева категорий для GET /categories/tree.
+    """
+    id: int = Field(..., description="Уникальный идентификатор категории")
+    name: str = Field(..., description="Название категории")
+    parent_id: int | None = Field(None, description="ID родительской категории, если есть")
+    children: list["CategoryTreeNode"] = Field(default_factory=list, description="Подкатегории")
+
+
 class ProductCreate(BaseModel):
     """
     Модель для создания и обновления товара.
@@ -91,6 +101,8 @@ class Product(BaseModel):
     created_at: datetime = Field(..., description="Дата и время создания товара")
     updated_at: datetime = Field(..., description="Дата и время последнего обновления товара")
 
+    thumbnail_url: str | None = Field(None, description="URL миниатюры (WebP, до 200 px)")
+    medium_url: str | None = Field(None, description="URL среднего изображения (WebP, до 800 px)")
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -130,13 +142,73 @@ class ProductList(BaseModel):
     Список пагинации для товаров.
     """
     items: list[Product] = Field(description="Товары для текущей страницы")
-    total: int = Field(ge=0, description="Общее количество товаров")
+    total: int | None = Field(None, ge=0, description="Общее количество товаров (приблизительное при count_mode=estimated, null при count_mode=none)")
     page: int = Field(ge=1, description="Номер текущей страницы")
     page_size: int = Field(ge=1, description="Количество элементов на странице")
+    next_cursor: str | None = Field(None, description="Курсор для запроса следующей страницы")
+    has_more: bool = Field(False, description="Есть ли следующая страница")
 
     model_config = ConfigDict(from_attributes=True)  # Для чтения из ORM-объектов
 
 
+class ProductBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, description="ID товаров в нужном порядке")
+
+
+class ProductBatch(BaseModel):
+    """
+    Ответ пакетного запроса товаров.
+    """
+    items: list[Product] = Field(default_factory=list, description="Найденные активные товары в порядке запроса")
+    missing: list[int] = Field(default_factory=list, description="ID, для которых активный товар не найден")
+
+
+class ProductSuggestion(BaseModel):
+    """
+    Подсказка автодополнения поиска.
+    """
+    id: int = Field(..., description="ID товара")
+    name: str = Field(..., description="Название товара")
+
+
+class CategoryFacet(BaseModel):
+    category_id: int = Field(..., description="ID категории")
+    count: int = Field(..., ge=0, description="Количество товаров в категории")
+
+
+class PriceBucketFacet(BaseModel):
+    min_price: Decimal = Field(..., ge=0, description="Нижняя граница цены (включительно)")
+    max_price: Decimal | None = Field(None, description="Верхняя граница цены (не включительно), null — без ограничения")
+    count: int = Field(..., ge=0, description="Количество товаров в диапазоне")
+
+
+class ProductFacets(BaseModel):
+    """
+    Фасеты каталога для панели фильтров.
+    """
+    total: int = Field(ge=0, description="Общее количество товаров по фильтрам")
+    categories: list[CategoryFacet] = Field(default_factory=list, description="Количество товаров по категориям")
+    price_buckets: list[PriceBucketFacet] = Field(default_factory=list, description="Гистограмма цен")
+    in_stock: int = Field(ge=0, description="Товаров в наличии")
+    out_of_stock: int = Field(ge=0, description="Товаров без остатка")
+
+
+class ProductImportError(BaseModel):
+    line: int = Field(..., ge=1, description="Номер строки во входном файле")
+    errors: list[str] = Field(..., description="Ошибки валидации строки")
+
+
+class ProductImportResult(BaseModel):
+    """
+    Отчёт о массовом импорте товаров.
+    """
+    imported: int = Field(..., ge=0, description="Сколько товаров загружено")
+    failed: int = Field(..., ge=0, description="Сколько строк отклонено")
+    errors: list[ProductImportError] = Field(default_factory=list, description="Ошибки по строкам (не более первых 1000)")
+    elapsed_seconds: float = Field(..., ge=0, description="Время обработки запроса")
+    rows_per_second: float = Field(..., ge=0, description="Пропускная способность загрузки")
+
+
 class CartItemBase(BaseModel):
     product_id: int = Field(description="ID товара")
     quantity: int = Field(ge=1, description="Количество товара")
@@ -0,0 +1,53 @@
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+
+from app.config import FAST_JSON_RESPONSES
+
+
+class RawJSONResponse(Response):
+    """
+    Ответ с уже сериализованным JSON: байты уходят клиенту как есть,
+    без jsonable_encoder и json.dumps.
+    """
+    media_type = "application/json"
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_type: Any) -> TypeAdapter:
+    # TypeAdapter компилирует валидатор и сериализатор — создаём один раз на тип
+    return TypeAdapter(response_type)
+
+
+def dump_json(response_type: Any, content: Any) -> bytes:
+    """
+    Валидирует content (ORM-объекты, словари, модели) по типу ответа
+    и сериализует его в JSON-байты в pydantic-core.
+    """
+    adapter = _adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def json_response(
+    response_type: Any,
+    content: Any,
+    *,
+    status_code: int = status.HTTP_200_OK,
+    headers: Mapping[str, str] | None = None,
+) -> Any:
+    """
+    При FAST_JSON_RESPONSES возвращает готовый RawJSONResponse, иначе content
+    как есть — его сериализует FastAPI по response_model эндпоинта.
+    headers нужны только для быстрого пути: в обычном FastAPI сам переносит
+    заголовки из параметра Response эндпоинта.
+    """
+    if not FAST_JSON_RESPONSES:
+        return content
+    return RawJSONResponse(
+        content=dump_json(response_type, content),
+        status_code=status_code,
+        headers=headers,
+    )
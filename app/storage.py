@@ -0,0 +1,237 @@
+import os
+import re
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import (
+    MEDIA_PUBLIC_URL,
+    MEDIA_STORAGE,
+    S3_ACCESS_KEY_ID,
+    S3_BUCKET,
+    S3_ENDPOINT_URL,
+    S3_PREFIX,
+    S3_REGION,
+    S3_SECRET_ACCESS_KEY,
+)
+from app.database import async_session_maker
+from app.images import derivative_paths
+from app.models.media_blobs import MediaBlob as MediaBlobModel
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MEDIA_ROOT = BASE_DIR / "media" / "products"
+MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
+# Временные файлы загрузок — на той же файловой системе, чтобы os.replace был атомарным
+STAGING_ROOT = MEDIA_ROOT / ".staging"
+
+# Имена по SHA-256 содержимого (и их производные) никогда не перезаписываются
+CONTENT_ADDRESSED_RE = re.compile(r"^[0-9a-f]{64}(_thumb|_medium)?\.(jpg|png|webp)$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class MediaStorage(ABC):
+    """
+    Хранилище файлов изображений. Имена плоские (например, "<sha256>.png").
+    """
+
+    @abstractmethod
+    async def exists(self, name: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def save(self, name: str, source: Path) -> None:
+        """
+        Сохраняет локальный файл source под именем name; source после вызова не нужен.
+        """
+
+    @abstractmethod
+    async def delete(self, name: str) -> None:
+        ...
+
+    @abstractmethod
+    def url(self, name: str) -> str:
+        ...
+
+
+class LocalMediaStorage(MediaStorage):
+    """
+    Файлы в каталоге media/products, раздаются nginx или StaticFiles по /media/products/.
+    """
+
+    def __init__(self, root: Path, base_url: str = "/media/products") -> None:
+        self._root = root
+        self._base_url = base_url
+
+    async def exists(self, name: str) -> bool:
+        return await anyio.to_thread.run_sync((self._root / name).exists)
+
+    async def save(self, name: str, source: Path) -> None:
+        await anyio.to_thread.run_sync(os.replace, source, self._root / name)
+
+    async def delete(self, name: str) -> None:
+        await anyio.to_thread.run_sync(lambda: (self._root / name).unlink(missing_ok=True))
+
+    def url(self, name: str) -> str:
+        return f"{self._base_url}/{name}"
+
+
+class S3MediaStorage(MediaStorage):
+    """
+    S3-совместимое хранилище (AWS S3, MinIO и т.п.). boto3 синхронный —
+    вызовы выполняются в пуле потоков. Объекты с хешем в имени кэшируются навсегда.
+    Готовый клиент можно передать в client (в тестах — совместимую заглушку).
+    """
+
+    def __init__(self, bucket: str, public_url: str, prefix: str = "", client=None, **client_options) -> None:
+        if client is None:
+            try:
+                import boto3
+            except ImportError as exc:
+                raise RuntimeError("MEDIA_STORAGE=s3 requires the 'boto3' package") from exc
+            client = boto3.client("s3", **client_options)
+        self._client = client
+        self._client_error = client.exceptions.ClientError
+        self._bucket = bucket
+        self._public_url = public_url.rstrip("/")
+        self._prefix = prefix
+
+    async def exists(self, name: str) -> bool:
+        def head() -> bool:
+            try:
+                self._client.head_object(Bucket=self._bucket, Key=self._prefix + name)
+            except self._client_error as exc:
+                if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                    return False
+                raise
+            return True
+
+        return await anyio.to_thread.run_sync(head)
+
+    async def save(self, name: str, source: Path) -> None:
+        content_type = "image/webp" if name.endswith(".webp") else "image/png" if name.endswith(".png") else "image/jpeg"
+        extra_args = {"ContentType": content_type}
+        if CONTENT_ADDRESSED_RE.match(name):
+            extra_args["CacheControl"] = IMMUTABLE_CACHE_CONTROL
+        await anyio.to_thread.run_sync(
+            lambda: self._client.upload_file(str(source), self._bucket, self._prefix + name, ExtraArgs=extra_args)
+        )
+
+    async def delete(self, name: str) -> None:
+        await anyio.to_thread.run_sync(
+            lambda: self._client.delete_object(Bucket=self._bucket, Key=self._prefix + name)
+        )
+
+    def url(self, name: str) -> str:
+        return f"{self._public_url}/{self._prefix}{name}"
+
+
+class MediaStaticFiles(StaticFiles):
+    """
+    StaticFiles для /media: файлы с хешем содержимого в имени отдаются как immutable.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if CONTENT_ADDRESSED_RE.match(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def create_media_storage() -> MediaStorage:
+    """
+    Создаёт хранилище по настройке MEDIA_STORAGE ("local" или "s3").
+    """
+    if MEDIA_STORAGE == "s3":
+        if not S3_BUCKET or not MEDIA_PUBLIC_URL:
+            raise RuntimeError("S3_BUCKET and MEDIA_PUBLIC_URL are required for MEDIA_STORAGE=s3")
+        client_options = {
+            "endpoint_url": S3_ENDPOINT_URL,
+            "region_name": S3_REGION,
+            "aws_access_key_id": S3_ACCESS_KEY_ID,
+            "aws_secret_access_key": S3_SECRET_ACCESS_KEY,
+        }
+        return S3MediaStorage(
+            S3_BUCKET,
+            MEDIA_PUBLIC_URL,
+            S3_PREFIX,
+            **{key: value for key, value in client_options.items() if value},
+        )
+    if MEDIA_STORAGE == "local":
+        return LocalMediaStorage(MEDIA_ROOT)
+    raise RuntimeError("MEDIA_STORAGE must be 'local' or 's3'")
+
+
+media_storage = create_media_storage()
+
+
+def blob_name(url: str) -> str:
+    return url.rpartition("/")[2]
+
+
+async def _lock_blob(db: AsyncSession, name: str) -> None:
+    """
+    Блокировка blob до конца транзакции: загрузка держит её, пока сохраняет файлы,
+    сборщик — пока их удаляет.
+    """
+    await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(name))))
+
+
+async def acquire_blob(db: AsyncSession, name: str) -> None:
+    """
+    Увеличивает счётчик ссылок на blob в транзакции вызывающего. До её завершения
+    строка и блокировка blob удерживаются, поэтому сборщик не удалит файл,
+    который мы сейчас используем или сохраняем.
+    """
+    await _lock_blob(db, name)
+    stmt = insert(MediaBlobModel).values(name=name, refcount=1)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[MediaBlobModel.name],
+            set_={"refcount": MediaBlobModel.refcount + 1},
+        )
+    )
+
+
+async def release_blob(db: AsyncSession, name: str) -> None:
+    """
+    Уменьшает счётчик ссылок в транзакции вызывающего. Сами файлы удаляет
+    collect_blob после коммита.
+    """
+    await db.execute(
+        update(MediaBlobModel)
+        .where(MediaBlobModel.name == name)
+        .values(refcount=MediaBlobModel.refcount - 1)
+    )
+
+
+async def collect_blob(name: str) -> None:
+    """
+    Фоновая задача: удаляет blob и его производные, если ссылок на него не осталось.
+    Сначала фиксируется удаление строки, потом удаляются файлы: сбой между шагами
+    оставит лишний файл, но не товар со ссылкой на удалённый.
+    Файлы удаляются под блокировкой blob и только если строку никто не создал заново:
+    параллельная загрузка того же содержимого либо успела сослаться на файлы, и они
+    остаются, либо дождётся удаления и сохранит их заново.
+    Файлы со старыми uuid-именами не учитываются в media_blobs и удаляются сразу.
+    """
+    async with async_session_maker() as db:
+        if CONTENT_ADDRESSED_RE.match(name):
+            collected = await db.scalar(
+                delete(MediaBlobModel)
+                .where(MediaBlobModel.name == name, MediaBlobModel.refcount <= 0)
+                .returning(MediaBlobModel.name)
+            )
+            await db.commit()
+            if collected is None:
+                return
+            await _lock_blob(db, name)
+            if await db.scalar(select(MediaBlobModel.name).where(MediaBlobModel.name == name)):
+                return
+        for file_name in (name, *(path.name for path in derivative_paths(Path(name)))):
+            await media_storage.delete(file_name)
+        await db.commit()
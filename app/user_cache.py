@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+
+from loguru import logger
+from sqlalchemy import select, update
+
+from app import metrics
+from app.cache import TTLCache
+from app.config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REDIS_URL,
+    USER_CACHE_INVALIDATION,
+    USER_CACHE_SIZE,
+    USER_CACHE_TTL,
+    USER_REVOCATION_REFRESH_SECONDS,
+)
+from app.database import async_session_maker
+from app.models.users import User as UserModel
+
+INVALIDATION_CHANNEL = "auth:user-invalidate"
+
+_cache = TTLCache(ttl=USER_CACHE_TTL, maxsize=USER_CACHE_SIZE) if USER_CACHE_TTL > 0 else None
+_redis = None
+_hits = 0
+_lookups = 0
+
+# Пользователи, чьи уже выданные access-токены нельзя проверять только по claims:
+# запись живёт столько же, сколько токен, выданный до инвалидации
+_stale_claims = TTLCache(ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60, maxsize=USER_CACHE_SIZE)
+# ID деактивированных пользователей; None — набор ещё не загружен
+_deactivated_ids: frozenset[int] | None = None
+_deactivated_loaded_at = 0.0
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """
+    Снимок активного пользователя: только то, что нужно эндпоинтам (без хеша пароля).
+    """
+    id: int
+    email: str
+    role: str
+
+    def to_model(self) -> UserModel:
+        # Отдельный (transient) объект на каждый запрос: сессии между запросами не разделяются
+        return UserModel(id=self.id, email=self.email, role=self.role, is_active=True)
+
+
+def _record(hit: bool) -> None:
+    global _hits, _lookups
+    _lookups += 1
+    _hits += hit
+    metrics.increment("user_cache_hits_total" if hit else "user_cache_misses_total")
+    metrics.set_gauge("user_cache_hit_rate", _hits / _lookups)
+
+
+def get(email: str) -> UserModel | None:
+    """
+    Активный пользователь по JWT subject (email) или None при промахе.
+    """
+    if _cache is None:
+        return None
+    cached = _cache.get(email)
+    _record(cached is not None)
+    return cached.to_model() if cached is not None else None
+
+
+def store(user: UserModel) -> None:
+    if _cache is not None:
+        _cache.set(user.email, CachedUser(id=user.id, email=user.email, role=user.role))
+
+
+def _get_redis():
+    global _redis
+    if _redis is None:
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError("USER_CACHE_INVALIDATION=redis requires the 'redis' package") from exc
+        if not REDIS_URL:
+            raise RuntimeError("REDIS_URL is not set. It is required for USER_CACHE_INVALIDATION=redis")
+        _redis = redis_asyncio.from_url(REDIS_URL)
+    return _redis
+
+
+async def invalidate(email: str) -> None:
+    """
+    Сбрасывает пользователя из кэша после деактивации или смены роли и перестаёт
+    доверять claims его токенов. При USER_CACHE_INVALIDATION=redis сброс получают все воркеры.
+    """
+    _stale_claims.set(email, True)
+    if _cache is not None:
+        _cache.delete(email)
+    if USER_CACHE_INVALIDATION == "redis":
+        try:
+            await _get_redis().publish(INVALIDATION_CHANNEL, email)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"User cache invalidation publish failed: {exc}")
+
+
+async def listen_for_invalidations() -> None:
+    """
+    Фоновая задача (lifespan): применяет сбросы из других воркеров.
+    После обрыва подписки кэш очищается целиком — сообщения за это время потеряны.
+    """
+    if USER_CACHE_INVALIDATION != "redis":
+        return
+    while True:
+        try:
+            async with _get_redis().pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        email = message["data"].decode("utf-8")
+                        _stale_claims.set(email, True)
+                        if _cache is not None:
+                            _cache.delete(email)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"User cache invalidation subscription failed: {exc}")
+        if _cache is not None:
+            _cache.clear()
+        # Пропущенные сбросы могли касаться кого угодно: до следующего обновления
+        # набора деактивированных все токены проверяются через базу
+        _forget_deactivated()
+        await asyncio.sleep(1)
+
+
+def _forget_deactivated() -> None:
+    global _deactivated_ids
+    _deactivated_ids = None
+
+
+def claims_trusted(email: str) -> bool:
+    """
+    Можно ли принять пользователя по claims access-токена без запроса к users:
+    набор деактивированных свежий и пользователь не инвалидировался за время жизни токена.
+    """
+    if _deactivated_ids is None:
+        return False
+    if time.monotonic() - _deactivated_loaded_at > 3 * USER_REVOCATION_REFRESH_SECONDS:
+        return False
+    return email not in _stale_claims
+
+
+def is_deactivated(user_id: int) -> bool:
+    return _deactivated_ids is not None and user_id in _deactivated_ids
+
+
+async def refresh_deactivated() -> None:
+    """
+    Перечитывает ID деактивированных пользователей (частичный индекс ix_users_inactive_id).
+    """
+    global _deactivated_ids, _deactivated_loaded_at
+    async with async_session_maker() as db:
+        result = await db.scalars(select(UserModel.id).where(UserModel.is_active == False))
+        _deactivated_ids = frozenset(result)
+    _deactivated_loaded_at = time.monotonic()
+    metrics.set_gauge("deactivated_users", len(_deactivated_ids))
+
+
+async def run_deactivated_refresher() -> None:
+    """
+    Фоновая задача (lifespan): обновляет набор каждые USER_REVOCATION_REFRESH_SECONDS.
+    Если база недоступна дольше трёх интервалов, claims_trusted возвращает False.
+    """
+    while True:
+        try:
+            await refresh_deactivated()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Deactivated users refresh failed: {exc}")
+        await asyncio.sleep(USER_REVOCATION_REFRESH_SECONDS)
+
+
+async def update_user(email: str, is_active: bool | None = None, role: str | None = None) -> bool:
+    """
+    Меняет активность и/или роль пользователя и сразу сбрасывает его из кэша.
+    Возвращает False, если пользователя с таким email нет.
+    """
+    values = {}
+    if is_active is not None:
+        values["is_active"] = is_active
+    if role is not None:
+        values["role"] = role
+    async with async_session_maker() as db:
+        result = await db.execute(
+            update(UserModel).where(UserModel.email == email).values(**values).returning(UserModel.id)
+        )
+        user_id = result.scalar()
+        await db.commit()
+    if user_id is None:
+        return False
+    await invalidate(email)
+    return True
+
+
+async def _update_user_command(args) -> int:
+    try:
+        found = await update_user(args.email, args.active, args.role)
+    finally:
+        if _redis is not None:
+            await _redis.aclose()
+    if not found:
+        print(f"user not found: {args.email}")
+        return 1
+    print(f"user updated: {args.email}")
+    return 0
+
+
+def main() -> None:
+    """
+    Деактивация пользователя или смена роли со сбросом кэшей авторизации:
+    python -m app.user_cache EMAIL [--deactivate | --activate] [--role buyer|seller]
+
+    Сброс доходит до воркеров только при USER_CACHE_INVALIDATION=redis. Иначе, как и после
+    UPDATE users напрямую в базе, воркеры видят изменение с задержкой: get_current_user —
+    через USER_CACHE_TTL, проверка по claims — деактивацию через USER_REVOCATION_REFRESH_SECONDS,
+    а смену роли только с новым access-токеном (до ACCESS_TOKEN_EXPIRE_MINUTES).
+    """
+    parser = argparse.ArgumentParser(description="Деактивация пользователя или смена роли со сбросом кэша")
+    parser.add_argument("email")
+    activity = parser.add_mutually_exclusive_group()
+    activity.add_argument("--deactivate", dest="active", action="store_false", default=None)
+    activity.add_argument("--activate", dest="active", action="store_true")
+    parser.add_argument("--role", choices=("buyer", "seller"))
+    args = parser.parse_args()
+    if args.active is None and args.role is None:
+        parser.error("nothing to change: pass --deactivate, --activate or --role")
+    if USER_CACHE_INVALIDATION != "redis":
+        print("USER_CACHE_INVALIDATION=local: running workers will pick the change up only after "
+              "their caches expire (see python -m app.user_cache --help)")
+    raise SystemExit(asyncio.run(_update_user_command(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,9 @@
+# Файлы с SHA-256 содержимого в имени никогда не меняются — кэшируем их навсегда
+map $uri $media_cache_control {
+    default "public, max-age=2592000";
+    "~^/media/products/[0-9a-f]{64}(_thumb|_medium)?\.(jpg|png|webp)$" "public, max-age=31536000, immutable";
+}
+
 server {
     listen 80;
     listen [::]:80;
@@ -36,12 +42,20 @@ server {
         try_files $uri =404;
     }
 
-    location /media/ {
+    # location /media/ по MEDIA_SERVE_MODE: media-static.conf.tpl или media-accel.conf.tpl
+    include /etc/nginx/snippets/media.conf;
+
+    # Цель X-Accel-Redirect при MEDIA_SERVE_MODE=accel: снаружи недоступна,
+    # Cache-Control берётся из ответа приложения
+    location /internal-media/ {
+        internal;
         alias /var/www/media/;
         access_log off;
-        expires 30d;
-        add_header Cache-Control "public, max-age=2592000";
-        try_files $uri =404;
+    }
+
+    # Счётчики воркеров (METRICS_ENABLED) снимаются только изнутри сети, не через nginx
+    location = /metrics {
+        return 404;
     }
 
     location / {
@@ -0,0 +1,10 @@
+# MEDIA_SERVE_MODE=accel: /media/ проксируется в приложение, оно проверяет путь
+# и отвечает X-Accel-Redirect на internal-локацию /internal-media/
+location /media/ {
+    proxy_pass http://${APP_UPSTREAM_HOST}:${APP_PORT};
+    proxy_http_version 1.1;
+    proxy_set_header Host $host;
+    proxy_set_header X-Real-IP $remote_addr;
+    proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+    access_log off;
+}
@@ -0,0 +1,7 @@
+# MEDIA_SERVE_MODE=static: nginx отдаёт /media/ прямо с тома, приложение не участвует
+location /media/ {
+    alias /var/www/media/;
+    access_log off;
+    add_header Cache-Control $media_cache_control;
+    try_files $uri =404;
+}
@@ -3,6 +3,7 @@ set -eu
 
 template_dir="/etc/nginx/custom-templates"
 target="/etc/nginx/conf.d/default.conf"
+media_target="/etc/nginx/snippets/media.conf"
 cert_dir="/etc/letsencrypt/live/${NGINX_SERVER_NAME}"
 fullchain="${cert_dir}/fullchain.pem"
 privkey="${cert_dir}/privkey.pem"
@@ -12,5 +13,16 @@ if [ -f "$fullchain" ] && [ -f "$privkey" ]; then
     template="${template_dir}/https.conf.tpl"
 fi
 
+MEDIA_SERVE_MODE="${MEDIA_SERVE_MODE:-static}"
+case "$MEDIA_SERVE_MODE" in
+    static|accel) ;;
+    *)
+        echo "MEDIA_SERVE_MODE must be 'static' or 'accel', got '${MEDIA_SERVE_MODE}'" >&2
+        exit 1
+        ;;
+esac
+
 export APP_PORT APP_UPSTREAM_HOST NGINX_CLIENT_MAX_BODY_SIZE NGINX_SERVER_NAME
+mkdir -p "$(dirname "$media_target")"
+envsubst '${APP_PORT} ${APP_UPSTREAM_HOST}' < "${template_dir}/media-${MEDIA_SERVE_MODE}.conf.tpl" > "$media_target"
 envsubst '${APP_PORT} ${APP_UPSTREAM_HOST} ${NGINX_CLIENT_MAX_BODY_SIZE} ${NGINX_SERVER_NAME}' < "$template" > "$target"
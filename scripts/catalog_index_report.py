@@ -0,0 +1,325 @@
+"""
+Отчёт по индексам каталога: наполняет products тестовыми данными и для каждой формы
+запроса get_all_products печатает план (какие индексы использованы) и задержку p50/p99.
+С --facets дополнительно сравнивает запрос фасетов с отдельными запросами по каждому фасету,
+с --search — добавляет товары с русскими названиями, меряет подсказки /products/suggest
+(нужен pg_trgm) и сравнивает полнотекстовый поиск в конфигурациях english и russian.
+
+Запускать только на отдельной базе со схемой после `alembic upgrade head`:
+
+    ASYNC_DATABASE_URL=postgresql+asyncpg://... python -m scripts.catalog_index_report --products 2000000
+
+Планы строятся как generic-планы prepared statement (plan_cache_mode = force_generic_plan) —
+так их в итоге выполняет asyncpg. Код возврата 1, если какая-то страница
+каталога читает products последовательным сканированием или не использует ожидаемый индекс.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+from sqlalchemy import Numeric, func, select, text
+from sqlalchemy.dialects.postgresql import array
+
+from app.database import async_engine, async_session_maker
+from app.models.products import Product as ProductModel
+from app.routers.products import (
+    PRICE_FACET_BOUNDS,
+    _build_product_filters,
+    _compile_statement,
+    _facets_statement,
+    _fetch_products_page,
+    _id_page_statement,
+    _suggest_statement,
+)
+
+SEED_BATCH_SIZE = 500_000
+PAGE_SIZE = 20
+SEARCH_CATEGORY = "Report search"
+# Названия для поиска: "<товар> <бренд> <номер>"
+SEARCH_NOUNS = ("Смартфон", "Ноутбук", "Чехол", "Наушники", "Телевизор", "Планшет", "Кабель", "Фотоаппарат")
+SEARCH_BRANDS = ("Samsung", "Xiaomi", "Apple", "Huawei", "Lenovo", "Sony", "Philips", "Realme")
+# Запросы подсказок: частый префикс, редкий префикс, опечатки в товаре и бренде
+SUGGEST_QUERIES = ("Смарт", "Фотоаппарат Sony 1999", "Ноутбк", "Xiaomy")
+# Полнотекстовые запросы в других словоформах, чем в названиях
+FTS_QUERIES = ("смартфоны", "наушников sony", "телевизоры samsung")
+
+
+async def _seed(db, products: int, categories: int, sellers: int) -> None:
+    existing = await db.scalar(select(func.count()).select_from(ProductModel))
+    missing = products - existing
+    if missing <= 0:
+        print(f"products: {existing}, seeding skipped")
+        return
+    await db.execute(text(
+        "INSERT INTO users (email, hashed_password, is_active, role)"
+        " SELECT 'report-seller-' || g || '@example.com', 'x', true, 'seller'"
+        " FROM generate_series(1, :sellers) g ON CONFLICT (email) DO NOTHING"
+    ), {"sellers": sellers})
+    if not await db.scalar(text("SELECT count(*) FROM categories WHERE name LIKE 'Report %'")):
+        await db.execute(text(
+            "INSERT INTO categories (name, is_active) SELECT 'Report ' || g, true FROM generate_series(1, :categories) g"
+        ), {"categories": categories})
+    await db.commit()
+
+    started = time.perf_counter()
+    for offset in range(0, missing, SEED_BATCH_SIZE):
+        count = min(SEED_BATCH_SIZE, missing - offset)
+        # ~90% активных, ~30% без остатка, цены 0–50000
+        await db.execute(text(
+            "INSERT INTO products (name, description, price, stock, is_active, category_id, seller_id, rating)"
+            " SELECT 'Product ' || (:offset + g), NULL, round((random() * 50000)::numeric, 2),"
+            " CASE WHEN random() < 0.3 THEN 0 ELSE (random() * 100)::int END, random() < 0.9,"
+            " c.ids[1 + g % array_length(c.ids, 1)], s.ids[1 + g % array_length(s.ids, 1)], 0"
+            " FROM generate_series(1, :count) g,"
+            " (SELECT array_agg(id) AS ids FROM categories WHERE name LIKE 'Report %') c,"
+            " (SELECT array_agg(id) AS ids FROM users WHERE email LIKE 'report-seller-%') s"
+        ), {"offset": existing + offset, "count": count})
+        await db.commit()
+        print(f"seeded {existing + offset + count}/{products} products")
+    await db.execute(text("ANALYZE products"))
+    await db.commit()
+    print(f"seeding took {time.perf_counter() - started:.1f}s")
+
+
+async def _seed_search(db, products: int) -> None:
+    """
+    Товары с русскими названиями в отдельной категории: "Product N" из основного
+    наполнения не годится ни для подсказок, ни для стемминга.
+    """
+    if await db.scalar(text("SELECT count(*) FROM categories WHERE name = :name"), {"name": SEARCH_CATEGORY}):
+        print("search products: seeding skipped")
+        return
+    await db.execute(text("INSERT INTO categories (name, is_active) VALUES (:name, true)"), {"name": SEARCH_CATEGORY})
+    await db.execute(text(
+        "INSERT INTO products (name, description, price, stock, is_active, category_id, seller_id, rating)"
+        " SELECT n.nouns[1 + g % array_length(n.nouns, 1)] || ' '"
+        " || n.brands[1 + (g / array_length(n.nouns, 1)) % array_length(n.brands, 1)] || ' ' || g,"
+        " NULL, round((random() * 50000)::numeric, 2), (random() * 100)::int, true,"
+        " (SELECT id FROM categories WHERE name = :category),"
+        " (SELECT min(id) FROM users WHERE email LIKE 'report-seller-%'), 0"
+        " FROM generate_series(1, :count) g, (SELECT CAST(:nouns AS text[]) AS nouns, CAST(:brands AS text[]) AS brands) n"
+    ), {"category": SEARCH_CATEGORY, "count": products, "nouns": list(SEARCH_NOUNS), "brands": list(SEARCH_BRANDS)})
+    await db.execute(text("ANALYZE products"))
+    await db.commit()
+    print(f"seeded {products} search products")
+
+
+async def _search_report(repeat: int) -> None:
+    """
+    Задержка запроса подсказок /products/suggest (цель — p99 < 10 мс) и полнотекстовый
+    поиск english против russian: сколько товаров найдено и задержка первой страницы.
+    """
+    async with async_session_maker() as db:
+        print(f"\n{'suggest q':<24} {'rows':>6} {'p50 ms':>8} {'p99 ms':>8}")
+        for query in SUGGEST_QUERIES:
+            stmt = _suggest_statement(query, 10)
+            rows = (await db.execute(stmt)).all()
+            p50, p99 = await _timed(db, [stmt], repeat)
+            print(f"{query:<24} {len(rows):>6} {p50:>8.2f} {p99:>8.2f}")
+
+        print(f"\n{'search':<24} {'language':<10} {'found':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for query in FTS_QUERIES:
+            for language in ("english", "russian"):
+                filters, rank_col = _build_product_filters(
+                    category_ids=None, min_price=None, max_price=None, in_stock=None, seller_id=None,
+                    search=query, search_language=language,
+                )
+                found = await db.scalar(select(func.count()).select_from(ProductModel).where(*filters))
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    await _fetch_products_page(db, filters, rank_col, "rank", None, 1, PAGE_SIZE)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    db.expunge_all()
+                p99 = statistics.quantiles(timings, n=100)[98]
+                print(f"{query:<24} {language:<10} {found:>8} {statistics.median(timings):>8.2f} {p99:>8.2f}")
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+def _sql_literal(value) -> str:
+    # В формах запросов каталога без поиска параметры только числовые и логические
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    raise TypeError(f"unsupported parameter {value!r}")
+
+
+async def _generic_plan(driver_connection, sql: str, params: tuple) -> dict:
+    """
+    План, который получит prepared statement после перехода на generic-план:
+    PREPARE + EXPLAIN EXECUTE при plan_cache_mode = force_generic_plan.
+    (EXPLAIN самого запроса с параметрами показал бы custom-план под конкретные значения.)
+    """
+    await driver_connection.execute(f"PREPARE catalog_report AS {sql}")
+    try:
+        arguments = ", ".join(_sql_literal(value) for value in params)
+        plan = await driver_connection.fetchval(f"EXPLAIN (FORMAT JSON) EXECUTE catalog_report({arguments})")
+    finally:
+        await driver_connection.execute("DEALLOCATE catalog_report")
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+async def _query_shapes(db) -> dict[str, dict]:
+    category_ids = (await db.scalars(
+        text("SELECT id FROM categories WHERE name LIKE 'Report %' ORDER BY id LIMIT 3")
+    )).all()
+    seller_id = await db.scalar(text("SELECT min(id) FROM users WHERE email LIKE 'report-seller-%'"))
+    if not category_ids or seller_id is None:
+        raise SystemExit("No report data found: run without --skip-seed first")
+    category_id = category_ids[0]
+    return {
+        "all": {},
+        "category": {"category_ids": (category_id,)},
+        "category_subtree": {"category_ids": tuple(category_ids)},
+        "seller": {"seller_id": seller_id},
+        "price_range": {"min_price": 1000, "max_price": 1500},
+        "category_price_range": {"category_ids": (category_id,), "min_price": 1000, "max_price": 5000},
+        # Частичные индексы "is_active AND stock > 0" должны выбираться и в generic-плане
+        "in_stock": {"in_stock": True, "expect": "ix_products_in_stock_id"},
+        "category_in_stock": {
+            "category_ids": (category_id,), "in_stock": True, "expect": "ix_products_in_stock_category_id",
+        },
+    }
+
+
+def _shape_filters(params: dict) -> list:
+    filters, _ = _build_product_filters(
+        category_ids=params.get("category_ids"),
+        min_price=params.get("min_price"),
+        max_price=params.get("max_price"),
+        in_stock=params.get("in_stock"),
+        seller_id=params.get("seller_id"),
+        search="",
+    )
+    return filters
+
+
+def _separate_facet_statements(filters: list) -> list:
+    """
+    Те же фасеты отдельными запросами — как их считали бы без GROUPING SETS.
+    """
+    bounds = array([Decimal(bound) for bound in PRICE_FACET_BOUNDS], type_=Numeric(10, 2))
+    price_bucket = func.width_bucket(ProductModel.price, bounds)
+    in_stock = ProductModel.stock > 0
+    return [
+        select(ProductModel.category_id, func.count()).where(*filters).group_by(ProductModel.category_id),
+        select(price_bucket, func.count()).where(*filters).group_by(price_bucket),
+        select(in_stock, func.count()).where(*filters).group_by(in_stock),
+        select(func.count()).select_from(ProductModel).where(*filters),
+    ]
+
+
+async def _timed(db, statements: list, repeat: int) -> tuple[float, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for stmt in statements:
+            (await db.execute(stmt)).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    p99 = statistics.quantiles(timings, n=100)[98] if len(timings) > 1 else timings[0]
+    return statistics.median(timings), p99
+
+
+async def _facets_report(repeat: int) -> None:
+    """
+    GET /products/facets: один запрос с GROUPING SETS против четырёх отдельных.
+    """
+    async with async_session_maker() as db:
+        shapes = await _query_shapes(db)
+        print(f"\n{'facets shape':<24} {'single p50/p99 ms':>20} {'separate p50/p99 ms':>22}")
+        for name in ("all", "category", "price_range", "in_stock"):
+            filters = _shape_filters(shapes[name])
+            single = await _timed(db, [_facets_statement(filters)], repeat)
+            separate = await _timed(db, _separate_facet_statements(filters), repeat)
+            print(
+                f"{name:<24} {single[0]:>9.2f} / {single[1]:>8.2f} {separate[0]:>10.2f} / {separate[1]:>9.2f}"
+            )
+
+
+async def _report(repeat: int, deep_page: int) -> bool:
+    ok = True
+    async with async_session_maker() as db:
+        shapes = await _query_shapes(db)
+        middle_id = await db.scalar(select(func.max(ProductModel.id))) // 2
+        conn = await db.connection()
+        driver_connection = (await conn.get_raw_connection()).driver_connection
+        await conn.exec_driver_sql("SET plan_cache_mode = force_generic_plan")
+        print(f"{'shape':<24} {'page':<12} {'indexes':<60} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, params in shapes.items():
+            filters = _shape_filters(params)
+            # deep_offset — страница deep_page через OFFSET, для сравнения с keyset из середины таблицы
+            page_kinds = (("offset", None, 1), ("deep_offset", None, deep_page), ("keyset", middle_id, 1))
+            for page_kind, last_id, page in page_kinds:
+                stmt = _id_page_statement(filters, last_id, page, PAGE_SIZE)
+                plan = await _generic_plan(driver_connection, *_compile_statement(stmt, conn.dialect))
+                nodes = list(_plan_nodes(plan[0]["Plan"]))
+                seq_scan = any(
+                    node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "products" for node in nodes
+                )
+                # Bitmap Index Scan не содержит имени таблицы, поэтому индексы собираем по всем узлам
+                used = {node["Index Name"] for node in nodes if "Index Name" in node}
+                unexpected = "expect" in params and params["expect"] not in used
+                # Глубокий OFFSET показан для сравнения с keyset и на код возврата не влияет
+                if page_kind != "deep_offset":
+                    ok = ok and not seq_scan and not unexpected
+                indexes = ", ".join(sorted(used))
+
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    (await db.execute(stmt)).all()
+                    timings.append((time.perf_counter() - started) * 1000)
+                    db.expunge_all()
+                p99 = statistics.quantiles(timings, n=100)[98] if len(timings) > 1 else timings[0]
+                status = "SEQ SCAN" if seq_scan else f"EXPECTED {params['expect']}" if unexpected else ""
+                print(
+                    f"{name:<24} {page_kind:<12} {indexes or '-':<60} "
+                    f"{statistics.median(timings):>8.2f} {p99:>8.2f} {status}"
+                )
+    return ok
+
+
+async def main_async(args) -> int:
+    async_engine.sync_engine.echo = False
+    if not args.skip_seed:
+        async with async_session_maker() as db:
+            await _seed(db, args.products, args.categories, args.sellers)
+            if args.search:
+                await _seed_search(db, args.search_products)
+    ok = await _report(args.repeat, args.deep_page)
+    if args.facets:
+        await _facets_report(max(args.repeat // 5, 2))
+    if args.search:
+        await _search_report(args.repeat)
+    await async_engine.dispose()
+    return 0 if ok else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="EXPLAIN и задержки запросов каталога на тестовых данных")
+    parser.add_argument("--products", type=int, default=2_000_000, help="Сколько товаров должно быть в таблице")
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--sellers", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50, help="Повторов каждого запроса для p50/p99")
+    parser.add_argument(
+        "--deep-page", type=int, default=5000, help="Номер страницы для сравнения OFFSET с keyset-пагинацией"
+    )
+    parser.add_argument("--facets", action="store_true", help="Также сравнить запрос фасетов с отдельными запросами")
+    parser.add_argument("--search", action="store_true", help="Также измерить подсказки поиска (нужен pg_trgm)")
+    parser.add_argument("--search-products", type=int, default=200_000, help="Сколько товаров добавить для --search")
+    parser.add_argument("--skip-seed", action="store_true", help="Не добавлять данные, только отчёт")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
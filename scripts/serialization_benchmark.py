@@ -0,0 +1,142 @@
+"""
+Микробенчмарк быстрой сериализации (FAST_JSON_RESPONSES): ProductList, OrderList и Cart
+из ORM-объектов через обычный путь FastAPI (валидация по response_model, jsonable_encoder,
+json.dumps в JSONResponse) и через serialization.dump_json. Проверяет, что JSON совпадает
+байт в байт, и печатает время p50 на один ответ.
+
+    python -m scripts.serialization_benchmark --items 100 --repeat 200
+
+База не нужна, но app.config требует ASYNC_DATABASE_URL и SECRET_KEY в окружении.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app import serialization
+from app.models.cart_items import CartItem as CartItemModel
+from app.models.order_items import OrderItem as OrderItemModel
+from app.models.orders import Order as OrderModel
+from app.models.products import Product as ProductModel
+from app.schemas import Cart, OrderList, ProductList
+
+
+def _product(product_id: int) -> ProductModel:
+    stamp = datetime(2026, 10, 18, 12, 0, product_id % 60, 123456, tzinfo=timezone.utc)
+    return ProductModel(
+        id=product_id,
+        name=f"Смартфон Samsung Galaxy {product_id}",
+        description="Экран 6,1 дюйма, 128 ГБ памяти, две SIM-карты",
+        price=Decimal("54990.00"),
+        image_url=f"/media/products/{product_id:032x}.jpg",
+        image_derivatives=True,
+        stock=product_id % 17,
+        is_active=True,
+        category_id=1 + product_id % 5,
+        seller_id=1,
+        rating=4.5,
+        created_at=stamp,
+        updated_at=stamp,
+    )
+
+
+def sample_payloads(count: int) -> dict[str, tuple[type, object]]:
+    """
+    Ответы эндпоинтов каталога, заказов и корзины по count элементов в том виде,
+    в каком их отдают роутеры: ORM-объекты и словари.
+    """
+    products = [_product(product_id) for product_id in range(1, count + 1)]
+    orders = []
+    for order_id in range(1, count + 1):
+        items = [
+            OrderItemModel(
+                id=order_id * 10 + index,
+                product_id=product.id,
+                quantity=2,
+                unit_price=product.price,
+                total_price=product.price * 2,
+                product=product,
+            )
+            for index, product in enumerate(products[order_id % count:][:2])
+        ]
+        orders.append(OrderModel(
+            id=order_id,
+            user_id=1,
+            status="paid",
+            total_amount=sum(item.total_price for item in items),
+            created_at=products[0].created_at,
+            updated_at=products[0].updated_at,
+            items=items,
+        ))
+    cart_items = [CartItemModel(id=index, quantity=1, product=product) for index, product in enumerate(products, 1)]
+    return {
+        "ProductList": (ProductList, {
+            "items": products, "total": 10 * count, "page": 1, "page_size": count,
+            "next_cursor": None, "has_more": True,
+        }),
+        "OrderList": (OrderList, {"items": orders, "total": count, "page": 1, "page_size": count}),
+        "Cart": (Cart, {
+            "user_id": 1,
+            "items": cart_items,
+            "total_quantity": count,
+            "total_price": sum(product.price for product in products),
+        }),
+    }
+
+
+async def fastapi_json(response_type: type, content: object) -> bytes:
+    """
+    JSON, который отдаёт FastAPI без быстрого пути: serialize_response по полю
+    response_model и рендер JSONResponse.
+    """
+    field = create_model_field(name="Response", type_=response_type, mode="serialization")
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def _timed(call, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+async def main_async(args) -> int:
+    ok = True
+    print(f"{'response':<12} {'fastapi ms':>11} {'fast ms':>9} {'speedup':>8}")
+    for name, (response_type, content) in sample_payloads(args.items).items():
+        default_body = await fastapi_json(response_type, content)
+        fast_body = serialization.dump_json(response_type, content)
+        identical = default_body == fast_body
+        ok = ok and identical
+
+        async def default_path():
+            await fastapi_json(response_type, content)
+
+        async def fast_path():
+            serialization.dump_json(response_type, content)
+
+        default_ms = await _timed(default_path, args.repeat)
+        fast_ms = await _timed(fast_path, args.repeat)
+        status = "" if identical else "JSON DIFFERS"
+        print(f"{name:<12} {default_ms:>11.3f} {fast_ms:>9.3f} {default_ms / fast_ms:>7.1f}x {status}")
+    return 0 if ok else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение обычной и быстрой сериализации ответов")
+    parser.add_argument("--items", type=int, default=100, help="Элементов в каждом ответе")
+    parser.add_argument("--repeat", type=int, default=200, help="Повторов для p50")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.categories import Category as CategoryModel
+from app.models.products import Product as ProductModel
+from app.models.users import User as UserModel
+
+
+async def create_user(db: AsyncSession, email: str = "buyer@example.com", role: str = "buyer") -> UserModel:
+    user = UserModel(email=email, hashed_password="not-a-real-hash", role=role, is_active=True)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+async def create_category(db: AsyncSession, name: str, parent_id: int | None = None) -> CategoryModel:
+    category = CategoryModel(name=name, parent_id=parent_id, is_active=True)
+    db.add(category)
+    await db.commit()
+    return category
+
+
+async def create_product(
+    db: AsyncSession,
+    category_id: int,
+    seller_id: int,
+    name: str = "Product",
+    price: str = "100.00",
+    stock: int = 10,
+    image_url: str | None = None,
+) -> ProductModel:
+    product = ProductModel(
+        name=name, price=Decimal(price), stock=stock, category_id=category_id,
+        seller_id=seller_id, is_active=True, image_url=image_url,
+    )
+    db.add(product)
+    await db.commit()
+    return product
@@ -0,0 +1,58 @@
+import bcrypt
+import pytest
+
+from app import auth
+
+FAST_SALT = bcrypt.gensalt(rounds=4)
+
+
+@pytest.fixture
+def checkpw_calls(monkeypatch):
+    calls = []
+    checkpw = bcrypt.checkpw
+
+    def counting_checkpw(password: bytes, hashed: bytes) -> bool:
+        calls.append(password)
+        return checkpw(password, hashed)
+
+    monkeypatch.setattr(auth.bcrypt, "checkpw", counting_checkpw)
+    return calls
+
+
+def _unmarked(password: str) -> str:
+    # Формат предыдущего релиза: bcrypt(sha256(password)) без маркера
+    return bcrypt.hashpw(auth._prehash_password(password), FAST_SALT).decode("utf-8")
+
+
+def test_wrong_password_costs_one_checkpw_for_every_format(checkpw_calls):
+    for hashed in (auth.PASSWORD_HASH_PREFIX + _unmarked("secret"), _unmarked("secret")):
+        checkpw_calls.clear()
+
+        assert auth._verify_and_upgrade("wrong", hashed) == (False, None)
+        assert len(checkpw_calls) == 1
+
+
+def test_unmarked_hash_gets_marker_on_login():
+    hashed = _unmarked("secret")
+
+    assert auth._verify_and_upgrade("secret", hashed) == (True, auth.PASSWORD_HASH_PREFIX + hashed)
+
+
+def test_raw_bcrypt_hashes_are_checked_only_when_enabled(monkeypatch):
+    hashed = bcrypt.hashpw(b"secret", FAST_SALT).decode("utf-8")
+    assert auth._verify_and_upgrade("secret", hashed) == (False, None)
+
+    monkeypatch.setattr(auth, "PASSWORD_LEGACY_RAW_BCRYPT", True)
+    verified, upgraded = auth._verify_and_upgrade("secret", hashed)
+
+    assert verified and upgraded.startswith(auth.PASSWORD_HASH_PREFIX)
+    assert auth.verify_password("secret", upgraded)
+
+
+def test_stripping_the_marker_restores_the_previous_format():
+    # То, что делает SQL отката из комментария к PASSWORD_HASH_PREFIX: substr(hashed_password, 15)
+    marked = auth.PASSWORD_HASH_PREFIX + _unmarked("secret")
+    assert len(auth.PASSWORD_HASH_PREFIX) == 14
+
+    stripped = marked[len(auth.PASSWORD_HASH_PREFIX):]
+    assert bcrypt.checkpw(auth._prehash_password("secret"), stripped.encode("utf-8"))
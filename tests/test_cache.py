@@ -0,0 +1,24 @@
+import pytest
+
+from app.cache import CacheBackend, InMemoryCacheBackend
+
+
+class _GetOnlyBackend(CacheBackend):
+    async def get(self, key: str) -> bytes | None:
+        return None
+
+
+def test_incomplete_backend_fails_on_construction():
+    with pytest.raises(TypeError):
+        _GetOnlyBackend()
+
+
+@pytest.mark.anyio
+async def test_in_memory_backend_invalidates_by_tag():
+    backend = InMemoryCacheBackend(maxsize=10)
+    await backend.set("a", b"1", ttl=60, tags=["product:1"])
+    await backend.set("b", b"2", ttl=60, tags=["product:2"])
+
+    await backend.invalidate_tags(["product:1"])
+
+    assert await backend.get_many(["a", "b"]) == [None, b"2"]
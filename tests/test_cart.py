@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.database import async_session_maker
+from app.models.cart_items import CartItem as CartItemModel
+from app.models.users import User as UserModel
+from app.routers.cart import add_item_to_cart, update_cart_item
+from app.schemas import CartItemCreate, CartItemUpdate
+from tests.factories import create_category, create_product, create_user
+
+
+async def _shop(db):
+    buyer = await create_user(db, "buyer@example.com", "buyer")
+    seller = await create_user(db, "seller@example.com", "seller")
+    category = await create_category(db, "Phones")
+    product = await create_product(db, category.id, seller.id)
+    # Так пользователя передаёт get_current_user_claims: transient-объект без сессии
+    return UserModel(id=buyer.id, email=buyer.email, role=buyer.role, is_active=True), product
+
+
+async def _add(user: UserModel, product_id: int, quantity: int = 1):
+    async with async_session_maker() as session:
+        return await add_item_to_cart(CartItemCreate(product_id=product_id, quantity=quantity), session, user)
+
+
+@pytest.mark.anyio
+async def test_parallel_adds_of_same_product_sum_quantities(db):
+    user, product = await _shop(db)
+
+    responses = await asyncio.gather(*(_add(user, product.id) for _ in range(10)))
+
+    # Каждое добавление видит результат предыдущих: ни одно не потерялось и не упало на конфликте
+    assert sorted(response["quantity"] for response in responses) == list(range(1, 11))
+    items = (await db.scalars(select(CartItemModel).where(CartItemModel.user_id == user.id))).all()
+    assert [(item.product_id, item.quantity) for item in items] == [(product.id, 10)]
+
+
+@pytest.mark.anyio
+async def test_add_and_update_take_one_statement_each(db, sql_statements):
+    user, product = await _shop(db)
+
+    sql_statements.clear()
+    await _add(user, product.id, 2)
+    assert len(sql_statements) == 1
+
+    sql_statements.clear()
+    async with async_session_maker() as session:
+        await update_cart_item(product.id, CartItemUpdate(quantity=5), session, user)
+    assert len(sql_statements) == 1
+
+
+@pytest.mark.anyio
+async def test_add_inactive_product_is_rejected(db):
+    user, product = await _shop(db)
+    product.is_active = False
+    await db.commit()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await _add(user, product.id)
+
+    assert exc_info.value.status_code == 404
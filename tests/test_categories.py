@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.category_tree import invalidate_category_snapshot
+from app.database import async_session_maker
+from app.main import app
+from app.models.categories import Category as CategoryModel
+from app.routers.categories import update_category
+from app.schemas import CategoryCreate
+from tests.factories import create_category
+
+
+async def _move(category_id: int, name: str, parent_id: int, before_commit=None) -> bool:
+    async with async_session_maker() as session:
+        if before_commit is not None:
+            commit = session.commit
+
+            async def delayed_commit():
+                await before_commit()
+                await commit()
+
+            session.commit = delayed_commit
+        try:
+            await update_category(category_id, CategoryCreate(name=name, parent_id=parent_id), session)
+        except HTTPException as exc:
+            assert exc.status_code == 400
+            return False
+    return True
+
+
+@pytest.mark.anyio
+async def test_move_under_own_descendant_is_rejected(db):
+    root = await create_category(db, "Root")
+    child = await create_category(db, "Child", root.id)
+    grandchild = await create_category(db, "Grandchild", child.id)
+
+    assert not await _move(root.id, "Root", grandchild.id)
+
+
+@pytest.mark.anyio
+async def test_concurrent_opposite_moves_do_not_create_a_cycle(db):
+    first = await create_category(db, "First")
+    second = await create_category(db, "Second")
+
+    # Каждое перемещение перед коммитом ждёт второе (не дольше 0.5 с): без блокировки
+    # обе проверки проходят по старому дереву и оба коммита создают цикл
+    arrived = 0
+    both_arrived = asyncio.Event()
+
+    async def wait_for_other():
+        nonlocal arrived
+        arrived += 1
+        if arrived == 2:
+            both_arrived.set()
+        try:
+            await asyncio.wait_for(both_arrived.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+    results = await asyncio.gather(
+        _move(first.id, "First", second.id, wait_for_other),
+        _move(second.id, "Second", first.id, wait_for_other),
+    )
+
+    assert sorted(results) == [False, True]
+    parents = dict((await db.execute(select(CategoryModel.id, CategoryModel.parent_id))).all())
+    assert not (parents[first.id] == second.id and parents[second.id] == first.id)
+
+
+@pytest.mark.anyio
+async def test_category_list_body_and_etag_come_from_one_snapshot(db):
+    invalidate_category_snapshot()
+    phones = await create_category(db, "Phones")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get("/categories/")
+        etag = first.headers["etag"]
+        # Изменение из «другого воркера»: снимок этого воркера его ещё не видит
+        await create_category(db, "Laptops")
+        stale = await client.get("/categories/")
+        invalidate_category_snapshot()
+        fresh = await client.get("/categories/", headers={"If-None-Match": etag})
+
+    assert first.json() == [{"id": phones.id, "name": "Phones", "parent_id": None, "is_active": True}]
+    # Пока снимок прежний, тело и ETag прежние вместе
+    assert (stale.json(), stale.headers["etag"]) == (first.json(), etag)
+    assert fresh.status_code == 200
+    assert [category["name"] for category in fresh.json()] == ["Phones", "Laptops"]
+    assert fresh.headers["etag"] != etag
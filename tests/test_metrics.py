@@ -0,0 +1,5 @@
+from app.main import app
+
+
+def test_metrics_endpoint_is_disabled_by_default():
+    assert "/metrics" not in {route.path for route in app.routes}
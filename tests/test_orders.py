@@ -0,0 +1,47 @@
+import httpx
+import pytest
+
+from app import product_cache
+from app.cache import create_cache_backend
+from app.main import app
+from app.models.cart_items import CartItem as CartItemModel
+from app.models.users import User as UserModel
+from app.routers import orders
+from tests.factories import create_category, create_product, create_user
+
+
+async def _fake_payment(**_):
+    return {"id": "payment-1", "confirmation_url": "https://pay.example/1"}
+
+
+@pytest.fixture
+async def client(db_engine, monkeypatch):
+    monkeypatch.setattr(product_cache, "_backend", create_cache_backend(100))
+    monkeypatch.setattr(product_cache, "PRODUCT_CACHE_TTL", 30.0)
+    monkeypatch.setattr(orders, "create_yookassa_payment", _fake_payment)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+        yield http_client
+
+
+@pytest.mark.anyio
+async def test_checkout_refreshes_cached_lists_the_product_moves_into(client, db):
+    buyer = await create_user(db, "buyer@example.com", "buyer")
+    seller = await create_user(db, "seller@example.com", "seller")
+    category = await create_category(db, "Phones")
+    product = await create_product(db, category.id, seller.id, stock=1)
+    db.add(CartItemModel(user_id=buyer.id, product_id=product.id, quantity=1))
+    await db.commit()
+
+    # Списки без этого товара: тега product:{id} у них нет
+    sold_out = {"in_stock": "false"}
+    sold_out_in_category = {"in_stock": "false", "category_id": category.id}
+    for params in (sold_out, sold_out_in_category):
+        assert (await client.get("/products/", params=params)).json()["items"] == []
+
+    user = UserModel(id=buyer.id, email=buyer.email, role=buyer.role, is_active=True)
+    await orders.checkout_order(db=db, current_user=user)
+
+    for params in (sold_out, sold_out_in_category):
+        items = (await client.get("/products/", params=params)).json()["items"]
+        assert [(item["id"], item["stock"]) for item in items] == [(product.id, 0)]
@@ -0,0 +1,79 @@
+import subprocess
+import sys
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app import images
+from app.models.products import Product as ProductModel
+from app.schemas import Product as ProductSchema
+from tests.factories import create_category, create_product, create_user
+
+
+def _product(image_url: str | None, image_derivatives: bool = True) -> ProductModel:
+    now = datetime.now(timezone.utc)
+    return ProductModel(
+        id=1, name="Phone", description=None, price=Decimal("100.00"), image_url=image_url, stock=1,
+        category_id=1, seller_id=1, is_active=True, rating=0.0, created_at=now, updated_at=now,
+        image_derivatives=image_derivatives,
+    )
+
+
+def test_derivative_urls_come_from_the_orm_object():
+    data = ProductSchema.model_validate(_product("/media/products/abc.png")).model_dump()
+
+    assert data["thumbnail_url"] == "/media/products/abc_thumb.webp"
+    assert data["medium_url"] == "/media/products/abc_medium.webp"
+    assert ProductSchema.model_validate(_product(None)).thumbnail_url is None
+
+
+def test_original_url_is_served_until_derivatives_exist():
+    data = ProductSchema.model_validate(_product("/media/products/old.jpg", image_derivatives=False)).model_dump()
+
+    assert data["thumbnail_url"] == data["medium_url"] == "/media/products/old.jpg"
+
+
+def test_product_model_does_not_import_image_processing():
+    loaded = subprocess.run(
+        [sys.executable, "-c", "import sys, app.models.products; print('app.images' in sys.modules)"],
+        capture_output=True, text=True, check=True,
+    )
+
+    assert loaded.stdout.strip() == "False"
+
+
+@pytest.mark.anyio
+async def test_backfill_marks_only_products_whose_images_have_derivatives(db):
+    seller = await create_user(db, "seller@example.com", "seller")
+    category = await create_category(db, "Phones")
+    done = await create_product(db, category.id, seller.id, name="Done", image_url="/media/products/done.jpg")
+    missing = await create_product(db, category.id, seller.id, name="Missing", image_url="/media/products/missing.jpg")
+
+    assert await images.mark_products(["/media/products/done.jpg"]) == 1
+    assert await images.mark_products(["/media/products/done.jpg"]) == 0
+
+    await db.refresh(done)
+    await db.refresh(missing)
+    assert done.thumbnail_url == "/media/products/done_thumb.webp"
+    assert missing.thumbnail_url == "/media/products/missing.jpg"
+
+
+def test_schemas_do_not_import_configuration():
+    loaded = subprocess.run(
+        [sys.executable, "-c", "import sys, app.schemas; print('app.config' in sys.modules)"],
+        capture_output=True, text=True, check=True,
+    )
+
+    assert loaded.stdout.strip() == "False"
+
+
+def test_backfill_refuses_non_local_storage(monkeypatch, capsys):
+    monkeypatch.setattr(images, "MEDIA_STORAGE", "s3")
+    monkeypatch.setattr(sys, "argv", ["app.images"])
+
+    with pytest.raises(SystemExit) as exc_info:
+        images.main()
+
+    assert exc_info.value.code == 2
+    assert "MEDIA_STORAGE=local" in capsys.readouterr().err
@@ -0,0 +1,37 @@
+import io
+import json
+
+from app.product_import import MAX_STOCK, parse_import_file
+
+
+def _ndjson(*rows: dict) -> io.BytesIO:
+    return io.BytesIO(b"".join(json.dumps(row).encode("utf-8") + b"\n" for row in rows))
+
+
+def _row(**overrides) -> dict:
+    return {"name": "Phone", "description": None, "price": "100.00", "stock": 5, "category_id": 1, **overrides}
+
+
+def test_stock_above_integer_range_is_rejected_per_row():
+    file = _ndjson(_row(stock=MAX_STOCK), _row(stock=MAX_STOCK + 1), _row(stock=10**12))
+
+    records, failed, errors = parse_import_file(file, "ndjson", {1}, max_rows=10)
+
+    assert [record[3] for record in records] == [MAX_STOCK]
+    assert failed == 2
+    assert [error.line for error in errors] == [2, 3]
+    assert errors[0].errors == [f"stock: must be less than or equal to {MAX_STOCK}"]
+
+
+def test_out_of_range_stock_in_csv_is_rejected():
+    file = io.BytesIO(
+        b"name,description,price,stock,category_id\n"
+        b"Phone,,100.00,3,1\n"
+        b"Phone,,100.00,99999999999,1\n"
+    )
+
+    records, failed, errors = parse_import_file(file, "csv", {1}, max_rows=10)
+
+    assert len(records) == 1
+    assert failed == 1
+    assert errors[0].line == 3
@@ -0,0 +1,46 @@
+import re
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.models.products import Product as ProductModel
+from app.routers.products import _build_product_filters, _estimate_products_count, _explain_statement
+from tests.factories import create_category, create_product, create_user
+
+
+def _filters(category_ids):
+    filters, _ = _build_product_filters(
+        category_ids=category_ids, min_price=10, max_price=None,
+        in_stock=None, seller_id=None, search="",
+    )
+    return filters
+
+
+def test_explain_expands_category_subtree_into_positional_params():
+    sql, params = _explain_statement(select(ProductModel.id).where(*_filters((3, 5, 8))), asyncpg.dialect())
+
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "POSTCOMPILE" not in sql
+    in_list = re.search(r"category_id IN \(([^)]*)\)", sql).group(1)
+    category_params = [params[int(number) - 1] for number in re.findall(r"\$(\d+)", in_list)]
+    assert category_params == [3, 5, 8]
+    price_param = re.search(r"price >= \$(\d+)", sql).group(1)
+    assert params[int(price_param) - 1] == 10
+    assert len(params) == len(set(re.findall(r"\$(\d+)", sql)))
+
+
+@pytest.mark.anyio
+async def test_estimated_count_for_category_subtree(db):
+    seller = await create_user(db, "seller@example.com", "seller")
+    root = await create_category(db, "Root")
+    children = [await create_category(db, f"Child {index}", root.id) for index in range(3)]
+    for category in (root, *children):
+        await create_product(db, category.id, seller.id, price="50.00")
+
+    estimate = await _estimate_products_count(
+        db, _filters((root.id, *(child.id for child in children))), unfiltered=False
+    )
+
+    assert isinstance(estimate, int)
+    assert estimate >= 0
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import tracemalloc
+
+import pytest
+from sqlalchemy import text
+
+from app.database import async_session_maker
+from app.routers import products as products_router
+from tests.factories import create_category, create_product, create_user
+
+
+@pytest.fixture
+def export_sessions(monkeypatch):
+    # Маленькая пачка и доступ к сессии выгрузки, чтобы видеть, что она держит в памяти
+    sessions = []
+
+    def session_maker():
+        session = async_session_maker()
+        sessions.append(session)
+        return session
+
+    monkeypatch.setattr(products_router, "EXPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(products_router, "async_session_maker", session_maker)
+    return sessions
+
+
+async def _seller_with_products(db, count: int) -> int:
+    seller = await create_user(db, "seller@example.com", "seller")
+    category = await create_category(db, "Phones")
+    for index in range(count):
+        await create_product(db, category.id, seller.id, name=f"Product {index}")
+    return seller.id
+
+
+@pytest.mark.anyio
+async def test_ndjson_export_streams_one_batch_at_a_time(db, export_sessions):
+    seller_id = await _seller_with_products(db, 5)
+
+    chunks = []
+    loaded_per_chunk = []
+    async for chunk in products_router._export_products(seller_id, "ndjson"):
+        chunks.append(chunk)
+        # Пока потребитель держит пачку, в сессии только её объекты, а не весь результат
+        loaded_per_chunk.append(len(export_sessions[0].sync_session.identity_map))
+
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+    assert loaded_per_chunk == [2, 2, 1]
+    names = [json.loads(line)["name"] for chunk in chunks for line in chunk.splitlines()]
+    assert names == [f"Product {index}" for index in range(5)]
+
+
+@pytest.mark.anyio
+async def test_csv_export_starts_with_header_before_querying(db, export_sessions):
+    seller_id = await _seller_with_products(db, 3)
+
+    stream = products_router._export_products(seller_id, "csv")
+    header = await anext(stream)
+    assert export_sessions == []
+    chunks = [chunk async for chunk in stream]
+
+    assert len(chunks) == 2
+    rows = list(csv.reader(io.StringIO((header + b"".join(chunks)).decode("utf-8"))))
+    assert tuple(rows[0]) == products_router.EXPORT_FIELDS
+    assert len(rows) == 4
+
+
+async def _bulk_seller(db, email: str, count: int) -> int:
+    seller = await create_user(db, email, "seller")
+    category = await create_category(db, email)
+    await db.execute(text(
+        "INSERT INTO products (name, description, price, stock, is_active, category_id, seller_id, rating)"
+        " SELECT 'Product ' || g, repeat('описание ', 20), 100, 1, true, :category_id, :seller_id, 0"
+        " FROM generate_series(1, :count) g"
+    ), {"category_id": category.id, "seller_id": seller.id, "count": count})
+    await db.commit()
+    return seller.id
+
+
+async def _export_peak(seller_id: int, sessions: list, batch_size: int) -> tuple[int, int, int]:
+    """
+    Выгружает каталог, как сервер: чанк уходит клиенту и больше не хранится.
+    Возвращает (строк, наибольший identity map, пик памяти по tracemalloc).
+    """
+    rows = 0
+    largest_map = 0
+    tracemalloc.start()
+    try:
+        async for chunk in products_router._export_products(seller_id, "ndjson"):
+            assert chunk.count(b"\n") <= batch_size
+            rows += chunk.count(b"\n")
+            largest_map = max(largest_map, len(sessions[-1].sync_session.identity_map))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return rows, largest_map, peak
+
+
+@pytest.mark.anyio
+async def test_large_export_memory_does_not_grow_with_catalog_size(db, export_sessions, monkeypatch):
+    batch_size = 200
+    monkeypatch.setattr(products_router, "EXPORT_BATCH_SIZE", batch_size)
+    small_seller = await _bulk_seller(db, "small@example.com", 2 * batch_size)
+    large_seller = await _bulk_seller(db, "large@example.com", 20 * batch_size)
+
+    small_rows, small_map, small_peak = await _export_peak(small_seller, export_sessions, batch_size)
+    large_rows, large_map, large_peak = await _export_peak(large_seller, export_sessions, batch_size)
+
+    assert (small_rows, large_rows) == (2 * batch_size, 20 * batch_size)
+    assert small_map <= batch_size and large_map <= batch_size
+    # В 10 раз больше строк, а пик памяти тот же: держится одна пачка, а не весь результат
+    assert large_peak < 2 * small_peak
@@ -0,0 +1,50 @@
+import pytest
+
+from app.routers.products import get_product_facets
+from tests.factories import create_category, create_product, create_user
+
+
+async def _facets(db, **filters):
+    params = dict(
+        category_id=None, include_descendants=False, search=None, search_language="english",
+        min_price=None, max_price=None, in_stock=None, seller_id=None,
+    )
+    params.update(filters)
+    return await get_product_facets(db=db, **params)
+
+
+@pytest.mark.anyio
+async def test_facets_are_counted_in_one_statement(db, sql_statements):
+    seller = await create_user(db, "seller@example.com", "seller")
+    phones = await create_category(db, "Phones")
+    laptops = await create_category(db, "Laptops")
+    await create_product(db, phones.id, seller.id, price="100.00", stock=5)
+    await create_product(db, phones.id, seller.id, price="700.00", stock=0)
+    await create_product(db, laptops.id, seller.id, price="60000.00", stock=1)
+
+    sql_statements.clear()
+    facets = await _facets(db)
+
+    # Категории, цены, наличие и итог — один GROUPING SETS, а не запрос на фасет
+    assert len(sql_statements) == 1
+    assert facets["total"] == 3
+    assert facets["categories"] == [
+        {"category_id": phones.id, "count": 2},
+        {"category_id": laptops.id, "count": 1},
+    ]
+    assert [bucket["count"] for bucket in facets["price_buckets"]] == [1, 1, 0, 0, 0, 0, 0, 1]
+    assert (facets["in_stock"], facets["out_of_stock"]) == (2, 1)
+
+
+@pytest.mark.anyio
+async def test_facets_apply_listing_filters(db):
+    seller = await create_user(db, "seller@example.com", "seller")
+    phones = await create_category(db, "Phones")
+    await create_product(db, phones.id, seller.id, price="100.00", stock=5)
+    await create_product(db, phones.id, seller.id, price="700.00", stock=0)
+
+    facets = await _facets(db, in_stock=True)
+
+    assert facets["total"] == 1
+    assert facets["categories"] == [{"category_id": phones.id, "count": 1}]
+    assert (facets["in_stock"], facets["out_of_stock"]) == (1, 0)
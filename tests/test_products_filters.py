@@ -0,0 +1,23 @@
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.routers.products import _build_product_filters, _compile_statement, _id_page_statement
+
+
+def _page_sql(**filter_params) -> tuple[str, tuple]:
+    defaults = dict(category_ids=None, min_price=None, max_price=None, in_stock=None, seller_id=None, search="")
+    filters, _ = _build_product_filters(**{**defaults, **filter_params})
+    return _compile_statement(_id_page_statement(filters, None, 1, 20), asyncpg.dialect())
+
+
+def test_in_stock_constant_matches_partial_index_predicate():
+    sql, params = _page_sql(in_stock=True)
+
+    # Литерал, а не $n: иначе generic-план не использует индексы WHERE is_active AND stock > 0
+    assert "products.stock > 0" in sql
+    assert params == (21, 0)
+
+
+def test_out_of_stock_filter_is_literal_too():
+    sql, _ = _page_sql(in_stock=False)
+
+    assert "products.stock = 0" in sql
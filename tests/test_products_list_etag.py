@@ -0,0 +1,97 @@
+import httpx
+import pytest
+
+from app import product_cache
+from app.cache import create_cache_backend
+from app.main import app
+from tests.factories import create_category, create_product, create_user
+
+
+@pytest.fixture
+async def client(db_engine, monkeypatch):
+    # В тестах кэш каталога выключен (memory-бэкенд без явного TTL); здесь — свежий на каждый тест
+    monkeypatch.setattr(product_cache, "_backend", create_cache_backend(100))
+    monkeypatch.setattr(product_cache, "PRODUCT_CACHE_TTL", 30.0)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+        yield http_client
+
+
+@pytest.mark.anyio
+async def test_cached_list_is_revalidated_without_database(client, db, sql_statements):
+    seller = await create_user(db, "seller@example.com", "seller")
+    category = await create_category(db, "Phones")
+    await create_product(db, category.id, seller.id)
+
+    first = await client.get("/products/")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    sql_statements.clear()
+    cached = await client.get("/products/")
+    revalidated = await client.get("/products/", headers={"If-None-Match": etag})
+
+    assert sql_statements == []
+    assert cached.content == first.content
+    assert cached.headers["etag"] == etag
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+
+@pytest.mark.anyio
+async def test_invalidated_list_gets_new_etag(client, db):
+    seller = await create_user(db, "seller@example.com", "seller")
+    category = await create_category(db, "Phones")
+    await create_product(db, category.id, seller.id, name="First")
+
+    first = await client.get(f"/products/category/{category.id}")
+    await create_product(db, category.id, seller.id, name="Second")
+    await product_cache.invalidate([product_cache.category_tag(category.id)])
+    second = await client.get(f"/products/category/{category.id}", headers={"If-None-Match": first.headers["etag"]})
+
+    assert second.status_code == 200
+    assert len(second.json()) == 2
+    assert second.headers["etag"] != first.headers["etag"]
+
+
+@pytest.fixture
+async def uncached_client(db_engine):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+        yield http_client
+
+
+@pytest.mark.anyio
+async def test_uncached_list_answers_304_after_the_validator_query(uncached_client, db, sql_statements):
+    seller = await create_user(db, "seller@example.com", "seller")
+    category = await create_category(db, "Phones")
+    await create_product(db, category.id, seller.id)
+    first = await uncached_client.get("/products/", params={"category_id": category.id})
+
+    sql_statements.clear()
+    revalidated = await uncached_client.get(
+        "/products/", params={"category_id": category.id}, headers={"If-None-Match": first.headers["etag"]}
+    )
+
+    # Кэш выключен: только max(updated_at), без выборки страницы и COUNT
+    assert revalidated.status_code == 304
+    assert len(sql_statements) == 1
+    assert "max(products.updated_at)" in sql_statements[0]
+
+
+@pytest.mark.anyio
+async def test_product_change_changes_uncached_list_etag(uncached_client, db):
+    seller = await create_user(db, "seller@example.com", "seller")
+    category = await create_category(db, "Phones")
+    product = await create_product(db, category.id, seller.id)
+    first = await uncached_client.get(f"/products/category/{category.id}")
+
+    # Деактивация убирает товар из списка, не добавляя новых строк
+    product.is_active = False
+    await db.commit()
+    second = await uncached_client.get(
+        f"/products/category/{category.id}", headers={"If-None-Match": first.headers["etag"]}
+    )
+
+    assert second.status_code == 200
+    assert second.json() == []
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import update
+
+from app.models.products import Product as ProductModel
+from app.routers.products import _build_product_filters, _decode_cursor, _fetch_products_page
+from tests.factories import create_category, create_product, create_user
+
+
+def _filters():
+    filters, _ = _build_product_filters(
+        category_ids=None, min_price=None, max_price=None, in_stock=None, seller_id=None, search="",
+    )
+    return filters
+
+
+async def _page(db, cursor: str | None, page_size: int = 2):
+    position = _decode_cursor(cursor)[1:] if cursor else None
+    return await _fetch_products_page(db, _filters(), None, "id", position, 1, page_size)
+
+
+async def _catalog(db, count: int) -> list[int]:
+    seller = await create_user(db, "seller@example.com", "seller")
+    category = await create_category(db, "Phones")
+    return [(await create_product(db, category.id, seller.id, name=f"Product {index}")).id for index in range(count)]
+
+
+@pytest.mark.anyio
+async def test_cursor_pages_walk_the_catalog_one_statement_each(db, sql_statements):
+    ids = await _catalog(db, 5)
+
+    seen = []
+    cursor = None
+    while True:
+        sql_statements.clear()
+        by_cursor = cursor is not None
+        items, has_more, cursor = await _page(db, cursor)
+        # Страница и признак следующей — одним запросом; по курсору — без OFFSET
+        assert len(sql_statements) == 1
+        assert ("OFFSET" in sql_statements[0]) != by_cursor
+        seen.extend(item.id for item in items)
+        if not has_more:
+            break
+
+    assert seen == ids
+    assert cursor is None
+
+
+@pytest.mark.anyio
+async def test_cursor_page_does_not_skip_rows_when_earlier_rows_leave(db):
+    ids = await _catalog(db, 5)
+    _, _, cursor = await _page(db, None)
+
+    # Товар с первой страницы пропал из выборки: OFFSET 2 пропустил бы ids[2]
+    await db.execute(update(ProductModel).where(ProductModel.id == ids[0]).values(is_active=False))
+    await db.commit()
+    items, _, _ = await _page(db, cursor)
+
+    assert [item.id for item in items] == ids[2:4]
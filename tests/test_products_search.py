@@ -0,0 +1,86 @@
+import httpx
+import pytest
+
+from sqlalchemy import text
+
+from app.main import app
+from app.routers.products import _build_product_filters, _fetch_products_page, suggest_products
+from tests.factories import create_category, create_product, create_user
+
+
+@pytest.fixture
+async def catalog(db):
+    seller = await create_user(db, "seller@example.com", "seller")
+    category = await create_category(db, "Phones")
+    names = ["Samsung Galaxy S24", "Xiaomi Redmi Note", "Xiaomi Mi Band", "Samsonite Case"]
+    return {name: (await create_product(db, category.id, seller.id, name=name)).id for name in names}
+
+
+@pytest.mark.anyio
+async def test_suggest_puts_prefix_matches_before_similar_names(db, trigram, catalog, sql_statements):
+    sql_statements.clear()
+    suggestions = await suggest_products(q="sams", limit=10, db=db)
+
+    assert len(sql_statements) == 1
+    # Обе префиксные подсказки — по алфавиту, без учёта регистра
+    assert [item["name"] for item in suggestions] == ["Samsonite Case", "Samsung Galaxy S24"]
+
+
+@pytest.mark.anyio
+async def test_suggest_tolerates_typos(db, trigram, catalog):
+    suggestions = await suggest_products(q="Xiaomy", limit=10, db=db)
+
+    assert {item["id"] for item in suggestions} == {catalog["Xiaomi Redmi Note"], catalog["Xiaomi Mi Band"]}
+
+
+@pytest.mark.anyio
+async def test_suggest_skips_similar_names_when_prefixes_fill_the_limit(db, trigram, catalog):
+    suggestions = await suggest_products(q="xiaomi", limit=1, db=db)
+
+    assert [item["name"] for item in suggestions] == ["Xiaomi Mi Band"]
+
+
+@pytest.mark.anyio
+async def test_listing_falls_back_to_trigram_search(db, trigram, catalog):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        # Опечатка: полнотекстовый поиск ничего не находит
+        response = await client.get("/products/", params={"search": "Samsnug Galaxy"})
+
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [catalog["Samsung Galaxy S24"]]
+    assert response.json()["total"] == 1
+
+
+async def _search_page(db, query: str, language: str):
+    filters, rank_col = _build_product_filters(
+        category_ids=None, min_price=None, max_price=None, in_stock=None, seller_id=None,
+        search=query, search_language=language,
+    )
+    items, _, _ = await _fetch_products_page(db, filters, rank_col, "rank", None, 1, 20)
+    return [item.id for item in items]
+
+
+@pytest.fixture
+async def cyrillic_words(db):
+    # В базе с LC_CTYPE=C кириллица не распознаётся как буквы: слова выбрасываются
+    # парсером или не приводятся к нижнему регистру
+    stems = text("SELECT to_tsvector('russian', 'Смартфон') @@ websearch_to_tsquery('russian', 'смартфоны')")
+    if not await db.scalar(stems):
+        pytest.skip("database locale does not classify Cyrillic letters")
+
+
+@pytest.mark.anyio
+async def test_russian_search_matches_other_word_forms(db, cyrillic_words, sql_statements):
+    seller = await create_user(db, "seller@example.com", "seller")
+    category = await create_category(db, "Телефоны")
+    phone = await create_product(db, category.id, seller.id, name="Смартфон Samsung Galaxy")
+    await create_product(db, category.id, seller.id, name="Наушники Sony")
+
+    sql_statements.clear()
+    found = await _search_page(db, "смартфоны", "russian")
+
+    assert len(sql_statements) == 1
+    assert found == [phone.id]
+    # english не стеммит русские слова: множественное число не находит товар
+    assert await _search_page(db, "смартфоны", "english") == []
@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from app import rate_limit
+from app.client_ip import get_client_ip
+from app.rate_limit import InMemoryRateLimiter, RateLimiter, RedisRateLimiter
+
+
+def _request(client_ip: str, forwarded_for: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded_for.encode("ascii"))] if forwarded_for else []
+    return Request({"type": "http", "method": "POST", "path": "/users/token", "headers": headers,
+                    "client": (client_ip, 40000)})
+
+
+def test_incomplete_limiter_fails_on_construction():
+    class _NoAcquire(RateLimiter):
+        pass
+
+    with pytest.raises(TypeError):
+        _NoAcquire()
+
+
+@pytest.mark.anyio
+async def test_in_memory_bucket_refills_over_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    limiter = InMemoryRateLimiter()
+
+    assert [await limiter.acquire("k", 2, 0.5) for _ in range(2)] == [0.0, 0.0]
+    assert await limiter.acquire("k", 2, 0.5) == pytest.approx(2.0)
+    assert await limiter.acquire("other", 2, 0.5) == 0.0
+    now[0] += 2.0
+    assert await limiter.acquire("k", 2, 0.5) == 0.0
+
+
+@pytest.mark.anyio
+async def test_redis_bucket_is_shared_through_the_script():
+    client = fakeredis.FakeAsyncRedis()
+    first_worker = RedisRateLimiter(client)
+    second_worker = RedisRateLimiter(client)
+
+    assert await first_worker.acquire("k", 2, 0.01) == 0.0
+    assert await second_worker.acquire("k", 2, 0.01) == 0.0
+    assert await first_worker.acquire("k", 2, 0.01) > 90
+    assert await second_worker.acquire("other", 2, 0.01) == 0.0
+    assert 0 < await client.pttl("ratelimit:k") <= 200_000
+
+    await first_worker.remember("known", 60)
+    assert await second_worker.is_remembered("known")
+    assert not await second_worker.is_remembered("unknown")
+    assert 0 < await client.pttl("ratelimit:known") <= 60_000
+
+
+@pytest.mark.anyio
+async def test_redis_errors_let_requests_through():
+    class _BrokenClient:
+        def register_script(self, script):
+            async def run(keys, args):
+                raise ConnectionError("redis is down")
+            return run
+
+    assert await RedisRateLimiter(_BrokenClient()).acquire("k", 1, 1.0) == 0.0
+    assert not await RedisRateLimiter(_BrokenClient()).is_remembered("k")
+
+
+@pytest.mark.anyio
+async def test_client_ip_comes_from_the_app_proxy_middleware():
+    from app.main import app
+
+    proxy_headers = next(item for item in app.user_middleware if item.cls is ProxyHeadersMiddleware)
+    seen = []
+
+    async def endpoint(scope, receive, send):
+        seen.append(get_client_ip(Request(scope)))
+
+    middleware = proxy_headers.cls(endpoint, *proxy_headers.args, **proxy_headers.kwargs)
+    # Клиент подставил свой X-Forwarded-For, nginx дописал реальный адрес справа
+    await middleware(_request("127.0.0.1", "1.2.3.4, 203.0.113.7").scope, None, None)
+    await middleware(_request("198.51.100.1", "1.2.3.4").scope, None, None)
+
+    assert seen == ["203.0.113.7", "198.51.100.1"]
+
+
+def test_client_ip_does_not_parse_forwarded_for_again():
+    # Адрес уже подставлен middleware; клиент из доверенной сети — не прокси
+    assert get_client_ip(_request("127.0.0.1", "1.2.3.4")) == "127.0.0.1"
+
+
+@pytest.mark.anyio
+async def test_login_ip_bucket_is_keyed_on_the_real_client(monkeypatch):
+    monkeypatch.setattr(rate_limit, "rate_limiter", InMemoryRateLimiter())
+    monkeypatch.setattr(rate_limit, "LOGIN_RATE_LIMIT_IP_BURST", 2)
+
+    async def attempt(client: str, email: str) -> None:
+        await rate_limit.limit_login_attempts(_request(client), SimpleNamespace(username=email))
+
+    await attempt("203.0.113.7", "a@example.com")
+    await attempt("203.0.113.7", "b@example.com")
+    with pytest.raises(HTTPException) as exc_info:
+        await attempt("203.0.113.7", "c@example.com")
+    assert exc_info.value.status_code == 429
+    assert int(exc_info.value.headers["Retry-After"]) >= 1
+    # Другой клиент за тем же nginx не упирается в чужое ведро
+    await attempt("203.0.113.8", "d@example.com")
+
+
+@pytest.mark.anyio
+async def test_email_bucket_does_not_lock_out_a_client_that_logged_in_before(monkeypatch):
+    monkeypatch.setattr(rate_limit, "rate_limiter", InMemoryRateLimiter())
+    monkeypatch.setattr(rate_limit, "LOGIN_RATE_LIMIT_EMAIL_BURST", 2)
+    await rate_limit.remember_successful_login(_request("203.0.113.7"), "Victim@example.com")
+
+    async def attempt(client: str) -> None:
+        await rate_limit.limit_login_attempts(_request(client), SimpleNamespace(username="victim@example.com"))
+
+    # Перебор с чужих адресов исчерпал ведро email
+    await attempt("198.51.100.1")
+    await attempt("198.51.100.2")
+    with pytest.raises(HTTPException):
+        await attempt("198.51.100.3")
+
+    # Владелец входит с адреса, с которого уже входил
+    for _ in range(3):
+        await attempt("203.0.113.7")
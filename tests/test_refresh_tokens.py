@@ -0,0 +1,85 @@
+import asyncio
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app import refresh_tokens
+from app.config import ALGORITHM, SECRET_KEY
+from app.database import async_session_maker
+from app.models.refresh_tokens import RefreshToken as RefreshTokenModel
+from tests.factories import create_user
+
+
+def _jti(token: str) -> str:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["jti"]
+
+
+async def _login(db) -> str:
+    user = await create_user(db)
+    token = refresh_tokens.issue_refresh_token(db, user.id, user.email, user.role)
+    await db.commit()
+    return token
+
+
+async def _rotate(token: str) -> str | None:
+    # Каждая ротация — отдельный запрос со своей сессией
+    async with async_session_maker() as session:
+        try:
+            _, new_token = await refresh_tokens.rotate_refresh_token(session, token)
+        except HTTPException:
+            return None
+    return new_token
+
+
+async def _family_revoked(db, token: str) -> bool:
+    db.expire_all()
+    return await db.scalar(select(RefreshTokenModel.revoked).where(RefreshTokenModel.jti == _jti(token)))
+
+
+@pytest.mark.anyio
+async def test_retry_within_grace_returns_the_issued_successor(db):
+    token = await _login(db)
+
+    successor = await _rotate(token)
+    retried = await _rotate(token)
+
+    assert retried is not None
+    assert _jti(retried) == _jti(successor)
+    assert not await _family_revoked(db, token)
+    # Цепочка продолжается: преемник ротируется один раз
+    assert await _rotate(retried) is not None
+
+
+@pytest.mark.anyio
+async def test_reuse_after_successor_was_rotated_revokes_family(db):
+    token = await _login(db)
+    successor = await _rotate(token)
+    latest = await _rotate(successor)
+
+    assert await _rotate(token) is None
+    assert await _family_revoked(db, latest)
+    assert await _rotate(latest) is None
+
+
+@pytest.mark.anyio
+async def test_reuse_after_grace_revokes_family(db, monkeypatch):
+    monkeypatch.setattr(refresh_tokens, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", 0.0)
+    token = await _login(db)
+    successor = await _rotate(token)
+
+    assert await _rotate(token) is None
+    assert await _rotate(successor) is None
+    assert await _family_revoked(db, successor)
+
+
+@pytest.mark.anyio
+async def test_parallel_refreshes_get_the_same_successor(db):
+    token = await _login(db)
+
+    results = await asyncio.gather(_rotate(token), _rotate(token))
+
+    assert None not in results
+    assert _jti(results[0]) == _jti(results[1])
+    assert not await _family_revoked(db, token)
@@ -0,0 +1,12 @@
+import pytest
+
+from app import serialization
+from scripts.serialization_benchmark import fastapi_json, sample_payloads
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("name", ["ProductList", "OrderList", "Cart"])
+async def test_fast_path_matches_fastapi_json(name):
+    response_type, content = sample_payloads(3)[name]
+
+    assert serialization.dump_json(response_type, content) == await fastapi_json(response_type, content)
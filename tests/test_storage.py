@@ -0,0 +1,185 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app import storage
+from app.models.media_blobs import MediaBlob as MediaBlobModel
+from app.storage import IMMUTABLE_CACHE_CONTROL, LocalMediaStorage, MediaStorage, S3MediaStorage
+
+BLOB = "a" * 64 + ".png"
+
+
+class _ClientError(Exception):
+    def __init__(self, code: str) -> None:
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class _StubS3Client:
+    """
+    Минимальная замена клиента boto3: объекты хранятся в словаре.
+    """
+    exceptions = SimpleNamespace(ClientError=_ClientError)
+
+    def __init__(self) -> None:
+        self.objects: dict[str, dict] = {}
+        self.head_error: str | None = None
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        if self.head_error:
+            raise _ClientError(self.head_error)
+        if Key not in self.objects:
+            raise _ClientError("404")
+        return {}
+
+    def upload_file(self, filename: str, bucket: str, key: str, ExtraArgs: dict) -> None:
+        with open(filename, "rb") as file:
+            self.objects[key] = {"body": file.read(), **ExtraArgs}
+
+    def delete_object(self, Bucket: str, Key: str) -> None:
+        self.objects.pop(Key, None)
+
+
+def test_incomplete_storage_fails_on_construction():
+    class _UrlOnlyStorage(MediaStorage):
+        def url(self, name: str) -> str:
+            return name
+
+    with pytest.raises(TypeError):
+        _UrlOnlyStorage()
+
+
+@pytest.mark.anyio
+async def test_local_storage_moves_file_into_root(tmp_path):
+    root = tmp_path / "media"
+    root.mkdir()
+    source = tmp_path / "upload.part"
+    source.write_bytes(b"image")
+    media = LocalMediaStorage(root)
+
+    await media.save(BLOB, source)
+
+    assert not source.exists()
+    assert (root / BLOB).read_bytes() == b"image"
+    assert await media.exists(BLOB)
+    assert media.url(BLOB) == f"/media/products/{BLOB}"
+    await media.delete(BLOB)
+    await media.delete(BLOB)
+    assert not await media.exists(BLOB)
+
+
+@pytest.mark.anyio
+async def test_s3_storage_uploads_with_prefix_and_immutable_caching(tmp_path):
+    client = _StubS3Client()
+    media = S3MediaStorage("bucket", "https://cdn.example.com/", "products/", client=client)
+    source = tmp_path / "upload.part"
+    source.write_bytes(b"image")
+
+    await media.save(BLOB, source)
+    await media.save("legacy.jpg", source)
+
+    assert client.objects[f"products/{BLOB}"]["ContentType"] == "image/png"
+    assert client.objects[f"products/{BLOB}"]["CacheControl"] == IMMUTABLE_CACHE_CONTROL
+    assert "CacheControl" not in client.objects["products/legacy.jpg"]
+    assert await media.exists(BLOB)
+    assert media.url(BLOB) == f"https://cdn.example.com/products/{BLOB}"
+    await media.delete(BLOB)
+    assert not await media.exists(BLOB)
+
+
+@pytest.mark.anyio
+async def test_s3_storage_propagates_errors_other_than_not_found():
+    client = _StubS3Client()
+    client.head_error = "AccessDenied"
+    media = S3MediaStorage("bucket", "https://cdn.example.com", client=client)
+
+    with pytest.raises(_ClientError):
+        await media.exists(BLOB)
+
+
+@pytest.fixture
+def local_media(tmp_path, monkeypatch):
+    media = LocalMediaStorage(tmp_path)
+    monkeypatch.setattr(storage, "media_storage", media)
+    return tmp_path
+
+
+async def _refcount(db, name: str) -> int | None:
+    db.expire_all()
+    return await db.scalar(select(MediaBlobModel.refcount).where(MediaBlobModel.name == name))
+
+
+@pytest.mark.anyio
+async def test_blob_is_collected_only_after_last_reference_is_released(db, local_media):
+    files = [BLOB, "a" * 64 + "_thumb.webp", "a" * 64 + "_medium.webp"]
+    for file_name in files:
+        (local_media / file_name).write_bytes(b"image")
+    await storage.acquire_blob(db, BLOB)
+    await storage.acquire_blob(db, BLOB)
+    await db.commit()
+
+    await storage.release_blob(db, BLOB)
+    await db.commit()
+    await storage.collect_blob(BLOB)
+
+    assert await _refcount(db, BLOB) == 1
+    assert all((local_media / file_name).exists() for file_name in files)
+
+    await storage.release_blob(db, BLOB)
+    await db.commit()
+    await storage.collect_blob(BLOB)
+
+    assert await _refcount(db, BLOB) is None
+    assert not any((local_media / file_name).exists() for file_name in files)
+
+
+@pytest.mark.anyio
+async def test_legacy_file_without_refcount_is_deleted_immediately(db_engine, local_media):
+    (local_media / "legacy.jpg").write_bytes(b"image")
+
+    await storage.collect_blob("legacy.jpg")
+
+    assert not (local_media / "legacy.jpg").exists()
+
+
+@pytest.mark.anyio
+async def test_blob_row_is_deleted_before_files(db, local_media, monkeypatch):
+    (local_media / BLOB).write_bytes(b"image")
+    await storage.acquire_blob(db, BLOB)
+    await storage.release_blob(db, BLOB)
+    await db.commit()
+
+    async def failing_delete(name: str) -> None:
+        raise OSError("storage unavailable")
+
+    monkeypatch.setattr(storage.media_storage, "delete", failing_delete)
+    with pytest.raises(OSError):
+        await storage.collect_blob(BLOB)
+
+    # Сбой удаления оставляет лишний файл, а не строку, ссылающуюся на удалённый
+    assert await _refcount(db, BLOB) is None
+    assert (local_media / BLOB).exists()
+
+
+@pytest.mark.anyio
+async def test_files_survive_upload_of_same_content_during_collection(db, local_media, monkeypatch):
+    (local_media / BLOB).write_bytes(b"image")
+    await storage.acquire_blob(db, BLOB)
+    await storage.release_blob(db, BLOB)
+    await db.commit()
+    lock_blob = storage._lock_blob
+
+    async def upload_before_lock(session, name: str) -> None:
+        # Загрузка того же файла успела между удалением строки и удалением файлов:
+        # она нашла файл на месте и не стала сохранять его заново
+        if session is not db:
+            await storage.acquire_blob(db, name)
+            await db.commit()
+        await lock_blob(session, name)
+
+    monkeypatch.setattr(storage, "_lock_blob", upload_before_lock)
+    await storage.collect_blob(BLOB)
+
+    assert await _refcount(db, BLOB) == 1
+    assert (local_media / BLOB).exists()
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import select
+
+from app import user_cache
+from app.cache import TTLCache
+from app.models.users import User as UserModel
+from tests.factories import create_user
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(user_cache, "_cache", TTLCache(ttl=30.0, maxsize=100))
+    monkeypatch.setattr(user_cache, "_stale_claims", TTLCache(ttl=60.0, maxsize=100))
+    monkeypatch.setattr(user_cache, "_deactivated_ids", frozenset())
+    monkeypatch.setattr(user_cache, "_deactivated_loaded_at", float("inf"))
+
+
+@pytest.mark.anyio
+async def test_deactivation_drops_cached_user_and_claims_trust(db, fresh_cache):
+    user = await create_user(db, "buyer@example.com", "buyer")
+    await db.refresh(user)
+    user_id = user.id
+    user_cache.store(user)
+    assert user_cache.claims_trusted("buyer@example.com")
+
+    assert await user_cache.update_user("buyer@example.com", is_active=False)
+
+    assert user_cache.get("buyer@example.com") is None
+    assert not user_cache.claims_trusted("buyer@example.com")
+    db.expire_all()
+    assert await db.scalar(select(UserModel.is_active).where(UserModel.id == user_id)) is False
+
+
+@pytest.mark.anyio
+async def test_role_change_keeps_activity(db, fresh_cache):
+    user = await create_user(db, "buyer@example.com", "buyer")
+    await db.refresh(user)
+    user_id = user.id
+
+    assert await user_cache.update_user("buyer@example.com", role="seller")
+    assert not await user_cache.update_user("missing@example.com", is_active=False)
+
+    db.expire_all()
+    row = (await db.execute(select(UserModel.role, UserModel.is_active).where(UserModel.id == user_id))).one()
+    assert tuple(row) == ("seller", True)